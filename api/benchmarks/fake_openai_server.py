@@ -0,0 +1,253 @@
+import csv
+import io
+import json
+import re
+import threading
+import time
+from collections.abc import Callable
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DATE_PATTERN = re.compile(r"^(\d{4})-(\d{2})-(\d{2})$|^(\d{2})/(\d{2})/(\d{4})$")
+AMOUNT_PATTERN = re.compile(r"^-?\$?\d[\d,]*\.\d{2}$")
+
+
+def echo_transactions(request: dict) -> dict:
+    """
+    Builds a plausible extraction result with one transaction per CSV row of the last user message,
+    so payload size scales with the statement like a real model response.
+
+    Args:
+        request (dict): The chat completion request body.
+
+    Returns:
+        dict: The tool call arguments, a dict with a 'transactions' list.
+    """
+    content = request["messages"][-1]["content"]
+    if isinstance(content, list):
+        content = "".join(part.get("text", "") for part in content)
+    lines = content.split("\n", 1)
+    rows = csv.reader(io.StringIO(lines[1] if len(lines) > 1 else ""))
+    wants_row_id = "row_id" in lines[0]
+    transactions = []
+    for row in rows:
+        if not row:
+            continue
+        transaction = {
+            "merchant": max(row, key=lambda value: sum(c.isalpha() for c in value)),
+            "date": "2024-01-01",
+            "amount": 0.0,
+            "currency": "USD",
+            "transaction_type": "Expense",
+        }
+        for value in row:
+            date_match = DATE_PATTERN.match(value)
+            if date_match:
+                year, month, day = date_match.group(1, 2, 3)
+                if year is None:
+                    month, day, year = date_match.group(4, 5, 6)
+                transaction["date"] = f"{year}-{month}-{day}"
+                break
+        for value in row:
+            if AMOUNT_PATTERN.match(value):
+                transaction["amount"] = abs(
+                    float(value.replace("$", "").replace(",", ""))
+                )
+                break
+        if wants_row_id:
+            transaction["row_id"] = int(row[0])
+        transactions.append(transaction)
+    return {"transactions": transactions}
+
+
+def build_chat_completion(
+    request: dict, payload: Callable[[dict], dict] = echo_transactions
+) -> dict:
+    """
+    Builds a chat completion response whose tool call carries the payload built for the request.
+
+    Args:
+        request (dict): The chat completion request body.
+        payload (Callable[[dict], dict]): Builds the tool call arguments from the request body.
+
+    Returns:
+        dict: The chat completion response body.
+    """
+    arguments = json.dumps(payload(request))
+    prompt_tokens = (
+        sum(
+            len(json.dumps(message.get("content", "")))
+            for message in request["messages"]
+        )
+        // 4
+    )
+    completion_tokens = len(arguments) // 4
+    name = (
+        request.get("tool_choice", {})
+        .get("function", {})
+        .get("name", "extract_transaction")
+    )
+    return {
+        "id": "chatcmpl-fake",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": request.get("model", "fake"),
+        "choices": [
+            {
+                "index": 0,
+                "finish_reason": "tool_calls",
+                "message": {
+                    "role": "assistant",
+                    "content": None,
+                    "tool_calls": [
+                        {
+                            "id": "call_fake",
+                            "type": "function",
+                            "function": {"name": name, "arguments": arguments},
+                        }
+                    ],
+                },
+            }
+        ],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+def build_chat_completion_chunks(
+    request: dict,
+    payload: Callable[[dict], dict] = echo_transactions,
+    chunk_size: int = 64,
+) -> list[dict]:
+    """
+    Builds the streamed chunks of a chat completion whose tool call arguments are split into
+    fragments of chunk_size characters, followed by a usage chunk.
+
+    Args:
+        request (dict): The chat completion request body.
+        payload (Callable[[dict], dict]): Builds the tool call arguments from the request body.
+        chunk_size (int): The number of argument characters sent per chunk.
+
+    Returns:
+        list[dict]: The chat completion chunk bodies, in order.
+    """
+    completion = build_chat_completion(request, payload)
+    tool_call = completion["choices"][0]["message"]["tool_calls"][0]
+    arguments = tool_call["function"]["arguments"]
+    base = {
+        "id": completion["id"],
+        "object": "chat.completion.chunk",
+        "created": completion["created"],
+        "model": completion["model"],
+    }
+    chunks = []
+    for start in range(0, len(arguments), chunk_size):
+        fragment = {"arguments": arguments[start : start + chunk_size]}
+        delta = {"tool_calls": [{"index": 0, "function": fragment}]}
+        if start == 0:
+            fragment["name"] = tool_call["function"]["name"]
+            delta["role"] = "assistant"
+            delta["tool_calls"][0].update(id=tool_call["id"], type="function")
+        chunks.append(
+            {
+                **base,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": None}],
+            }
+        )
+    chunks.append(
+        {
+            **base,
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "tool_calls"}],
+        }
+    )
+    chunks.append({**base, "choices": [], "usage": completion["usage"]})
+    return chunks
+
+
+class FakeOpenAIServer:
+    """
+    A local OpenAI-compatible chat completions server with configurable latency and payloads, used
+    to benchmark the end-to-end parser without network calls or API costs. Point the OpenAI client at
+    it by setting OPENAI_BASE_URL to the server's base_url.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        payload: Callable[[dict], dict] = echo_transactions,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        """
+        Args:
+            latency (float): Seconds to wait before answering each request.
+            payload (Callable[[dict], dict]): Builds the tool call arguments from the request body.
+            host (str): The interface to listen on.
+            port (int): The port to listen on, or 0 for any free port.
+        """
+        self.latency = latency
+        self.payload = payload
+        self.requests: list[dict] = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                server.requests.append(body)
+                if server.latency:
+                    time.sleep(server.latency)
+                if body.get("stream"):
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/event-stream")
+                    self.send_header("Connection", "close")
+                    self.end_headers()
+                    for chunk in build_chat_completion_chunks(body, server.payload):
+                        self.wfile.write(
+                            f"data: {json.dumps(chunk)}\n\n".encode("utf-8")
+                        )
+                        self.wfile.flush()
+                    self.wfile.write(b"data: [DONE]\n\n")
+                    self.close_connection = True
+                    return
+                data = json.dumps(build_chat_completion(body, server.payload)).encode(
+                    "utf-8"
+                )
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        """The base URL to pass to the OpenAI client."""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "FakeOpenAIServer":
+        """Starts serving requests on a background thread."""
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stops the server and waits for the background thread to exit."""
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        self._thread.join()
+
+    def __enter__(self) -> "FakeOpenAIServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
@@ -0,0 +1,192 @@
+"""
+Measures the cold import time of the API entry points with `python -X importtime` and checks it
+against tracked budgets.
+
+Usage (from the repository root):
+    python -m api.benchmarks.import_time
+    python -m api.benchmarks.import_time --update-budget
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from api.benchmarks.run_benchmarks import percentile
+
+DEFAULT_BUDGET_PATH = os.path.join(os.path.dirname(__file__), "import_budgets.json")
+DEFAULT_HEADROOM = 0.5
+REPOSITORY_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+
+
+def parse_importtime(output: str) -> list[tuple[str, int, int, int]]:
+    """
+    Parses the report written to stderr by `python -X importtime`.
+
+    Args:
+        output (str): The stderr of the interpreter.
+
+    Returns:
+        list[tuple[str, int, int, int]]: The name, self time and cumulative time in microseconds,
+            and nesting depth of each imported module, in report order. A module is reported after
+            the modules it imports, which are one level deeper.
+    """
+    entries = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:") :].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        name = fields[2].rstrip()
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((name.strip(), int(fields[0]), int(fields[1]), depth))
+    return entries
+
+
+def module_imports(
+    entries: list[tuple[str, int, int, int]], module: str
+) -> list[tuple[str, int, int, int]]:
+    """
+    Selects the report entries of a top-level import and everything it imported.
+
+    Args:
+        entries (list[tuple[str, int, int, int]]): The entries returned by parse_importtime.
+        module (str): The dotted module name imported at the top level.
+
+    Returns:
+        list[tuple[str, int, int, int]]: The entries of the module, last, and its imports.
+
+    Raises:
+        ValueError: If the module was not imported at the top level.
+    """
+    for index in range(len(entries) - 1, -1, -1):
+        if entries[index][0] == module and entries[index][3] == 0:
+            start = index
+            while start > 0 and entries[start - 1][3] > 0:
+                start -= 1
+            return entries[start : index + 1]
+    raise ValueError(f"Module '{module}' was not imported at the top level.")
+
+
+def import_module_cold(module: str) -> list[tuple[str, int, int, int]]:
+    """
+    Imports a module in a fresh interpreter and returns the import report entries of the module and
+    everything it imported.
+
+    Args:
+        module (str): The dotted module name.
+
+    Returns:
+        list[tuple[str, int, int, int]]: The entries selected by module_imports.
+
+    Raises:
+        RuntimeError: If the import fails.
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        cwd=REPOSITORY_ROOT,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{completed.stderr}")
+    return module_imports(parse_importtime(completed.stderr), module)
+
+
+def measure_import(module: str, repeats: int, top: int = 5) -> dict:
+    """
+    Measures the cumulative cold import time of a module over several fresh interpreters.
+
+    Args:
+        module (str): The dotted module name.
+        repeats (int): The number of interpreters started.
+        top (int): The number of heaviest direct imports reported.
+
+    Returns:
+        dict: The p50 import time in milliseconds, the sorted names of the modules it imported and
+            its heaviest direct imports with their cumulative time in milliseconds.
+    """
+    samples = []
+    for _ in range(repeats):
+        entries = import_module_cold(module)
+        samples.append(entries[-1][2] / 1000)
+    heaviest = sorted(
+        (entry for entry in entries[:-1] if entry[3] == 1),
+        key=lambda entry: entry[2],
+        reverse=True,
+    )[:top]
+    return {
+        "p50_ms": round(percentile(samples, 0.5), 3),
+        "modules": sorted(entry[0] for entry in entries[:-1]),
+        "heaviest": [
+            (name, round(cumulative / 1000, 3)) for name, _, cumulative, _ in heaviest
+        ],
+    }
+
+
+def check_budget(module: str, result: dict, budget: dict) -> list[str]:
+    """
+    Finds budget violations of a measured module.
+
+    Args:
+        module (str): The dotted module name.
+        result (dict): The result of measure_import.
+        budget (dict): The budget with budget_ms and an optional list of forbidden packages that
+            must not be imported.
+
+    Returns:
+        list[str]: A description of each violation.
+    """
+    violations = []
+    if result["p50_ms"] > budget["budget_ms"]:
+        violations.append(
+            f"{module}: import p50 {result['p50_ms']:.1f} ms exceeds budget "
+            f"{budget['budget_ms']:.1f} ms"
+        )
+    loaded = {name.split(".")[0] for name in result["modules"]}
+    for package in budget.get("forbidden", []):
+        if package in loaded:
+            violations.append(f"{module}: imports {package} at import time")
+    return violations
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--budget", default=DEFAULT_BUDGET_PATH)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument(
+        "--update-budget",
+        action="store_true",
+        help="Set each budget to the measured p50 plus --headroom instead of checking.",
+    )
+    parser.add_argument("--headroom", type=float, default=DEFAULT_HEADROOM)
+    args = parser.parse_args(argv)
+    with open(args.budget, encoding="utf-8") as file:
+        budgets = json.load(file)
+    violations = []
+    for module, budget in budgets.items():
+        result = measure_import(module, args.repeats)
+        heaviest = ", ".join(f"{name} {ms:.1f} ms" for name, ms in result["heaviest"])
+        print(
+            f"{module:35s} p50 {result['p50_ms']:>8.1f} ms  "
+            f"budget {budget['budget_ms']:>8.1f} ms  ({heaviest})"
+        )
+        if args.update_budget:
+            budget["budget_ms"] = round(result["p50_ms"] * (1 + args.headroom), 1)
+        else:
+            violations.extend(check_budget(module, result, budget))
+    if args.update_budget:
+        with open(args.budget, "w", encoding="utf-8") as file:
+            json.dump(budgets, file, indent=2)
+            file.write("\n")
+        print(f"Updated budgets at {args.budget}.")
+        return 0
+    for violation in violations:
+        print(f"REGRESSION {violation}")
+    return 1 if violations else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,241 @@
+"""
+Benchmarks the statement parsing pipeline on synthetic statements and checks results against
+stored baselines.
+
+Usage (from the repository root):
+    python -m api.benchmarks.run_benchmarks --sizes 100,10000
+    python -m api.benchmarks.run_benchmarks --sizes 100,10000 --update-baseline
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+
+from openai.types.chat import ChatCompletion
+
+from api.benchmarks.fake_openai_server import FakeOpenAIServer, build_chat_completion
+from api.benchmarks.synthetic_statements import (
+    LAYOUTS,
+    generate_ofx_statement,
+    generate_rows,
+    generate_statement,
+)
+from api.utils.file_reader import read_csv_file
+from api.utils.ofx_parser import parse_ofx
+from api.utils.openai_client import reset_clients
+from api.utils.prompt_compaction import compact_statement_csv
+from api.utils.prompts import PROMPTS
+from api.utils.redact_pii import remove_pii_columns, scrub_text
+from api.utils.structured_output import get_structured_output
+from api.utils.statement_parser import (
+    _build_messages,
+    _parse_transactions,
+    extract_statement_details,
+)
+
+DEFAULT_BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines.json")
+PROMPT_SETS = {
+    "card": "card_account_csv_statement_parser",
+    "checking": "checking_account_csv_statement_parser",
+}
+
+
+def percentile(samples: list[float], fraction: float) -> float:
+    """
+    Returns the nearest-rank percentile of the samples.
+
+    Args:
+        samples (list[float]): The measured values.
+        fraction (float): The percentile as a fraction, e.g. 0.95.
+
+    Returns:
+        float: The percentile value.
+    """
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))]
+
+
+def measure(func: Callable[[], object], rows: int, repeats: int) -> dict[str, float]:
+    """
+    Times repeated calls of a function and reports latency percentiles and row throughput.
+
+    Args:
+        func (Callable[[], object]): The function to time.
+        rows (int): The number of statement rows processed per call.
+        repeats (int): The number of timed calls.
+
+    Returns:
+        dict[str, float]: The p50/p95/p99 latency in milliseconds and rows per second at p50.
+    """
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    p50 = percentile(samples, 0.5)
+    return {
+        "p50_ms": round(p50 * 1000, 3),
+        "p95_ms": round(percentile(samples, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(samples, 0.99) * 1000, 3),
+        "rows_per_sec": round(rows / p50, 1) if p50 else 0.0,
+    }
+
+
+def run_benchmarks(
+    sizes: list[int],
+    layouts: list[str],
+    repeats: int,
+    e2e_max_rows: int,
+    latency: float,
+) -> dict[str, dict[str, float]]:
+    """
+    Benchmarks each pipeline stage for every layout and statement size.
+
+    Args:
+        sizes (list[int]): The statement sizes in rows.
+        layouts (list[str]): The statement layouts to generate.
+        repeats (int): The number of timed runs per benchmark.
+        e2e_max_rows (int): The largest statement run through extract_statement_details.
+        latency (float): The simulated model latency of the fake server in seconds.
+
+    Returns:
+        dict[str, dict[str, float]]: The results keyed by 'stage/layout/rows'.
+    """
+    results = {}
+    for key in ("STATEMENT_CACHE_PATH", "ROW_INDEX_PATH", "MAX_PROMPT_TOKENS"):
+        os.environ.pop(key, None)
+    with (
+        FakeOpenAIServer(latency=latency) as server,
+        tempfile.TemporaryDirectory() as tmp,
+    ):
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        os.environ["OPENAI_API_KEY"] = "benchmark"
+        reset_clients()
+        for layout in layouts:
+            prompt_set = PROMPT_SETS[layout]
+            prompt = PROMPTS[prompt_set]
+            for rows in sizes:
+                statement = generate_statement(layout, rows)
+                path = os.path.join(tmp, f"{layout}_{rows}.csv")
+                with open(path, "w", encoding="utf-8") as file:
+                    file.write(statement)
+                header, *data = generate_rows(layout, rows)
+                descriptions = [row[header.index("Description")] for row in data]
+                ofx_statement = generate_ofx_statement(layout, rows)
+                redacted = remove_pii_columns(statement)
+                messages = _build_messages(prompt, compact_statement_csv(redacted))
+                response = ChatCompletion.model_validate(
+                    build_chat_completion({"messages": messages})
+                )
+                stages = {
+                    "read_csv_file": lambda: read_csv_file(path),
+                    "remove_pii_columns": lambda: remove_pii_columns(statement),
+                    "scrub_text": lambda: [scrub_text(text) for text in descriptions],
+                    "prompt_assembly": lambda: _build_messages(
+                        prompt, compact_statement_csv(redacted)
+                    ),
+                    "response_validation": lambda: _parse_transactions(
+                        response, get_structured_output(prompt["function_schema"])[1]
+                    ),
+                    "parse_ofx": lambda: parse_ofx(ofx_statement),
+                }
+                if rows <= e2e_max_rows:
+                    stages["extract_statement_details"] = lambda: (
+                        extract_statement_details(statement, prompt_set)
+                    )
+                for stage, func in stages.items():
+                    name = f"{stage}/{layout}/{rows}"
+                    results[name] = measure(func, rows, repeats)
+                    print(
+                        f"{name:55s} p50 {results[name]['p50_ms']:>10.3f} ms  "
+                        f"p95 {results[name]['p95_ms']:>10.3f} ms  "
+                        f"{results[name]['rows_per_sec']:>14,.0f} rows/s"
+                    )
+        os.environ.pop("OPENAI_BASE_URL", None)
+        reset_clients()
+    return results
+
+
+def compare_to_baseline(
+    results: dict[str, dict[str, float]],
+    baseline: dict[str, dict[str, float]],
+    tolerance: float,
+) -> list[str]:
+    """
+    Finds benchmarks whose p50 latency regressed beyond the tolerance.
+
+    Args:
+        results (dict[str, dict[str, float]]): The current results.
+        baseline (dict[str, dict[str, float]]): The stored baseline results.
+        tolerance (float): The allowed slowdown as a fraction, e.g. 0.25 for 25%.
+
+    Returns:
+        list[str]: A description of each regression.
+    """
+    regressions = []
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if expected is None:
+            continue
+        limit = expected["p50_ms"] * (1 + tolerance)
+        if result["p50_ms"] > limit:
+            regressions.append(
+                f"{name}: p50 {result['p50_ms']:.3f} ms exceeds baseline "
+                f"{expected['p50_ms']:.3f} ms by more than {tolerance:.0%}"
+            )
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        default="100,1000,10000",
+        help="Comma-separated statement sizes in rows, from 100 up to 1000000.",
+    )
+    parser.add_argument("--layouts", default=",".join(LAYOUTS))
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--e2e-max-rows", type=int, default=10_000)
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="Fake model latency in seconds."
+    )
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=0.5)
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="Store these results as the new baseline instead of comparing.",
+    )
+    args = parser.parse_args(argv)
+    logging.disable(logging.WARNING)
+    results = run_benchmarks(
+        sizes=[int(size) for size in args.sizes.split(",")],
+        layouts=args.layouts.split(","),
+        repeats=args.repeats,
+        e2e_max_rows=args.e2e_max_rows,
+        latency=args.latency,
+    )
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)
+    if args.update_baseline:
+        baseline.update(results)
+        with open(args.baseline, "w", encoding="utf-8") as file:
+            json.dump(dict(sorted(baseline.items())), file, indent=2)
+            file.write("\n")
+        print(f"Updated baseline at {args.baseline}.")
+        return 0
+    regressions = compare_to_baseline(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
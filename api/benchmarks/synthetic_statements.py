@@ -0,0 +1,187 @@
+import csv
+import io
+import random
+from collections.abc import Iterator
+from datetime import date, timedelta
+
+CARD_HEADER = [
+    "Transaction Date",
+    "Posted Date",
+    "Card No.",
+    "Description",
+    "Category",
+    "Debit",
+    "Credit",
+]
+CHECKING_HEADER = [
+    "Details",
+    "Posting Date",
+    "Description",
+    "Amount",
+    "Type",
+    "Balance",
+    "Check or Slip #",
+]
+LAYOUTS = ("card", "checking")
+
+MERCHANTS = [
+    ("SQ *BLUE BOTTLE COFFEE", "Dining"),
+    ("AMAZON MKTPL*2K4TB1", "Merchandise"),
+    ("WHOLEFDS MKT 10234", "Groceries"),
+    ("UBER *TRIP HELP.UBER.COM", "Travel"),
+    ("NETFLIX.COM", "Entertainment"),
+    ("SHELL OIL 57442", "Gas/Automotive"),
+    ("TST* THE PIZZA PLACE", "Dining"),
+    ("SPOTIFY USA", "Entertainment"),
+    ("TARGET 00012345", "Merchandise"),
+    ("CVS/PHARMACY #0421", "Health Care"),
+]
+CHECKING_DEBITS = [
+    "ZELLE PAYMENT TO JOHN SMITH",
+    "ONLINE TRANSFER TO SAV XXXXXX1234",
+    "CAPITAL ONE MOBILE PMT",
+    "PG&E WEB ONLINE",
+    "CHECK 1043",
+    "ATM WITHDRAWAL 000123 5TH AVE",
+]
+CHECKING_CREDITS = [
+    "ACME CORP PAYROLL PPD ID: 123456789",
+    "ZELLE PAYMENT FROM JANE DOE",
+    "IRS TREAS 310 TAX REF",
+]
+
+
+def generate_rows(layout: str, rows: int, seed: int = 0) -> Iterator[list[str]]:
+    """
+    Lazily generates synthetic statement rows, including the header, for a card or checking layout.
+    Card rows carry a 'Card No.' column and checking rows a 'Check or Slip #' column, so redaction has
+    PII to remove.
+
+    Args:
+        layout (str): Either 'card' or 'checking'.
+        rows (int): The number of data rows to generate.
+        seed (int): The random seed, so runs are reproducible.
+
+    Yields:
+        list[str]: The header row, then each data row.
+    """
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown layout '{layout}', expected one of {LAYOUTS}.")
+    rng = random.Random(seed)
+    start = date(2024, 1, 1)
+    balance = 5000.0
+    yield CARD_HEADER if layout == "card" else CHECKING_HEADER
+    for index in range(rows):
+        day = start + timedelta(days=index * 365 // max(rows, 1))
+        if layout == "card":
+            merchant, category = rng.choice(MERCHANTS)
+            amount = f"{rng.uniform(1, 250):.2f}"
+            is_credit = rng.random() < 0.05
+            yield [
+                day.isoformat(),
+                (day + timedelta(days=1)).isoformat(),
+                str(rng.randint(1000, 9999)),
+                merchant,
+                category,
+                "" if is_credit else amount,
+                amount if is_credit else "",
+            ]
+        else:
+            is_credit = rng.random() < 0.2
+            amount = rng.uniform(10, 3000 if is_credit else 400)
+            balance += amount if is_credit else -amount
+            description = rng.choice(CHECKING_CREDITS if is_credit else CHECKING_DEBITS)
+            yield [
+                "CREDIT" if is_credit else "DEBIT",
+                day.strftime("%m/%d/%Y"),
+                description,
+                f"{amount if is_credit else -amount:.2f}",
+                "ACH_CREDIT" if is_credit else "ACH_DEBIT",
+                f"{balance:.2f}",
+                str(rng.randint(1000, 9999)) if description.startswith("CHECK") else "",
+            ]
+
+
+def generate_statement(layout: str, rows: int, seed: int = 0) -> str:
+    """
+    Generates a synthetic statement as CSV text.
+
+    Args:
+        layout (str): Either 'card' or 'checking'.
+        rows (int): The number of data rows to generate.
+        seed (int): The random seed, so runs are reproducible.
+
+    Returns:
+        str: The CSV text, including the header row.
+    """
+    output = io.StringIO()
+    csv.writer(output, lineterminator="\n").writerows(generate_rows(layout, rows, seed))
+    return output.getvalue()
+
+
+def write_statement(path: str, layout: str, rows: int, seed: int = 0) -> None:
+    """
+    Streams a synthetic statement to a CSV file without holding it in memory.
+
+    Args:
+        path (str): The path of the CSV file to write.
+        layout (str): Either 'card' or 'checking'.
+        rows (int): The number of data rows to generate.
+        seed (int): The random seed, so runs are reproducible.
+    """
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        csv.writer(file, lineterminator="\n").writerows(
+            generate_rows(layout, rows, seed)
+        )
+
+
+def generate_ofx_statement(layout: str, rows: int, seed: int = 0) -> str:
+    """
+    Generates the transactions of generate_rows as an OFX 1.x (SGML) statement: a credit card
+    statement for the 'card' layout and a bank statement for 'checking'. The account number is
+    included, so redaction can be checked.
+
+    Args:
+        layout (str): Either 'card' or 'checking'.
+        rows (int): The number of transactions to generate.
+        seed (int): The random seed, so runs are reproducible.
+
+    Returns:
+        str: The OFX text, including the header.
+    """
+    header, *data = generate_rows(layout, rows, seed)
+    is_card = layout == "card"
+    parts = [
+        "OFXHEADER:100\nDATA:OFXSGML\nVERSION:102\nSECURITY:NONE\nENCODING:USASCII\n"
+        "CHARSET:1252\nCOMPRESSION:NONE\nOLDFILEUID:NONE\nNEWFILEUID:NONE\n\n<OFX>\n",
+        "<CREDITCARDMSGSRSV1><CCSTMTTRNRS><CCSTMTRS>\n"
+        if is_card
+        else "<BANKMSGSRSV1><STMTTRNRS><STMTRS>\n",
+        "<CURDEF>USD\n",
+        "<CCACCTFROM><ACCTID>4111111111111111</CCACCTFROM>\n"
+        if is_card
+        else "<BANKACCTFROM><BANKID>121000248<ACCTID>000123456789"
+        "<ACCTTYPE>CHECKING</BANKACCTFROM>\n",
+        "<BANKTRANLIST>\n",
+    ]
+    for index, row in enumerate(data):
+        values = dict(zip(header, row))
+        if is_card:
+            posted = values["Transaction Date"].replace("-", "")
+            amount = f"-{values['Debit']}" if values["Debit"] else values["Credit"]
+        else:
+            month, day, year = values["Posting Date"].split("/")
+            posted = f"{year}{month}{day}"
+            amount = values["Amount"]
+        kind = "CREDIT" if not amount.startswith("-") else "DEBIT"
+        parts.append(
+            f"<STMTTRN><TRNTYPE>{kind}<DTPOSTED>{posted}120000.000[-5:EST]"
+            f"<TRNAMT>{amount}<FITID>{index}"
+            f"<NAME>{values['Description'].replace('&', '&amp;')}</STMTTRN>\n"
+        )
+    parts.append(
+        "</BANKTRANLIST>\n</CCSTMTRS></CCSTMTTRNRS></CREDITCARDMSGSRSV1>\n</OFX>\n"
+        if is_card
+        else "</BANKTRANLIST>\n</STMTRS></STMTTRNRS></BANKMSGSRSV1>\n</OFX>\n"
+    )
+    return "".join(parts)
@@ -1,8 +1,397 @@
-from fastapi import FastAPI
+import asyncio
+import json
+import os
+import re
+import shutil
+import tempfile
+import uuid
+from contextlib import asynccontextmanager
+from dataclasses import asdict
 
-app = FastAPI()
+from fastapi import (
+    FastAPI,
+    File,
+    Form,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    UploadFile,
+)
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from starlette.concurrency import iterate_in_threadpool
+
+from api.utils.admission import (
+    AdmissionController,
+    AdmissionRejectedError,
+    AdmissionTicket,
+)
+
+from api.utils.environment import load_environment
+from api.utils.file_reader import read_csv_file
+from api.utils.job_queue import Job, JobQueue, JobQueueFullError
+from api.utils.merchant_categories import get_merchant_categorizer
+from api.utils.metrics import metrics_enabled, render_metrics
+from api.utils.ofx_parser import (
+    is_ofx,
+    is_ofx_file,
+    iter_ofx_transactions,
+    parse_ofx_file,
+)
+from api.utils.openai_client import aclose_clients
+from api.utils.prompts import PROMPTS
+from api.utils.reconciliation import reconcile_transfers, save_transactions
+from api.utils.recurring import detect_recurring_charges
+from api.utils.setup_logger import log_context
+from api.utils.statement_parser import (
+    categorize_transactions,
+    extract_statement_details_chunked,
+    parse_statement_locally,
+    stream_statement_details,
+)
+from api.utils.transaction_store import get_transaction_store
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+UPLOAD_SUFFIX_PATTERN = re.compile(r"\.[a-z0-9]{1,10}")
+
+
+def _save_upload(source, file_path: str) -> None:
+    """Copies an uploaded file to disk in UPLOAD_CHUNK_SIZE blocks."""
+    with open(file_path, "wb") as out:
+        shutil.copyfileobj(source, out, UPLOAD_CHUNK_SIZE)
+
+
+async def run_parse_job(job: Job) -> list[dict[str, str | float]]:
+    """
+    Parses an uploaded statement file and removes it once the job finishes. OFX and QFX files are
+    parsed locally without any model calls, as are CSV files whose column mapping can be found or
+    inferred; other CSV files are extracted by the model in batches. Transactions are then
+    categorized by merchant. When the upload named an account, the transactions are also saved to
+    the transaction store, and transfers between accounts are reconciled again around their dates.
+    The job's admission slot is released when it finishes.
+
+    Args:
+        job (Job): The job describing the uploaded file and prompt set.
+
+    Returns:
+        list[dict[str, str | float]]: The extracted transactions.
+    """
+    try:
+        if await asyncio.to_thread(is_ofx_file, job.file_path):
+            transactions = await asyncio.to_thread(parse_ofx_file, job.file_path)
+        else:
+            statement_text = await asyncio.to_thread(read_csv_file, job.file_path)
+            transactions = await asyncio.to_thread(
+                parse_statement_locally, statement_text, job.prompt_set
+            )
+            if transactions is None:
+                transactions = await extract_statement_details_chunked(
+                    statement_text=statement_text, prompt_set=job.prompt_set
+                )
+        transactions = await asyncio.to_thread(categorize_transactions, transactions)
+        if job.options.get("account"):
+            await asyncio.to_thread(
+                save_transactions,
+                get_transaction_store(),
+                transactions,
+                job.options["account"],
+            )
+        return transactions
+    finally:
+        os.remove(job.file_path)
+        if job.options.get("admission"):
+            job.options["admission"].release()
+
+
+def format_transaction_stream(statement_text: str, prompt_set: str, sse: bool):
+    """
+    Formats the transactions streamed from a statement as NDJSON lines or server-sent events. OFX and
+    QFX statements are parsed locally instead of streamed from the model. Each transaction is
+    categorized by the local merchant rules only, so the stream never waits on a fallback model call.
+    Errors raised after the response has started are sent as a final error record.
+
+    Args:
+        statement_text (str): The raw statement text.
+        prompt_set (str): The prompt set used for the extraction.
+        sse (bool): Whether to format the stream as server-sent events instead of NDJSON.
+
+    Yields:
+        str: Each formatted record.
+    """
+    try:
+        categorizer = get_merchant_categorizer()
+        transactions = (
+            iter_ofx_transactions([statement_text])
+            if is_ofx(statement_text)
+            else stream_statement_details(statement_text, prompt_set)
+        )
+        for transaction in transactions:
+            categorizer.apply([transaction])
+            data = json.dumps(transaction)
+            yield f"data: {data}\n\n" if sse else f"{data}\n"
+    except (ValueError, RuntimeError) as e:
+        error = json.dumps({"error": str(e)})
+        yield f"event: error\ndata: {error}\n\n" if sse else f"{error}\n"
+        return
+    if sse:
+        yield "event: done\ndata: {}\n\n"
+
+
+async def _release_after(body, ticket: AdmissionTicket):
+    """Streams a response body from a thread and releases the admission slot once it ends."""
+    try:
+        async for chunk in iterate_in_threadpool(body):
+            yield chunk
+    finally:
+        ticket.release()
+
+
+async def admit(request: Request) -> AdmissionTicket:
+    """
+    Admits a statement parse for the client that sent the request, waiting while the global or
+    per-client cap is reached.
+
+    Args:
+        request (Request): The incoming request. Clients are identified by their address.
+
+    Returns:
+        AdmissionTicket: The slot, to release once the parse finishes.
+
+    Raises:
+        HTTPException: 429 with a Retry-After header if the request was not admitted.
+    """
+    client = request.client.host if request.client else "unknown"
+    try:
+        return await app.state.admission.acquire(client)
+    except AdmissionRejectedError as e:
+        raise HTTPException(
+            status_code=429,
+            detail=f"{e}.",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    load_environment()
+    app.state.upload_dir = os.environ.get("UPLOAD_DIR") or os.path.join(
+        tempfile.gettempdir(), "statement_uploads"
+    )
+    os.makedirs(app.state.upload_dir, exist_ok=True)
+    app.state.job_queue = JobQueue(
+        handler=run_parse_job,
+        max_workers=int(os.environ.get("JOB_WORKERS", 4)),
+        max_queued=int(os.environ.get("JOB_QUEUE_SIZE", 100)),
+    )
+    app.state.admission = AdmissionController(
+        max_in_flight=int(os.environ.get("ADMISSION_MAX_IN_FLIGHT", 8)),
+        max_per_client=int(os.environ.get("ADMISSION_MAX_PER_CLIENT", 2)),
+        max_queued=int(os.environ.get("ADMISSION_MAX_QUEUED", 32)),
+        queue_timeout=float(os.environ.get("ADMISSION_QUEUE_TIMEOUT_SECONDS", 10)),
+    )
+    await app.state.job_queue.start()
+    yield
+    await app.state.job_queue.stop()
+    await aclose_clients()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+@app.middleware("http")
+async def attach_request_id(request: Request, call_next):
+    request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    with log_context(request_id=request_id):
+        response = await call_next(request)
+    response.headers["X-Request-ID"] = request_id
+    return response
 
 
 @app.get("/")
 async def root():
     return {"message": "Hello World!"}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    if not metrics_enabled():
+        raise HTTPException(status_code=404, detail="Metrics are disabled.")
+    return PlainTextResponse(
+        render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+@app.get("/admission")
+async def admission_stats():
+    return app.state.admission.stats()
+
+
+@app.post("/statements", status_code=202)
+async def upload_statement(
+    request: Request,
+    file: UploadFile = File(...),
+    prompt_set: str = Form(...),
+    account: str | None = Form(None),
+):
+    if prompt_set not in PROMPTS:
+        raise HTTPException(
+            status_code=400, detail=f"Prompt set '{prompt_set}' not found."
+        )
+    ticket = await admit(request)
+    suffix = os.path.splitext(file.filename or "")[1].lower()
+    if not UPLOAD_SUFFIX_PATTERN.fullmatch(suffix):
+        suffix = ".csv"
+    file_path = os.path.join(app.state.upload_dir, f"{uuid.uuid4().hex}{suffix}")
+    try:
+        await asyncio.to_thread(_save_upload, file.file, file_path)
+        job = app.state.job_queue.submit(
+            file_path=file_path,
+            prompt_set=prompt_set,
+            account=account,
+            admission=ticket,
+        )
+    except JobQueueFullError:
+        ticket.release()
+        os.remove(file_path)
+        raise HTTPException(status_code=503, detail="Job queue is full.")
+    except BaseException:
+        ticket.release()
+        raise
+    return {"job_id": job.id, "status": job.status}
+
+
+@app.post("/statements/stream")
+async def stream_statement(
+    request: Request,
+    file: UploadFile = File(...),
+    prompt_set: str = Form(...),
+    accept: str | None = Header(None),
+):
+    if prompt_set not in PROMPTS:
+        raise HTTPException(
+            status_code=400, detail=f"Prompt set '{prompt_set}' not found."
+        )
+    try:
+        statement_text = (await file.read()).decode("utf-8")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Statement is not UTF-8 encoded.")
+    sse = "text/event-stream" in (accept or "")
+    ticket = await admit(request)
+    return StreamingResponse(
+        _release_after(
+            format_transaction_stream(statement_text, prompt_set, sse), ticket
+        ),
+        media_type="text/event-stream" if sse else "application/x-ndjson",
+    )
+
+
+@app.get("/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    job = app.state.job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return job.to_dict()
+
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    job = app.state.job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    if job.status == "failed":
+        raise HTTPException(status_code=500, detail=job.error)
+    if job.status != "succeeded":
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}.")
+    return {"job_id": job.id, "transactions": job.result}
+
+
+@app.get("/transactions")
+async def list_transactions(
+    account: str | None = None,
+    start_date: str | None = None,
+    end_date: str | None = None,
+    merchant: str | None = None,
+    transaction_type: str | None = None,
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    exclude_transfers: bool = False,
+):
+    transactions = await asyncio.to_thread(
+        get_transaction_store().query_transactions,
+        account=account,
+        start_date=start_date,
+        end_date=end_date,
+        merchant=merchant,
+        transaction_type=transaction_type,
+        limit=limit,
+        offset=offset,
+        exclude_transfers=exclude_transfers,
+    )
+    return {"transactions": transactions}
+
+
+@app.post("/transactions/reconcile")
+async def reconcile_transactions(
+    window_days: int | None = Query(None, ge=0, le=31),
+    min_similarity: float | None = Query(None, ge=0, le=1),
+):
+    matched = await asyncio.to_thread(
+        reconcile_transfers,
+        get_transaction_store(),
+        window_days=window_days,
+        min_similarity=min_similarity,
+    )
+    return {"transfers": matched}
+
+
+@app.get("/transactions/transfers")
+async def list_transfers(
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+):
+    transfers = await asyncio.to_thread(
+        get_transaction_store().query_transfers, limit=limit, offset=offset
+    )
+    return {"transfers": transfers}
+
+
+@app.get("/transactions/recurring")
+async def list_recurring_charges(
+    account: str | None = None,
+    min_occurrences: int | None = Query(None, ge=2),
+    max_amount_variation: float | None = Query(None, ge=0),
+):
+    charges = await asyncio.to_thread(
+        detect_recurring_charges,
+        get_transaction_store(),
+        account=account,
+        min_occurrences=min_occurrences,
+        max_amount_variation=max_amount_variation,
+    )
+    return {"recurring": [asdict(charge) for charge in charges]}
+
+
+@app.get("/transactions/summary")
+async def summarize_transactions(
+    group_by: str = "month",
+    account: str | None = None,
+    start_date: str | None = None,
+    end_date: str | None = None,
+    merchant: str | None = None,
+    transaction_type: str | None = None,
+    exclude_transfers: bool = False,
+):
+    try:
+        groups = await asyncio.to_thread(
+            get_transaction_store().summarize,
+            group_by=group_by,
+            account=account,
+            start_date=start_date,
+            end_date=end_date,
+            merchant=merchant,
+            transaction_type=transaction_type,
+            exclude_transfers=exclude_transfers,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"group_by": group_by, "groups": groups}
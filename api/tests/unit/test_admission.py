@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+
+from api.utils.admission import AdmissionController, AdmissionRejectedError
+
+
+def test_acquire_admits_up_to_the_caps_then_queues():
+    """Requests over the global or per-client cap wait until a slot is released."""
+
+    async def run():
+        controller = AdmissionController(max_in_flight=2, max_per_client=1)
+        first = await controller.acquire("a")
+        await controller.acquire("b")
+        waiting = asyncio.create_task(controller.acquire("c"))
+        await asyncio.sleep(0)
+        assert controller.depth == 1
+        assert not waiting.done()
+        first.release()
+        ticket = await waiting
+        return controller, ticket
+
+    controller, ticket = asyncio.run(run())
+    assert ticket.client == "c"
+    assert controller.stats()["clients"] == {"b": 1, "c": 1}
+    assert controller.stats()["admitted"] == 3
+
+
+def test_release_skips_waiters_of_clients_at_their_cap():
+    """A freed slot goes to the oldest waiter whose client is under its own cap."""
+
+    async def run():
+        controller = AdmissionController(max_in_flight=2, max_per_client=1)
+        first = await controller.acquire("a")
+        await controller.acquire("b")
+        same_client = asyncio.create_task(controller.acquire("b"))
+        other_client = asyncio.create_task(controller.acquire("c"))
+        await asyncio.sleep(0)
+        first.release()
+        first.release()
+        ticket = await asyncio.wait_for(other_client, 1)
+        blocked = not same_client.done()
+        same_client.cancel()
+        await asyncio.gather(same_client, return_exceptions=True)
+        return controller, ticket, blocked
+
+    controller, ticket, blocked = asyncio.run(run())
+    assert ticket.client == "c"
+    assert blocked
+    assert (controller.in_flight, controller.depth) == (2, 0)
+
+
+def test_acquire_rejects_when_queue_is_full():
+    """Requests beyond the queue depth are rejected at once with a retry hint."""
+
+    async def run():
+        controller = AdmissionController(max_in_flight=1, max_queued=0)
+        await controller.acquire("a")
+        with pytest.raises(AdmissionRejectedError, match="queue is full") as excinfo:
+            await controller.acquire("b")
+        return controller, excinfo.value
+
+    controller, error = asyncio.run(run())
+    assert error.retry_after >= 1
+    assert controller.stats()["rejected"] == 1
+
+
+def test_acquire_times_out_and_leaves_the_queue():
+    """A request that waits longer than the timeout is rejected and removed from the queue."""
+
+    async def run():
+        controller = AdmissionController(max_in_flight=1, queue_timeout=0.01)
+        await controller.acquire("a")
+        with pytest.raises(AdmissionRejectedError, match="Timed out"):
+            await controller.acquire("b")
+        return controller
+
+    controller = asyncio.run(run())
+    stats = controller.stats()
+    assert (stats["queued"], stats["timeout"], stats["in_flight"]) == (0, 1, 1)
+    assert stats["average_wait_seconds"] > 0
+
+
+def test_controller_rejects_invalid_limits():
+    """Caps must admit at least one request."""
+    with pytest.raises(ValueError):
+        AdmissionController(max_in_flight=0)
@@ -0,0 +1,137 @@
+import csv
+import io
+
+import pytest
+
+from api.benchmarks.fake_openai_server import FakeOpenAIServer
+from api.benchmarks.import_time import (
+    check_budget,
+    import_module_cold,
+    module_imports,
+    parse_importtime,
+)
+from api.benchmarks.run_benchmarks import compare_to_baseline, percentile
+from api.benchmarks.synthetic_statements import generate_statement
+from api.utils.openai_client import reset_clients
+from api.utils.redact_pii import remove_pii_columns
+from api.utils.statement_parser import (
+    extract_statement_details,
+    stream_statement_details,
+)
+
+IMPORTTIME_REPORT = """import time: self [us] | cumulative | imported package
+import time:       100 |        100 |   site
+import time:        50 |         50 |     json.decoder
+import time:        20 |         70 |   json
+import time:        30 |         30 |   csv
+import time:        10 |        110 | mypackage
+"""
+
+
+@pytest.fixture
+def fake_server(monkeypatch):
+    """Points the shared OpenAI clients at a local fake OpenAI server for the test."""
+    with FakeOpenAIServer() as server:
+        monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+        monkeypatch.setenv("OPENAI_API_KEY", "fake")
+        reset_clients()
+        yield server
+    reset_clients()
+
+
+@pytest.mark.parametrize(
+    "layout, pii_column", [("card", "Card No."), ("checking", "Check or Slip #")]
+)
+def test_generate_statement_rows_and_pii(layout, pii_column):
+    """Tests that generated statements have the requested rows and PII columns to redact."""
+    statement = generate_statement(layout, 25)
+    rows = list(csv.reader(io.StringIO(statement)))
+    assert len(rows) == 26
+    assert pii_column in rows[0]
+    assert pii_column not in remove_pii_columns(statement)
+
+
+def test_generate_statement_is_reproducible():
+    """Tests that the same seed generates the same statement."""
+    assert generate_statement("card", 10, seed=3) == generate_statement(
+        "card", 10, seed=3
+    )
+
+
+def test_generate_statement_unknown_layout():
+    """Tests that an unknown layout raises a ValueError."""
+    with pytest.raises(ValueError):
+        generate_statement("brokerage", 10)
+
+
+def test_extract_statement_details_against_fake_server(fake_server):
+    """Tests an end-to-end extraction against the local fake OpenAI server."""
+    statement = generate_statement("card", 5)
+    transactions = extract_statement_details(
+        statement, "card_account_csv_statement_parser"
+    )
+    assert len(transactions) == 5
+    assert len(fake_server.requests) == 1
+    assert transactions[0]["date"] == "2024-01-01"
+
+
+def test_stream_statement_details_against_fake_server(fake_server):
+    """Tests a streamed extraction against the local fake OpenAI server."""
+    statement = generate_statement("checking", 5)
+    transactions = list(
+        stream_statement_details(statement, "checking_account_csv_statement_parser")
+    )
+    assert len(transactions) == 5
+    assert fake_server.requests[0]["stream"]
+
+
+def test_percentile():
+    """Tests nearest-rank percentiles."""
+    samples = [float(value) for value in range(1, 101)]
+    assert percentile(samples, 0.5) == 50.0
+    assert percentile(samples, 0.99) == 99.0
+    assert percentile([7.0], 0.95) == 7.0
+
+
+def test_compare_to_baseline():
+    """Tests that only p50 slowdowns beyond the tolerance are reported as regressions."""
+    baseline = {"a": {"p50_ms": 10.0}, "b": {"p50_ms": 10.0}}
+    results = {"a": {"p50_ms": 14.0}, "b": {"p50_ms": 16.0}, "c": {"p50_ms": 99.0}}
+    regressions = compare_to_baseline(results, baseline, tolerance=0.5)
+    assert len(regressions) == 1
+    assert regressions[0].startswith("b:")
+
+
+def test_parse_importtime_selects_module_imports():
+    """Tests that the report is parsed with nesting depth and narrowed to one top-level import."""
+    entries = parse_importtime(IMPORTTIME_REPORT)
+    assert entries[0] == ("site", 100, 100, 1)
+    assert entries[-1] == ("mypackage", 10, 110, 0)
+    selected = module_imports(entries, "mypackage")
+    assert [entry[0] for entry in selected] == [
+        "site",
+        "json.decoder",
+        "json",
+        "csv",
+        "mypackage",
+    ]
+    with pytest.raises(ValueError):
+        module_imports(entries, "json")
+
+
+def test_check_budget():
+    """Tests that slow imports and forbidden packages are reported."""
+    result = {"p50_ms": 12.0, "modules": ["csv", "openai._client"]}
+    assert check_budget("m", result, {"budget_ms": 20.0, "forbidden": ["httpx"]}) == []
+    violations = check_budget("m", result, {"budget_ms": 10.0, "forbidden": ["openai"]})
+    assert len(violations) == 2
+
+
+@pytest.mark.parametrize(
+    "module", ["api.utils.redact_pii", "api.utils.statement_parser"]
+)
+def test_lightweight_modules_do_not_import_heavy_dependencies(module):
+    """Tests that redaction and the parser import neither openai nor dotenv."""
+    loaded = {entry[0].split(".")[0] for entry in import_module_cold(module)}
+    assert "openai" not in loaded
+    assert "dotenv" not in loaded
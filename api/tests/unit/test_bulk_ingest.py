@@ -0,0 +1,159 @@
+import asyncio
+import gzip
+import zipfile
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from api.utils.bulk_ingest import (
+    StatementSource,
+    ingest_statements,
+    iter_statement_sources,
+    preprocess_statement,
+)
+from api.utils.file_reader import decode_csv_bytes
+from api.utils.transaction_store import get_transaction_store
+
+PROMPT_SET = "card_account_csv_statement_parser"
+STATEMENT = (
+    "Date,Description,Amount,Card No.\n2024-01-02,Coffee,3.50,4111111111111111\n"
+)
+
+
+def _collect(path, **kwargs):
+    async def run():
+        return [result async for result in ingest_statements(path, **kwargs)]
+
+    return asyncio.run(run())
+
+
+def test_decode_csv_bytes_utf8_and_bom():
+    """UTF-8 statements decode as UTF-8 and a leading byte order mark is dropped."""
+    assert decode_csv_bytes("a,b\nCafé,1\n".encode()) == ("a,b\nCafé,1\n", "utf-8")
+    assert decode_csv_bytes(b"\xef\xbb\xbfa,b\n") == ("a,b\n", "utf-8")
+
+
+def test_decode_csv_bytes_falls_back_to_legacy_encodings():
+    """Statements that are not UTF-8 fall back to cp1252, then latin-1."""
+    assert decode_csv_bytes(b"a,b\n\x80,1\n") == ("a,b\n€,1\n", "cp1252")
+    assert decode_csv_bytes(b"a,b\n\x81,1\n") == ("a,b\n\x81,1\n", "latin-1")
+
+
+def test_iter_statement_sources_walks_directories_and_archives(tmp_path):
+    """CSV files, gzip files and zip members are found in sorted order; other files are skipped."""
+    (tmp_path / "b.csv").write_text(STATEMENT)
+    (tmp_path / "notes.txt").write_text("ignore me")
+    nested = tmp_path / "a"
+    nested.mkdir()
+    with gzip.open(nested / "jan.csv.gz", "wb") as file:
+        file.write(STATEMENT.encode())
+    with zipfile.ZipFile(tmp_path / "c.zip", "w") as archive:
+        archive.writestr("feb.csv", STATEMENT)
+        archive.writestr("readme.md", "ignore me")
+
+    sources = list(iter_statement_sources(str(tmp_path)))
+
+    assert [source.name for source in sources] == [
+        str(tmp_path / "b.csv"),
+        f"{tmp_path / 'c.zip'}!feb.csv",
+        str(nested / "jan.csv.gz"),
+    ]
+    assert all(source.read_bytes() == STATEMENT.encode() for source in sources)
+
+
+def test_preprocess_statement_decodes_and_redacts(tmp_path):
+    """Preprocessing returns the redacted text and the detected encoding."""
+    path = tmp_path / "statement.csv"
+    path.write_bytes(STATEMENT.replace("Coffee", "Caf\xe9").encode("cp1252"))
+
+    text, encoding = preprocess_statement(
+        StatementSource(name=str(path), path=str(path))
+    )
+
+    assert encoding == "cp1252"
+    assert "Café" in text
+    assert "4111111111111111" not in text
+
+
+@patch(
+    "api.utils.bulk_ingest.extract_statement_details_chunked", new_callable=AsyncMock
+)
+def test_ingest_statements_reports_each_file(mock_extract, tmp_path):
+    """Every statement gets a result, and a failing file does not stop the others."""
+    (tmp_path / "one.csv").write_text(STATEMENT)
+    (tmp_path / "two.csv").write_text(STATEMENT)
+    mock_extract.side_effect = [
+        [{"merchant": "Coffee", "date": "2024-01-02", "amount": 3.5}],
+        RuntimeError("Failed to call OpenAI API for chunk 0."),
+    ]
+
+    results = _collect(
+        str(tmp_path), prompt_set=PROMPT_SET, max_processes=1, max_concurrency=1
+    )
+
+    assert sorted(result.status for result in results) == ["failed", "succeeded"]
+    failed = next(result for result in results if result.status == "failed")
+    assert failed.error == "Failed to call OpenAI API for chunk 0."
+    succeeded = next(result for result in results if result.status == "succeeded")
+    assert succeeded.transactions == [
+        {
+            "merchant": "Coffee",
+            "date": "2024-01-02",
+            "amount": 3.5,
+            "normalized_merchant": "COFFEE",
+            "category": "Dining",
+        }
+    ]
+    assert succeeded.encoding == "utf-8"
+    for call in mock_extract.call_args_list:
+        assert call.kwargs["redacted"] is True
+        assert "4111111111111111" not in call.kwargs["statement_text"]
+
+
+@patch(
+    "api.utils.bulk_ingest.extract_statement_details_chunked", new_callable=AsyncMock
+)
+def test_ingest_statements_reconciles_saved_accounts(
+    mock_extract, tmp_path, monkeypatch
+):
+    """Transfers between accounts ingested in separate runs are reconciled."""
+    monkeypatch.setenv("TRANSACTION_STORE_PATH", str(tmp_path / "store.sqlite3"))
+    statements = tmp_path / "statements"
+    statements.mkdir()
+    (statements / "statement.csv").write_text(STATEMENT)
+    mock_extract.side_effect = [
+        [
+            {
+                "merchant": "CARD AUTOPAY",
+                "date": "2024-01-05",
+                "amount": 300.0,
+                "currency": "USD",
+                "transaction_type": "Expense",
+            }
+        ],
+        [
+            {
+                "merchant": "PAYMENT THANK YOU",
+                "date": "2024-01-06",
+                "amount": 300.0,
+                "currency": "USD",
+                "transaction_type": "Payment",
+            }
+        ],
+    ]
+
+    for account in ("checking", "visa"):
+        [result] = _collect(
+            str(statements), prompt_set=PROMPT_SET, account=account, max_processes=1
+        )
+        assert result.inserted == 1
+
+    [transfer] = get_transaction_store().query_transfers()
+    assert transfer["outflow"]["account"] == "checking"
+    assert transfer["inflow"]["account"] == "visa"
+
+
+def test_ingest_statements_rejects_unknown_prompt_set(tmp_path):
+    """An unknown prompt set fails before any file is read."""
+    with pytest.raises(ValueError, match="not found in PROMPTS"):
+        _collect(str(tmp_path), prompt_set="missing")
@@ -0,0 +1,202 @@
+import json
+import os
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from api.utils.column_mapping import (
+    ColumnMappingStore,
+    header_signature,
+    parse_with_column_mapping,
+    validate_column_mapping,
+)
+from api.utils.statement_parser import parse_statement
+
+SINGLE_AMOUNT_MAPPING = {
+    "merchant_column": "Description",
+    "date_column": "Transaction Date",
+    "date_format": "%m/%d/%Y",
+    "amount_column": "Amount",
+    "amount_sign": "expense_negative",
+    "debit_column": None,
+    "credit_column": None,
+    "currency_column": None,
+}
+
+DEBIT_CREDIT_MAPPING = {
+    "merchant_column": "Description",
+    "date_column": "Date",
+    "date_format": "%Y-%m-%d",
+    "amount_column": None,
+    "amount_sign": "expense_positive",
+    "debit_column": "Debit",
+    "credit_column": "Credit",
+    "currency_column": None,
+}
+
+
+def test_header_signature_ignores_case_and_whitespace():
+    """Tests that header signatures are stable across case and whitespace differences."""
+    assert header_signature(["Date", " Amount"]) == header_signature(
+        ["date", "amount "]
+    )
+    assert header_signature(["Date", "Amount"]) != header_signature(["Amount", "Date"])
+
+
+def test_validate_column_mapping_rejects_unknown_column():
+    """Tests that mappings referring to columns missing from the header are rejected."""
+    with pytest.raises(ValueError) as excinfo:
+        validate_column_mapping(SINGLE_AMOUNT_MAPPING, ["Description", "Amount"])
+    assert "Transaction Date" in str(excinfo.value)
+
+
+def test_validate_column_mapping_requires_amount_columns():
+    """Tests that a mapping without any amount column is rejected."""
+    mapping = {**DEBIT_CREDIT_MAPPING, "debit_column": None, "credit_column": None}
+    with pytest.raises(ValueError) as excinfo:
+        validate_column_mapping(mapping, ["Description", "Date", "Debit", "Credit"])
+    assert "amount or debit/credit" in str(excinfo.value)
+
+
+def test_parse_with_column_mapping_card_sign_convention():
+    """Tests that card statements report expenses as positive and refunds as negative."""
+    csv_text = (
+        "Transaction Date,Description,Amount\n"
+        "01/02/2024,Coffee Shop,-4.50\n"
+        "01/03/2024,Refund,12.00\n"
+        "Total,,7.50\n"
+    )
+    result = parse_with_column_mapping(
+        csv_text, SINGLE_AMOUNT_MAPPING, "card_account_csv_statement_parser"
+    )
+    assert result == [
+        {
+            "merchant": "Coffee Shop",
+            "date": "2024-01-02",
+            "amount": 4.5,
+            "currency": "USD",
+            "transaction_type": "Expense",
+        },
+        {
+            "merchant": "Refund",
+            "date": "2024-01-03",
+            "amount": -12.0,
+            "currency": "USD",
+            "transaction_type": "Expense",
+        },
+    ]
+
+
+def test_parse_with_column_mapping_checking_debit_credit():
+    """Tests that checking statements report absolute amounts with Expense/Income types."""
+    csv_text = (
+        "Date,Description,Debit,Credit\n"
+        '2024-01-02,Rent,"$1,200.00",\n'
+        "2024-01-15,Payroll,,2500\n"
+    )
+    result = parse_with_column_mapping(
+        csv_text, DEBIT_CREDIT_MAPPING, "checking_account_csv_statement_parser"
+    )
+    assert [(t["amount"], t["transaction_type"]) for t in result] == [
+        (1200.0, "Expense"),
+        (2500.0, "Income"),
+    ]
+
+
+def test_parse_with_column_mapping_normalizes_header():
+    """Tests that mapped columns are resolved ignoring case and surrounding whitespace."""
+    csv_text = "transaction date, DESCRIPTION ,Amount\n01/02/2024,Coffee Shop,-4.50\n"
+    assert validate_column_mapping(
+        SINGLE_AMOUNT_MAPPING, ["transaction date", " DESCRIPTION ", "Amount"]
+    )
+    result = parse_with_column_mapping(
+        csv_text, SINGLE_AMOUNT_MAPPING, "card_account_csv_statement_parser"
+    )
+    assert [(t["merchant"], t["amount"]) for t in result] == [("Coffee Shop", 4.5)]
+    with pytest.raises(ValueError):
+        parse_with_column_mapping(
+            "Date,Amount\n", SINGLE_AMOUNT_MAPPING, "card_account_csv_statement_parser"
+        )
+
+
+def test_column_mapping_store_round_trip(tmp_path):
+    """Tests that stored mappings persist across store instances."""
+    path = str(tmp_path / "mappings.sqlite3")
+    ColumnMappingStore(path).set("sig", ["Date"], DEBIT_CREDIT_MAPPING)
+    assert ColumnMappingStore(path).get("sig") == DEBIT_CREDIT_MAPPING
+    assert ColumnMappingStore(path).get("other") is None
+
+
+@patch("api.utils.statement_parser.get_openai_client")
+def test_parse_statement_infers_mapping_once(mock_openai, tmp_path, monkeypatch):
+    """Tests that the model is only called for the first statement with a new header signature."""
+    monkeypatch.setenv("COLUMN_MAPPING_PATH", str(tmp_path / "mappings.sqlite3"))
+    mock_client = MagicMock()
+    mock_response = MagicMock()
+    mock_response.choices[0].message.tool_calls[0].function.arguments = json.dumps(
+        SINGLE_AMOUNT_MAPPING
+    )
+    mock_client.chat.completions.create.return_value = mock_response
+    mock_openai.return_value = mock_client
+    os.environ["OPENAI_API_KEY"] = "dummy"
+    statement_text = (
+        "Card No.,Transaction Date,Description,Amount\n"
+        "1234,01/02/2024,Coffee Shop,-4.50\n"
+    )
+    first = parse_statement(statement_text, "card_account_csv_statement_parser")
+    second = parse_statement(statement_text, "card_account_csv_statement_parser")
+    assert first == second
+    assert first[0]["amount"] == 4.5
+    assert mock_client.chat.completions.create.call_count == 1
+    sample = mock_client.chat.completions.create.call_args.kwargs["messages"][1][
+        "content"
+    ]
+    assert "Card No." not in sample
+
+
+@patch("api.utils.statement_parser.extract_statement_details")
+@patch("api.utils.statement_parser.get_openai_client")
+def test_parse_statement_falls_back_on_invalid_mapping(
+    mock_openai, mock_extract, tmp_path, monkeypatch
+):
+    """Tests that an invalid inferred mapping falls back to full model extraction."""
+    monkeypatch.setenv("COLUMN_MAPPING_PATH", str(tmp_path / "mappings.sqlite3"))
+    mock_client = MagicMock()
+    mock_response = MagicMock()
+    mock_response.choices[0].message.tool_calls[0].function.arguments = json.dumps(
+        {**SINGLE_AMOUNT_MAPPING, "merchant_column": "Missing"}
+    )
+    mock_client.chat.completions.create.return_value = mock_response
+    mock_openai.return_value = mock_client
+    mock_extract.return_value = ["fallback"]
+    os.environ["OPENAI_API_KEY"] = "dummy"
+    result = parse_statement(
+        "Transaction Date,Description,Amount\n01/02/2024,Coffee,-4.50\n",
+        "card_account_csv_statement_parser",
+    )
+    assert result == ["fallback"]
+    mock_extract.assert_called_once()
+
+
+@patch("api.utils.statement_parser.extract_statement_details")
+@patch("api.utils.statement_parser.get_openai_client")
+def test_parse_statement_does_not_store_mapping_failing_sample(
+    mock_openai, mock_extract, tmp_path, monkeypatch
+):
+    """Tests that a mapping parsing no sample rows falls back and is not stored."""
+    monkeypatch.setenv("COLUMN_MAPPING_PATH", str(tmp_path / "mappings.sqlite3"))
+    mock_client = MagicMock()
+    mock_response = MagicMock()
+    mock_response.choices[0].message.tool_calls[0].function.arguments = json.dumps(
+        {**SINGLE_AMOUNT_MAPPING, "date_format": "%Y-%m-%d"}
+    )
+    mock_client.chat.completions.create.return_value = mock_response
+    mock_openai.return_value = mock_client
+    mock_extract.return_value = ["fallback"]
+    os.environ["OPENAI_API_KEY"] = "dummy"
+    statement_text = "Transaction Date,Description,Amount\n01/02/2024,Coffee,-4.50\n"
+    for _ in range(2):
+        result = parse_statement(statement_text, "card_account_csv_statement_parser")
+        assert result == ["fallback"]
+    assert mock_client.chat.completions.create.call_count == 2
+    assert mock_extract.call_count == 2
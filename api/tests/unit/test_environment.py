@@ -0,0 +1,13 @@
+from unittest.mock import patch
+
+from api.utils import environment
+from api.utils.environment import load_environment
+
+
+@patch("dotenv.load_dotenv")
+def test_load_environment_loads_dotenv_once(mock_load_dotenv, monkeypatch):
+    """Tests that the .env file is loaded on the first call only."""
+    monkeypatch.setattr(environment, "_loaded", False)
+    load_environment()
+    load_environment()
+    mock_load_dotenv.assert_called_once_with()
@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+from api.utils.job_queue import JobQueue, JobQueueFullError
+
+
+def test_job_queue_runs_jobs_and_records_results():
+    """Tests that submitted jobs are processed by the workers and their results stored."""
+
+    async def handler(job):
+        return f"parsed {job.file_path}"
+
+    async def run():
+        queue = JobQueue(handler=handler, max_workers=2)
+        await queue.start()
+        job = queue.submit(file_path="a.csv", prompt_set="p")
+        assert job.status == "queued"
+        await queue._queue.join()
+        await queue.stop()
+        return job
+
+    job = asyncio.run(run())
+    assert job.status == "succeeded"
+    assert job.result == "parsed a.csv"
+    assert job.finished_at is not None
+
+
+def test_job_queue_records_failures():
+    """Tests that handler exceptions mark the job as failed with the error message."""
+
+    async def handler(job):
+        raise ValueError("bad statement")
+
+    async def run():
+        queue = JobQueue(handler=handler, max_workers=1)
+        await queue.start()
+        job = queue.submit(file_path="a.csv", prompt_set="p")
+        await queue._queue.join()
+        await queue.stop()
+        return job
+
+    job = asyncio.run(run())
+    assert job.status == "failed"
+    assert job.error == "bad statement"
+
+
+def test_job_queue_rejects_when_full():
+    """Tests that submitting beyond max_queued raises JobQueueFullError."""
+
+    async def handler(job):
+        await asyncio.sleep(1)
+
+    async def run():
+        queue = JobQueue(handler=handler, max_workers=1, max_queued=1)
+        await queue.start()
+        queue.submit(file_path="a.csv", prompt_set="p")
+        with pytest.raises(JobQueueFullError):
+            queue.submit(file_path="b.csv", prompt_set="p")
+        await queue.stop()
+
+    asyncio.run(run())
+
+
+def test_job_queue_evicts_oldest_finished_jobs():
+    """Tests that only max_finished finished jobs are retained."""
+
+    async def handler(job):
+        return None
+
+    async def run():
+        queue = JobQueue(handler=handler, max_workers=1, max_finished=1)
+        await queue.start()
+        first = queue.submit(file_path="a.csv", prompt_set="p")
+        await queue._queue.join()
+        second = queue.submit(file_path="b.csv", prompt_set="p")
+        await queue._queue.join()
+        await queue.stop()
+        return queue, first, second
+
+    queue, first, second = asyncio.run(run())
+    assert queue.get(first.id) is None
+    assert queue.get(second.id) is second
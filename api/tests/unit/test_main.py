@@ -0,0 +1,360 @@
+import asyncio
+import json
+import time
+from unittest.mock import AsyncMock, patch
+
+from fastapi.testclient import TestClient
+
+from api.main import app
+from api.utils.ofx_parser import parse_ofx_file
+
+TRANSACTIONS = [
+    {
+        "merchant": "Store",
+        "date": "2024-01-01",
+        "amount": 10.5,
+        "currency": "USD",
+        "transaction_type": "Expense",
+    }
+]
+CATEGORIZED = [
+    {**transaction, "normalized_merchant": "STORE", "category": None}
+    for transaction in TRANSACTIONS
+]
+OFX_STATEMENT = (
+    "OFXHEADER:100\nDATA:OFXSGML\n\n<OFX><CREDITCARDMSGSRSV1><CCSTMTTRNRS><CCSTMTRS>"
+    "<CURDEF>USD<BANKTRANLIST><STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20240101"
+    "<TRNAMT>-10.50<NAME>Store</STMTTRN></BANKTRANLIST></CCSTMTRS></CCSTMTTRNRS>"
+    "</CREDITCARDMSGSRSV1></OFX>\n"
+)
+
+
+def _wait_for_job(client, job_id, timeout=5):
+    """Polls the job status endpoint until the job finishes."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        status = client.get(f"/jobs/{job_id}").json()
+        if status["status"] in ("succeeded", "failed"):
+            return status
+        time.sleep(0.01)
+    raise AssertionError(f"Job {job_id} did not finish in time.")
+
+
+def test_root():
+    """Tests the hello world route."""
+    with TestClient(app) as client:
+        response = client.get("/")
+    assert response.status_code == 200
+    assert response.json() == {"message": "Hello World!"}
+
+
+def test_request_id_header():
+    """Tests that the request id is taken from X-Request-ID, or generated, and echoed back."""
+    with TestClient(app) as client:
+        given = client.get("/", headers={"X-Request-ID": "abc123"})
+        generated = client.get("/")
+    assert given.headers["X-Request-ID"] == "abc123"
+    assert len(generated.headers["X-Request-ID"]) == 32
+
+
+@patch("api.main.parse_statement_locally", return_value=None)
+@patch("api.main.extract_statement_details_chunked", new_callable=AsyncMock)
+def test_upload_statement_runs_job(mock_extract, mock_local, tmp_path, monkeypatch):
+    """Tests that an uploaded statement is parsed in the background and its result exposed."""
+    monkeypatch.setenv("UPLOAD_DIR", str(tmp_path))
+    mock_extract.return_value = [dict(t) for t in TRANSACTIONS]
+    with TestClient(app) as client:
+        response = client.post(
+            "/statements",
+            files={"file": ("statement.csv", b"Date,Amount\n2024-01-01,10.5\n")},
+            data={"prompt_set": "card_account_csv_statement_parser"},
+        )
+        assert response.status_code == 202
+        job_id = response.json()["job_id"]
+        status = _wait_for_job(client, job_id)
+        result = client.get(f"/jobs/{job_id}/result")
+    assert status["status"] == "succeeded"
+    assert result.json() == {"job_id": job_id, "transactions": CATEGORIZED}
+    mock_extract.assert_awaited_once_with(
+        statement_text="Date,Amount\n2024-01-01,10.5\n",
+        prompt_set="card_account_csv_statement_parser",
+    )
+    assert list(tmp_path.iterdir()) == []
+
+
+@patch("api.main.parse_statement_locally")
+@patch("api.main.extract_statement_details_chunked", new_callable=AsyncMock)
+def test_upload_statement_with_known_layout_skips_model(
+    mock_extract, mock_local, tmp_path, monkeypatch
+):
+    """Tests that CSV uploads with a mappable layout are parsed without batch extraction."""
+    monkeypatch.setenv("UPLOAD_DIR", str(tmp_path))
+    mock_local.return_value = [dict(t) for t in TRANSACTIONS]
+    with TestClient(app) as client:
+        job_id = client.post(
+            "/statements",
+            files={"file": ("statement.csv", b"Date,Amount\n2024-01-01,10.5\n")},
+            data={"prompt_set": "card_account_csv_statement_parser"},
+        ).json()["job_id"]
+        status = _wait_for_job(client, job_id)
+        result = client.get(f"/jobs/{job_id}/result")
+    assert status["status"] == "succeeded"
+    assert result.json()["transactions"] == CATEGORIZED
+    mock_local.assert_called_once_with(
+        "Date,Amount\n2024-01-01,10.5\n", "card_account_csv_statement_parser"
+    )
+    mock_extract.assert_not_awaited()
+
+
+@patch("api.main.parse_ofx_file", wraps=parse_ofx_file)
+@patch("api.main.extract_statement_details_chunked", new_callable=AsyncMock)
+def test_upload_ofx_statement_skips_model(
+    mock_extract, mock_parse_ofx, tmp_path, monkeypatch
+):
+    """Tests that OFX uploads keep their extension and are parsed without calling the model."""
+    monkeypatch.setenv("UPLOAD_DIR", str(tmp_path))
+    with TestClient(app) as client:
+        response = client.post(
+            "/statements",
+            files={"file": ("statement.qfx", OFX_STATEMENT.encode())},
+            data={"prompt_set": "card_account_csv_statement_parser"},
+        )
+        job_id = response.json()["job_id"]
+        status = _wait_for_job(client, job_id)
+        result = client.get(f"/jobs/{job_id}/result")
+    assert status["status"] == "succeeded"
+    assert result.json()["transactions"] == CATEGORIZED
+    mock_extract.assert_not_awaited()
+    assert mock_parse_ofx.call_args.args[0].endswith(".qfx")
+    assert list(tmp_path.iterdir()) == []
+
+
+@patch("api.main.parse_statement_locally", return_value=None)
+@patch("api.main.extract_statement_details_chunked", new_callable=AsyncMock)
+def test_upload_statement_failed_job(mock_extract, mock_local, tmp_path, monkeypatch):
+    """Tests that a failed job reports its error from the status and result endpoints."""
+    monkeypatch.setenv("UPLOAD_DIR", str(tmp_path))
+    mock_extract.side_effect = RuntimeError("Failed to call OpenAI API.")
+    with TestClient(app) as client:
+        job_id = client.post(
+            "/statements",
+            files={"file": ("statement.csv", b"Date,Amount\n")},
+            data={"prompt_set": "card_account_csv_statement_parser"},
+        ).json()["job_id"]
+        status = _wait_for_job(client, job_id)
+        result = client.get(f"/jobs/{job_id}/result")
+    assert status["error"] == "Failed to call OpenAI API."
+    assert result.status_code == 500
+
+
+def test_upload_statement_rejected_when_saturated(tmp_path, monkeypatch):
+    """Tests that uploads beyond the admission caps get 429 with a Retry-After header."""
+    monkeypatch.setenv("UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setenv("ADMISSION_MAX_PER_CLIENT", "1")
+    monkeypatch.setenv("ADMISSION_MAX_QUEUED", "0")
+    with TestClient(app) as client:
+        ticket = asyncio.run(app.state.admission.acquire("testclient"))
+        response = client.post(
+            "/statements",
+            files={"file": ("statement.csv", b"Date,Amount\n2024-01-01,10.5\n")},
+            data={"prompt_set": "card_account_csv_statement_parser"},
+        )
+        stats = client.get("/admission").json()
+        ticket.release()
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert stats["in_flight"] == 1
+    assert stats["rejected"] == 1
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_upload_statement_invalid_prompt_set(tmp_path, monkeypatch):
+    """Tests that unknown prompt sets are rejected before the upload is queued."""
+    monkeypatch.setenv("UPLOAD_DIR", str(tmp_path))
+    with TestClient(app) as client:
+        response = client.post(
+            "/statements",
+            files={"file": ("statement.csv", b"Date,Amount\n")},
+            data={"prompt_set": "nonexistent"},
+        )
+    assert response.status_code == 400
+
+
+def test_get_job_status_unknown_job():
+    """Tests that unknown job ids return 404."""
+    with TestClient(app) as client:
+        assert client.get("/jobs/missing").status_code == 404
+        assert client.get("/jobs/missing/result").status_code == 404
+
+
+@patch("api.main.parse_statement_locally", return_value=None)
+@patch("api.main.extract_statement_details_chunked", new_callable=AsyncMock)
+def test_upload_statement_with_account_stores_transactions(
+    mock_extract, mock_local, tmp_path, monkeypatch
+):
+    """Tests that uploads naming an account are saved and can be listed and summarized."""
+    monkeypatch.setenv("UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setenv("TRANSACTION_STORE_PATH", str(tmp_path / "store.sqlite3"))
+    mock_extract.return_value = [dict(t) for t in TRANSACTIONS]
+    with TestClient(app) as client:
+        job_id = client.post(
+            "/statements",
+            files={"file": ("statement.csv", b"Date,Amount\n2024-01-01,10.5\n")},
+            data={"prompt_set": "card_account_csv_statement_parser", "account": "visa"},
+        ).json()["job_id"]
+        _wait_for_job(client, job_id)
+        listing = client.get("/transactions", params={"account": "visa"}).json()
+        summary = client.get(
+            "/transactions/summary", params={"group_by": "merchant"}
+        ).json()
+        invalid = client.get("/transactions/summary", params={"group_by": "bogus"})
+    assert listing["transactions"][0]["merchant"] == "Store"
+    assert listing["transactions"][0]["account"] == "visa"
+    assert summary["groups"] == [{"merchant": "Store", "total": 10.5, "count": 1}]
+    assert invalid.status_code == 400
+
+
+@patch("api.main.parse_statement_locally", return_value=None)
+@patch("api.main.extract_statement_details_chunked", new_callable=AsyncMock)
+def test_card_payment_is_reconciled_across_uploads(
+    mock_extract, mock_local, tmp_path, monkeypatch
+):
+    """Tests that a card payment seen in both statements is paired and can be excluded from totals."""
+    monkeypatch.setenv("UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setenv("TRANSACTION_STORE_PATH", str(tmp_path / "store.sqlite3"))
+    mock_extract.side_effect = [
+        [
+            {
+                "merchant": "CARD AUTOPAY",
+                "date": "2024-01-05",
+                "amount": 300.0,
+                "currency": "USD",
+                "transaction_type": "Expense",
+            }
+        ],
+        [
+            {
+                "merchant": "PAYMENT THANK YOU",
+                "date": "2024-01-06",
+                "amount": 300.0,
+                "currency": "USD",
+                "transaction_type": "Payment",
+            }
+        ],
+    ]
+    with TestClient(app) as client:
+        for account in ("checking", "visa"):
+            job_id = client.post(
+                "/statements",
+                files={"file": ("statement.csv", b"Date,Amount\n2024-01-05,300\n")},
+                data={
+                    "prompt_set": "checking_account_csv_statement_parser",
+                    "account": account,
+                },
+            ).json()["job_id"]
+            _wait_for_job(client, job_id)
+        transfers = client.get("/transactions/transfers").json()["transfers"]
+        summary = client.get(
+            "/transactions/summary", params={"exclude_transfers": True}
+        ).json()
+        rerun = client.post("/transactions/reconcile", params={"window_days": 0})
+    assert transfers[0]["outflow"]["account"] == "checking"
+    assert transfers[0]["inflow"]["account"] == "visa"
+    assert summary["groups"] == []
+    assert rerun.json() == {"transfers": 0}
+
+
+@patch("api.main.parse_statement_locally", return_value=None)
+@patch("api.main.extract_statement_details_chunked", new_callable=AsyncMock)
+def test_recurring_charges_route(mock_extract, mock_local, tmp_path, monkeypatch):
+    """Tests that monthly charges saved from an upload are listed as recurring."""
+    monkeypatch.setenv("UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setenv("TRANSACTION_STORE_PATH", str(tmp_path / "store.sqlite3"))
+    mock_extract.return_value = [
+        {**TRANSACTIONS[0], "merchant": "SPOTIFY USA", "date": day}
+        for day in ("2024-01-01", "2024-02-01", "2024-03-01")
+    ]
+    with TestClient(app) as client:
+        job_id = client.post(
+            "/statements",
+            files={"file": ("statement.csv", b"Date,Amount\n2024-01-01,10.5\n")},
+            data={"prompt_set": "card_account_csv_statement_parser", "account": "visa"},
+        ).json()["job_id"]
+        _wait_for_job(client, job_id)
+        recurring = client.get("/transactions/recurring").json()["recurring"]
+        invalid = client.get("/transactions/recurring", params={"min_occurrences": 1})
+    assert [(c["merchant"], c["cadence"], c["amount"]) for c in recurring] == [
+        ("SPOTIFY USA", "monthly", 10.5)
+    ]
+    assert invalid.status_code == 422
+
+
+def test_metrics_route(monkeypatch):
+    """Tests that /metrics exposes Prometheus text and returns 404 when metrics are disabled."""
+    with TestClient(app) as client:
+        response = client.get("/metrics")
+        monkeypatch.setattr("api.utils.metrics._enabled", False)
+        disabled = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "# TYPE statement_stage_duration_seconds histogram" in response.text
+    assert disabled.status_code == 404
+
+
+@patch("api.main.stream_statement_details")
+def test_stream_statement_ndjson(mock_stream):
+    """Tests that streamed transactions are returned as NDJSON lines and the slot is released."""
+    mock_stream.return_value = iter([dict(t) for t in TRANSACTIONS * 2])
+    with TestClient(app) as client:
+        response = client.post(
+            "/statements/stream",
+            files={"file": ("statement.csv", b"Date,Amount\n2024-01-01,10.5\n")},
+            data={"prompt_set": "card_account_csv_statement_parser"},
+        )
+        stats = client.get("/admission").json()
+    assert response.status_code == 200
+    assert stats["in_flight"] == 0
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert [json.loads(line) for line in response.text.splitlines()] == CATEGORIZED * 2
+
+
+@patch("api.main.stream_statement_details")
+def test_stream_ofx_statement_skips_model(mock_stream):
+    """Tests that OFX statements are streamed from the local parser."""
+    with TestClient(app) as client:
+        response = client.post(
+            "/statements/stream",
+            files={"file": ("statement.ofx", OFX_STATEMENT.encode())},
+            data={"prompt_set": "card_account_csv_statement_parser"},
+        )
+    assert [json.loads(line) for line in response.text.splitlines()] == CATEGORIZED
+    mock_stream.assert_not_called()
+
+
+@patch("api.main.stream_statement_details")
+def test_stream_statement_sse_reports_errors(mock_stream):
+    """Tests that server-sent events carry each transaction and a final error event."""
+
+    def transactions(statement_text, prompt_set):
+        yield dict(TRANSACTIONS[0])
+        raise RuntimeError("Failed to call OpenAI API.")
+
+    mock_stream.side_effect = transactions
+    with TestClient(app) as client:
+        response = client.post(
+            "/statements/stream",
+            files={"file": ("statement.csv", b"Date,Amount\n2024-01-01,10.5\n")},
+            data={"prompt_set": "card_account_csv_statement_parser"},
+            headers={"Accept": "text/event-stream"},
+        )
+        invalid = client.post(
+            "/statements/stream",
+            files={"file": ("statement.csv", b"Date\n")},
+            data={"prompt_set": "bogus"},
+        )
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.text == (
+        f"data: {json.dumps(CATEGORIZED[0])}\n\n"
+        'event: error\ndata: {"error": "Failed to call OpenAI API."}\n\n'
+    )
+    assert invalid.status_code == 400
@@ -0,0 +1,163 @@
+import json
+import os
+from unittest.mock import MagicMock, patch
+
+import pytest
+from openai import OpenAIError
+
+from api.utils.merchant_categories import (
+    DEFAULT_RULES_PATH,
+    MerchantCategorizer,
+    MerchantCategoryStore,
+    MerchantTrie,
+    load_merchant_rules,
+    normalize_merchant,
+)
+from api.utils.statement_parser import categorize_transactions
+
+
+@pytest.mark.parametrize(
+    "merchant, expected",
+    [
+        ("SQ *COFFEE 1234 SEATTLE WA", "COFFEE"),
+        ("TST* THE PIZZA PLACE", "THE PIZZA PLACE"),
+        ("PAYPAL *STEAMGAMES", "STEAMGAMES"),
+        ("AMAZON MKTPL*2K4TB1", "AMAZON MKTPL"),
+        ("NETFLIX.COM", "NETFLIX"),
+        ("CVS/PHARMACY #0421", "CVS PHARMACY"),
+        ("TARGET 00012345", "TARGET"),
+        ("ONLINE TRANSFER TO SAV XXXXXX1234", "ONLINE TRANSFER TO SAV"),
+        ("Blue Bottle Coffee Oakland CA", "BLUE BOTTLE COFFEE"),
+        ("PG&E WEB ONLINE", "PG&E WEB ONLINE"),
+        ("ATM WITHDRAWAL 000123 5TH AVE", "ATM WITHDRAWAL 5TH AVE"),
+        ("#1234", ""),
+    ],
+)
+def test_normalize_merchant(merchant, expected):
+    """Tests that processor prefixes, reference codes, store numbers and locations are removed."""
+    assert normalize_merchant(merchant) == expected
+
+
+def test_merchant_trie_prefers_earliest_then_longest_match():
+    """Tests that rules match at any word, earliest first and then longest."""
+    trie = MerchantTrie()
+    trie.insert("UBER", "Travel")
+    trie.insert("Uber Eats", "Dining")
+    trie.insert("PAYROLL", "Income")
+    trie.insert("FEE", "Fees")
+    assert trie.size == 4
+    assert trie.match("UBER TRIP") == "Travel"
+    assert trie.match("UBER EATS PENDING") == "Dining"
+    assert trie.match("ACME CORP PAYROLL") == "Income"
+    assert trie.match("UBER LATE FEE") == "Travel"
+    assert trie.match("UBERX") is None
+    assert trie.match("") is None
+    with pytest.raises(ValueError):
+        trie.insert("#123", "Other")
+
+
+def test_default_rules_cover_synthetic_merchants():
+    """Tests that the built-in rules categorize common card and checking descriptions."""
+    categorizer = MerchantCategorizer(load_merchant_rules(DEFAULT_RULES_PATH))
+    assert categorizer.categorize("SQ *BLUE BOTTLE COFFEE") == (
+        "BLUE BOTTLE COFFEE",
+        "Dining",
+    )
+    assert categorizer.categorize("WHOLEFDS MKT 10234")[1] == "Groceries"
+    assert categorizer.categorize("UBER *TRIP HELP.UBER.COM")[1] == "Travel"
+    assert categorizer.categorize("SHELL OIL 57442")[1] == "Gas/Automotive"
+    assert categorizer.categorize("ACME CORP PAYROLL PPD ID: 123456789")[1] == "Income"
+    assert categorizer.categorize("CHECK 1043") == ("CHECK", None)
+
+
+def test_load_merchant_rules_rejects_invalid_file(tmp_path):
+    """Tests that a rule file that is not an object of name lists is rejected."""
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps({"Dining": "COFFEE"}))
+    with pytest.raises(ValueError):
+        load_merchant_rules(str(path))
+
+
+def test_categorizer_memoizes_and_learns(tmp_path):
+    """Tests that results are memoized per description and learned categories persist."""
+    trie = MerchantTrie()
+    trie.insert("COFFEE", "Dining")
+    path = str(tmp_path / "categories.sqlite3")
+    categorizer = MerchantCategorizer(trie, MerchantCategoryStore(path), memo_size=2)
+    transactions = [
+        {"merchant": "SQ *COFFEE 1234"},
+        {"merchant": "ACME WIDGETS #12"},
+        {"merchant": "ACME WIDGETS #13"},
+    ]
+    assert categorizer.apply(transactions) == ["ACME WIDGETS"]
+    assert [t["category"] for t in transactions] == ["Dining", None, None]
+    assert categorizer.categorize.cache_info().maxsize == 2
+    categorizer.learn({"ACME WIDGETS": "Merchandise"})
+    assert categorizer.categorize("ACME WIDGETS #12")[1] == "Merchandise"
+    assert MerchantCategoryStore(path).get("ACME WIDGETS") == "Merchandise"
+    with pytest.raises(RuntimeError):
+        MerchantCategorizer(trie).learn({"ACME WIDGETS": "Merchandise"})
+
+
+def _category_response(answers):
+    """Builds a mock chat completion response carrying the given merchant categories."""
+    mock_response = MagicMock()
+    mock_response.choices[0].message.tool_calls[0].function.arguments = json.dumps(
+        {"merchants": answers}
+    )
+    return mock_response
+
+
+@patch("api.utils.statement_parser.get_openai_client")
+def test_categorize_transactions_asks_model_once_per_unknown_merchant(
+    mock_openai, tmp_path, monkeypatch
+):
+    """Tests that unknown merchants are batched to the model once and its answers persisted."""
+    monkeypatch.setenv("MERCHANT_CATEGORY_PATH", str(tmp_path / "categories.sqlite3"))
+    mock_client = MagicMock()
+    mock_client.chat.completions.create.return_value = _category_response(
+        [
+            {"merchant": "ACME WIDGETS", "category": "Merchandise"},
+            {"merchant": "GLOBEX", "category": "Not a category"},
+            {"merchant": "NOT ASKED", "category": "Dining"},
+        ]
+    )
+    mock_openai.return_value = mock_client
+    os.environ["OPENAI_API_KEY"] = "dummy"
+    transactions = [
+        {"merchant": "NETFLIX.COM"},
+        {"merchant": "ACME WIDGETS #12"},
+        {"merchant": "GLOBEX 5555"},
+        {"merchant": "ACME WIDGETS #13"},
+    ]
+    categorize_transactions(transactions, use_model=True)
+    assert [t["category"] for t in transactions] == [
+        "Entertainment",
+        "Merchandise",
+        None,
+        "Merchandise",
+    ]
+    sent = mock_client.chat.completions.create.call_args.kwargs["messages"][-1]
+    assert sent["content"] == "ACME WIDGETS\nGLOBEX"
+    again = [{"merchant": "ACME WIDGETS #99"}]
+    categorize_transactions(again, use_model=True)
+    assert again[0]["category"] == "Merchandise"
+    assert mock_client.chat.completions.create.call_count == 1
+
+
+@patch("api.utils.statement_parser.get_openai_client")
+def test_categorize_transactions_without_model(mock_openai, tmp_path, monkeypatch):
+    """Tests that the model is not called unless enabled, and that its failures are tolerated."""
+    monkeypatch.setenv("MERCHANT_CATEGORY_PATH", str(tmp_path / "categories.sqlite3"))
+    monkeypatch.delenv("MERCHANT_CATEGORY_FALLBACK", raising=False)
+    mock_client = MagicMock()
+    mock_client.chat.completions.create.side_effect = OpenAIError("fail")
+    mock_openai.return_value = mock_client
+    os.environ["OPENAI_API_KEY"] = "dummy"
+    transactions = [{"merchant": "ACME WIDGETS"}]
+    categorize_transactions(transactions)
+    mock_client.chat.completions.create.assert_not_called()
+    monkeypatch.setenv("MERCHANT_CATEGORY_FALLBACK", "true")
+    categorize_transactions(transactions)
+    assert mock_client.chat.completions.create.call_count == 1
+    assert transactions[0]["category"] is None
@@ -0,0 +1,115 @@
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from api.utils import metrics
+from api.utils.metrics import (
+    MODEL_TIER_SECONDS,
+    OPENAI_TOKENS,
+    STAGE_SECONDS,
+    STATEMENT_ROWS,
+    Counter,
+    Histogram,
+    observe_statement_rows,
+    record_usage,
+    render_metrics,
+    span,
+)
+from api.utils.statement_parser import extract_statement_details
+
+PROMPT_SET = "card_account_csv_statement_parser"
+
+
+@pytest.fixture(autouse=True)
+def enabled_metrics(monkeypatch):
+    """Records metrics from a clean slate for each test."""
+    monkeypatch.setattr(metrics, "_enabled", True)
+    metrics.reset_metrics()
+    yield
+    metrics.reset_metrics()
+
+
+def test_histogram_render_is_cumulative():
+    """Tests that histogram buckets are cumulative and include +Inf, sum and count."""
+    histogram = Histogram("latency", "Latency.", buckets=(1, 5), labelnames=("stage",))
+    for value in (0.5, 1, 3, 10):
+        histogram.observe(value, "read")
+    lines = histogram.render()
+    assert 'latency_bucket{stage="read",le="1"} 2' in lines
+    assert 'latency_bucket{stage="read",le="5"} 3' in lines
+    assert 'latency_bucket{stage="read",le="+Inf"} 4' in lines
+    assert 'latency_sum{stage="read"} 14.5' in lines
+    assert 'latency_count{stage="read"} 4' in lines
+
+
+def test_counter_escapes_label_values():
+    """Tests that quotes in label values are escaped."""
+    counter = Counter("hits", "Hits.", labelnames=("name",))
+    counter.inc(2, 'a"b')
+    assert 'hits{name="a\\"b"} 2' in counter.render()
+
+
+def test_span_records_only_when_enabled(monkeypatch):
+    """Tests that spans record durations when enabled and are no-ops when disabled."""
+    with span("api_call"):
+        pass
+    monkeypatch.setattr(metrics, "_enabled", False)
+    with span("api_call"):
+        pass
+    observe_statement_rows("a\n1\n")
+    assert STAGE_SECONDS.count("api_call") == 1
+    assert STATEMENT_ROWS.count() == 0
+
+
+def test_observe_statement_rows_excludes_header():
+    """Tests that statement rows are counted without the header, blank rows or quoted newlines."""
+    observe_statement_rows("a,b\n1,2\n3,4\n")
+    observe_statement_rows("a,b\n1,2")
+    observe_statement_rows('a,b\n1,"two\nlines"\n\n3,4\n')
+    assert STATEMENT_ROWS.count() == 3
+    assert "statement_rows_sum 5" in render_metrics()
+
+
+def test_record_usage_counts_cached_tokens():
+    """Tests that prompt, completion, cached and uncached tokens are counted per prompt set."""
+    response = MagicMock()
+    response.usage.prompt_tokens = 100
+    response.usage.completion_tokens = 20
+    response.usage.prompt_tokens_details.cached_tokens = 64
+    record_usage(PROMPT_SET, response)
+    record_usage(PROMPT_SET, MagicMock())
+    assert OPENAI_TOKENS.value(PROMPT_SET, "prompt") == 100
+    assert OPENAI_TOKENS.value(PROMPT_SET, "completion") == 20
+    assert OPENAI_TOKENS.value(PROMPT_SET, "cached") == 64
+    assert OPENAI_TOKENS.value(PROMPT_SET, "uncached") == 36
+
+
+@patch.dict("os.environ", {"OPENAI_API_KEY": "fake_key"})
+@patch("api.utils.statement_parser.get_openai_client")
+def test_extract_statement_details_records_stages(mock_get_client):
+    """Tests that each parsing stage of an extraction is timed."""
+    response = MagicMock()
+    response.choices[0].message.tool_calls[0].function.arguments = json.dumps(
+        {
+            "transactions": [
+                {
+                    "merchant": "Coffee",
+                    "date": "2024-01-01",
+                    "amount": 4.5,
+                    "currency": "USD",
+                    "transaction_type": "Expense",
+                }
+            ]
+        }
+    )
+    response.usage.prompt_tokens = 50
+    mock_get_client.return_value.chat.completions.create.return_value = response
+    extract_statement_details(
+        "Date,Description,Amount\n2024-01-01,Coffee,4.50\n", PROMPT_SET
+    )
+    for stage in ("remove_pii_columns", "prompt_build", "api_call", "validation"):
+        assert STAGE_SECONDS.count(stage) == 1
+    assert STATEMENT_ROWS.count() == 1
+    assert OPENAI_TOKENS.value(PROMPT_SET, "prompt") == 50
+    assert MODEL_TIER_SECONDS.count(PROMPT_SET, "gpt-5-nano", "success") == 1
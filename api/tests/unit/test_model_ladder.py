@@ -0,0 +1,138 @@
+import asyncio
+import json
+import os
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from api.utils import metrics
+from api.utils.metrics import MODEL_TIER_SECONDS
+from api.utils.model_ladder import (
+    DEFAULT_MODEL_LADDER,
+    check_transactions,
+    count_data_rows,
+    get_model_ladder,
+)
+from api.utils.statement_parser import (
+    extract_statement_details,
+    extract_statement_details_chunked,
+)
+
+PROMPT_SET = "card_account_csv_statement_parser"
+STATEMENT = "Date,Description,Amount\n2024-01-01,Coffee,4.50\n2024-01-02,Lunch,12.00\n"
+
+
+def _transaction(merchant, **extra):
+    return {
+        "merchant": merchant,
+        "date": "2024-01-01",
+        "amount": 1.0,
+        "currency": "USD",
+        "transaction_type": "Expense",
+        **extra,
+    }
+
+
+def _response(transactions):
+    """Builds a mock chat completion response carrying the given transactions."""
+    response = MagicMock()
+    response.choices[0].message.tool_calls[0].function.arguments = json.dumps(
+        {"transactions": transactions}
+    )
+    return response
+
+
+def test_get_model_ladder_precedence(monkeypatch):
+    """Tests that a per-prompt-set ladder overrides the global ladder and the default."""
+    monkeypatch.delenv("MODEL_LADDER", raising=False)
+    monkeypatch.delenv(f"MODEL_LADDER_{PROMPT_SET.upper()}", raising=False)
+    assert get_model_ladder(PROMPT_SET) == DEFAULT_MODEL_LADDER
+    monkeypatch.setenv("MODEL_LADDER", "a, b")
+    assert get_model_ladder(PROMPT_SET) == ("a", "b")
+    monkeypatch.setenv(f"MODEL_LADDER_{PROMPT_SET.upper()}", "c")
+    assert get_model_ladder(PROMPT_SET) == ("c",)
+    monkeypatch.setenv("MODEL_LADDER", " , ")
+    with pytest.raises(ValueError, match="does not name any models"):
+        get_model_ladder("checking_account_csv_statement_parser")
+
+
+def test_count_data_rows_skips_header_and_blank_rows():
+    """Tests that only non-blank rows after the header are counted."""
+    assert count_data_rows("Date,Amount\n1,2\n,\n\n3,4\n") == 2
+    assert count_data_rows("") == 0
+
+
+def test_check_transactions(monkeypatch):
+    """Tests the row coverage and row id sanity checks."""
+    monkeypatch.setenv("MIN_ROW_COVERAGE", "0.5")
+    check_transactions([_transaction("A")], expected_rows=2)
+    with pytest.raises(ValueError, match="expected at least 2"):
+        check_transactions([_transaction("A")], expected_rows=4)
+    with pytest.raises(ValueError, match="unknown row 7"):
+        check_transactions(
+            [_transaction("A", row_id=7)], expected_rows=1, row_ids=frozenset({0})
+        )
+
+
+@patch.dict(os.environ, {"OPENAI_API_KEY": "dummy"})
+@patch("api.utils.statement_parser.get_openai_client")
+def test_extract_statement_details_escalates_invalid_output(mock_openai, monkeypatch):
+    """Tests that output failing validation or row coverage is retried on the next model."""
+    monkeypatch.setattr(metrics, "_enabled", True)
+    metrics.reset_metrics()
+    monkeypatch.setenv("MODEL_LADDER", "small,medium,large")
+    create = mock_openai.return_value.chat.completions.create
+    create.side_effect = [
+        _response([{"merchant": "Coffee"}]),
+        _response([]),
+        _response([_transaction("Coffee"), _transaction("Lunch")]),
+    ]
+    result = extract_statement_details(STATEMENT, PROMPT_SET)
+    assert [t["merchant"] for t in result] == ["Coffee", "Lunch"]
+    assert [call.kwargs["model"] for call in create.call_args_list] == [
+        "small",
+        "medium",
+        "large",
+    ]
+    assert MODEL_TIER_SECONDS.count(PROMPT_SET, "small", "invalid") == 1
+    assert MODEL_TIER_SECONDS.count(PROMPT_SET, "medium", "invalid") == 1
+    assert MODEL_TIER_SECONDS.count(PROMPT_SET, "large", "success") == 1
+
+
+@patch.dict(os.environ, {"OPENAI_API_KEY": "dummy", "MODEL_LADDER": "small,large"})
+@patch("api.utils.statement_parser.get_openai_client")
+def test_extract_statement_details_fails_when_every_tier_is_invalid(mock_openai):
+    """Tests that a ValueError is raised once the last model's output is also invalid."""
+    create = mock_openai.return_value.chat.completions.create
+    create.return_value = _response([])
+    with pytest.raises(ValueError, match="expected at least"):
+        extract_statement_details(STATEMENT, PROMPT_SET)
+    assert create.call_count == 2
+
+
+@patch.dict(os.environ, {"OPENAI_API_KEY": "dummy", "MODEL_LADDER": "small,large"})
+@patch("api.utils.statement_parser.get_async_openai_client")
+def test_extract_statement_details_chunked_escalates_only_failing_chunk(
+    mock_async_openai,
+):
+    """Tests that only the chunk with invalid output is escalated to the stronger model."""
+
+    async def create(**kwargs):
+        content = kwargs["messages"][-1]["content"]
+        if "Lunch" in content and kwargs["model"] == "small":
+            return _response([])
+        merchant = "Lunch" if "Lunch" in content else "Coffee"
+        return _response([_transaction(merchant)])
+
+    mock_client = MagicMock()
+    mock_client.chat.completions.create = AsyncMock(side_effect=create)
+    mock_async_openai.return_value = mock_client
+    result = asyncio.run(
+        extract_statement_details_chunked(STATEMENT, PROMPT_SET, rows_per_chunk=1)
+    )
+    assert [t["merchant"] for t in result] == ["Coffee", "Lunch"]
+    models = [
+        call.kwargs["model"]
+        for call in mock_client.chat.completions.create.await_args_list
+    ]
+    assert sorted(models) == ["large", "small", "small"]
@@ -0,0 +1,177 @@
+import time
+
+from api.benchmarks.synthetic_statements import generate_ofx_statement
+from api.utils.ofx_parser import (
+    is_ofx,
+    is_ofx_file,
+    iter_ofx_transactions,
+    parse_ofx,
+    parse_ofx_file,
+)
+
+SGML_CARD = """OFXHEADER:100
+DATA:OFXSGML
+VERSION:102
+ENCODING:USASCII
+CHARSET:1252
+
+<OFX>
+<CREDITCARDMSGSRSV1><CCSTMTTRNRS><CCSTMTRS>
+<CURDEF>CAD
+<CCACCTFROM><ACCTID>4111111111111111</CCACCTFROM>
+<BANKTRANLIST>
+<STMTTRN>
+<TRNTYPE>DEBIT
+<DTPOSTED>20240102
+<TRNAMT>-12.50
+<FITID>1
+<NAME>BARNES &amp; NOBLE
+<MEMO>STORE 42
+</STMTTRN>
+<STMTTRN>
+<TRNTYPE>PAYMENT
+<DTPOSTED>20240105120000[-5:EST]
+<TRNAMT>200.00
+<FITID>2
+<MEMO>PAYMENT THANK YOU
+<CURRENCY><CURRATE>1.0<CURSYM>USD</CURRENCY>
+</STMTTRN>
+<STMTTRN>
+<TRNTYPE>DEBIT
+<DTPOSTED>PENDING
+<TRNAMT>-1.00
+</STMTTRN>
+</BANKTRANLIST>
+</CCSTMTRS></CCSTMTTRNRS></CREDITCARDMSGSRSV1>
+</OFX>
+"""
+
+XML_BANK = """<?xml version="1.0" encoding="UTF-8"?>
+<?OFX OFXHEADER="200" VERSION="220" SECURITY="NONE"?>
+<OFX>
+  <BANKMSGSRSV1><STMTTRNRS><STMTRS>
+    <CURDEF>USD</CURDEF>
+    <BANKACCTFROM>
+      <BANKID>121000248</BANKID><ACCTID>000123456789</ACCTID><ACCTTYPE>CHECKING</ACCTTYPE>
+    </BANKACCTFROM>
+    <BANKTRANLIST>
+      <STMTTRN>
+        <TRNTYPE>CREDIT</TRNTYPE><DTPOSTED>20240301</DTPOSTED><TRNAMT>1500.00</TRNAMT>
+        <FITID>a</FITID><NAME>ZELLE PAYMENT FROM JANE DOE</NAME>
+      </STMTTRN>
+      <STMTTRN>
+        <TRNTYPE>XFER</TRNTYPE><DTPOSTED>20240302</DTPOSTED><TRNAMT>-75,25</TRNAMT>
+        <FITID>b</FITID><NAME>TRANSFER TO SAVINGS</NAME>
+        <BANKACCTTO><BANKID>121000248</BANKID><ACCTID>000987654321</ACCTID></BANKACCTTO>
+      </STMTTRN>
+    </BANKTRANLIST>
+  </STMTRS></STMTTRNRS></BANKMSGSRSV1>
+</OFX>
+"""
+
+
+def test_is_ofx_detects_sgml_and_xml_headers():
+    """Tests that OFX and QFX exports are told apart from CSV statements."""
+    assert is_ofx(SGML_CARD)
+    assert is_ofx(XML_BANK)
+    assert is_ofx(b"\xef\xbb\xbf" + XML_BANK.encode())
+    assert not is_ofx("Date,Description,Amount\n2024-01-02,<OFX>,1\n")
+
+
+def test_parse_ofx_card_statement_matches_card_prompt_set():
+    """Tests that card charges are positive expenses and payments are negative."""
+    assert parse_ofx(SGML_CARD) == [
+        {
+            "merchant": "BARNES & NOBLE",
+            "date": "2024-01-02",
+            "amount": 12.5,
+            "currency": "CAD",
+            "transaction_type": "Expense",
+        },
+        {
+            "merchant": "PAYMENT THANK YOU",
+            "date": "2024-01-05",
+            "amount": -200.0,
+            "currency": "USD",
+            "transaction_type": "Expense",
+        },
+    ]
+
+
+def test_parse_ofx_bank_statement_matches_checking_prompt_set():
+    """Tests that bank amounts are absolute with an Expense or Income type, and PII is removed."""
+    transactions = parse_ofx(XML_BANK)
+
+    assert transactions == [
+        {
+            "merchant": "ZELLE PAYMENT FROM [NAME]",
+            "date": "2024-03-01",
+            "amount": 1500.0,
+            "currency": "USD",
+            "transaction_type": "Income",
+        },
+        {
+            "merchant": "TRANSFER TO SAVINGS",
+            "date": "2024-03-02",
+            "amount": 75.25,
+            "currency": "USD",
+            "transaction_type": "Expense",
+        },
+    ]
+    assert "000987654321" not in str(transactions)
+
+
+def test_parse_ofx_amount_separators(caplog):
+    """Tests that thousands and decimal commas are told apart and bad amounts are logged."""
+    rows = "".join(
+        f"<STMTTRN><DTPOSTED>20240301<TRNAMT>{amount}<NAME>Store</STMTTRN>"
+        for amount in (
+            "-1,234.56",
+            "-12,50",
+            "-1.234,56",
+            "1,234",
+            "-1,234",
+            "1,234,567",
+            "12,50",
+            "N/A",
+        )
+    )
+    statement = f"OFXHEADER:100\n\n<OFX><STMTRS><BANKTRANLIST>{rows}</BANKTRANLIST></STMTRS></OFX>"
+    transactions = parse_ofx(statement)
+    assert [t["amount"] for t in transactions] == [
+        1234.56,
+        12.5,
+        1234.56,
+        1234.0,
+        1234.0,
+        1234567.0,
+        12.5,
+    ]
+    assert "invalid amount 'N/A'" in caplog.text
+
+
+def test_iter_ofx_transactions_handles_tags_split_across_chunks():
+    """Tests that streaming the statement in small chunks gives the same transactions."""
+    chunks = [SGML_CARD[i : i + 7] for i in range(0, len(SGML_CARD), 7)]
+    assert list(iter_ofx_transactions(chunks)) == parse_ofx(SGML_CARD)
+
+
+def test_parse_ofx_file_uses_declared_charset(tmp_path):
+    """Tests that files are streamed from disk using the CHARSET of the SGML header."""
+    path = tmp_path / "statement.qfx"
+    path.write_bytes(SGML_CARD.replace("BARNES", "CAF\xc9").encode("cp1252"))
+
+    assert is_ofx_file(str(path))
+    assert parse_ofx_file(str(path))[0]["merchant"] == "CAF\xc9 & NOBLE"
+
+
+def test_parse_ofx_throughput():
+    """Tests that tens of thousands of transactions are parsed per second."""
+    statement = generate_ofx_statement("checking", 20000)
+    start = time.perf_counter()
+    transactions = parse_ofx(statement)
+    elapsed = time.perf_counter() - start
+
+    assert len(transactions) == 20000
+    assert "000123456789" not in str(transactions[:100])
+    assert len(transactions) / elapsed > 10000
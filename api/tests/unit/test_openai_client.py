@@ -0,0 +1,147 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+import pytest
+from openai import BadRequestError, InternalServerError, RateLimitError
+
+from api.utils.openai_client import (
+    RateLimiter,
+    TokenBucket,
+    _retry_delay,
+    aclose_clients,
+    create_chat_completion,
+    create_chat_completion_async,
+    get_async_openai_client,
+    get_openai_client,
+    reset_clients,
+)
+
+
+def _status_error(error_class, status_code, headers=None):
+    """Builds an OpenAI status error with the given HTTP status code."""
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    response = httpx.Response(status_code, request=request, headers=headers or {})
+    return error_class("error", response=response, body=None)
+
+
+@pytest.fixture(autouse=True)
+def reset_shared_clients(monkeypatch):
+    """Rebuilds the shared clients and limiter from a clean environment for each test."""
+    monkeypatch.delenv("OPENAI_REQUESTS_PER_MINUTE", raising=False)
+    monkeypatch.delenv("OPENAI_TOKENS_PER_MINUTE", raising=False)
+    reset_clients()
+    yield
+    reset_clients()
+
+
+def test_token_bucket_returns_wait_once_exhausted():
+    """Tests that the bucket allows bursts up to capacity and then asks callers to wait."""
+    bucket = TokenBucket(per_minute=60)
+    assert bucket.reserve(60) == 0.0
+    assert bucket.reserve(1) == pytest.approx(1.0, abs=0.05)
+
+
+def test_token_bucket_caps_oversized_requests():
+    """Tests that a request larger than the capacity does not wait forever."""
+    bucket = TokenBucket(per_minute=60)
+    assert bucket.reserve(1000) == 0.0
+
+
+def test_rate_limiter_uses_longest_wait():
+    """Tests that the limiter waits for whichever budget is more constrained."""
+    limiter = RateLimiter(requests_per_minute=600, tokens_per_minute=60)
+    limiter._reserve(60)
+    assert limiter._reserve(30) == pytest.approx(30.0, abs=0.1)
+
+
+def test_get_openai_client_is_shared():
+    """Tests that the same client is reused for the same API key."""
+    assert get_openai_client("key") is get_openai_client("key")
+    assert get_openai_client("key") is not get_openai_client("other")
+    assert get_openai_client("key").max_retries == 0
+
+
+def test_get_async_openai_client_is_shared_per_loop():
+    """Tests that async clients are reused within an event loop."""
+
+    async def get_pair():
+        return get_async_openai_client("key"), get_async_openai_client("key")
+
+    first, second = asyncio.run(get_pair())
+    assert first is second
+
+
+def test_aclose_clients_closes_loop_clients():
+    """Tests that async clients of the running loop are closed and then rebuilt."""
+
+    async def close_and_rebuild():
+        client = get_async_openai_client("key")
+        await aclose_clients()
+        return client, get_async_openai_client("key")
+
+    closed, rebuilt = asyncio.run(close_and_rebuild())
+    assert closed.is_closed()
+    assert rebuilt is not closed
+
+
+@patch("api.utils.openai_client.time.sleep")
+def test_create_chat_completion_retries_rate_limit(mock_sleep):
+    """Tests that 429 and 5xx responses are retried until a call succeeds."""
+    client = MagicMock()
+    client.chat.completions.create.side_effect = [
+        _status_error(RateLimitError, 429),
+        _status_error(InternalServerError, 503),
+        "response",
+    ]
+    assert create_chat_completion(client, messages=[]) == "response"
+    assert client.chat.completions.create.call_count == 3
+    assert mock_sleep.call_count == 2
+
+
+@patch("api.utils.openai_client.time.sleep")
+def test_create_chat_completion_does_not_retry_client_errors(mock_sleep):
+    """Tests that non-retryable errors are raised immediately."""
+    client = MagicMock()
+    client.chat.completions.create.side_effect = _status_error(BadRequestError, 400)
+    with pytest.raises(BadRequestError):
+        create_chat_completion(client, messages=[])
+    assert client.chat.completions.create.call_count == 1
+    mock_sleep.assert_not_called()
+
+
+@patch("api.utils.openai_client.time.sleep")
+def test_create_chat_completion_gives_up_after_max_retries(mock_sleep, monkeypatch):
+    """Tests that the last error is raised once retries are exhausted."""
+    monkeypatch.setenv("OPENAI_MAX_RETRIES", "2")
+    client = MagicMock()
+    client.chat.completions.create.side_effect = _status_error(RateLimitError, 429)
+    with pytest.raises(RateLimitError):
+        create_chat_completion(client, messages=[])
+    assert client.chat.completions.create.call_count == 3
+
+
+def test_retry_delay_honors_retry_after():
+    """Tests that the Retry-After header sets a lower bound on the backoff delay."""
+    error = _status_error(RateLimitError, 429, headers={"retry-after": "7"})
+    assert _retry_delay(error, attempt=0) == 7.0
+
+
+def test_retry_delay_grows_exponentially():
+    """Tests that the jittered delay is bounded by an exponentially growing cap."""
+    error = _status_error(InternalServerError, 500)
+    with patch("api.utils.openai_client.random.uniform", side_effect=lambda a, b: b):
+        assert _retry_delay(error, attempt=0) == 0.5
+        assert _retry_delay(error, attempt=3) == 4.0
+
+
+@patch("api.utils.openai_client.asyncio.sleep", new_callable=AsyncMock)
+def test_create_chat_completion_async_retries(mock_sleep):
+    """Tests that the async helper retries transient failures."""
+    client = MagicMock()
+    client.chat.completions.create = AsyncMock(
+        side_effect=[_status_error(RateLimitError, 429), "response"]
+    )
+    result = asyncio.run(create_chat_completion_async(client, messages=[]))
+    assert result == "response"
+    mock_sleep.assert_awaited_once()
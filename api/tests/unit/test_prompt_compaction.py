@@ -0,0 +1,117 @@
+import json
+import os
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from api.utils.prompt_compaction import (
+    build_token_report,
+    compact_statement_csv,
+    count_tokens,
+    get_token_reports,
+    record_token_report,
+)
+from api.utils.prompts import PROMPTS
+from api.utils.statement_parser import extract_statement_details
+
+PROMPT_SET = "card_account_csv_statement_parser"
+
+
+def test_compact_statement_csv_drops_irrelevant_columns():
+    """Tests that balance and memo columns are dropped while schema columns are kept."""
+    csv_text = (
+        "Date,Description,Amount,Running Balance,Memo\n"
+        "2024-01-01,Coffee,4.50,100.00,morning\n"
+    )
+    assert (
+        compact_statement_csv(csv_text)
+        == "Date,Description,Amount\n2024-01-01,Coffee,4.50\n"
+    )
+
+
+def test_compact_statement_csv_normalizes_values():
+    """Tests that whitespace, quoting and amount formatting are normalized."""
+    csv_text = (
+        "Date,Description,Amount\n"
+        '"2024-01-01","  SQ *COFFEE    1234  ","$1,234.50"\n'
+        "2024-01-02,Refund,(12.00)\n"
+        ",,\n"
+    )
+    assert compact_statement_csv(csv_text) == (
+        "Date,Description,Amount\n"
+        "2024-01-01,SQ *COFFEE 1234,1234.50\n"
+        "2024-01-02,Refund,-12.00\n"
+    )
+
+
+def test_compact_statement_csv_keeps_needed_quoting():
+    """Tests that values containing commas stay quoted."""
+    csv_text = 'Description,Amount\n"Shop, Inc.",5\n'
+    assert compact_statement_csv(csv_text) == csv_text
+
+
+def test_count_tokens_counts_words_and_punctuation():
+    """Tests that the local token estimate grows with content."""
+    assert count_tokens("") == 0
+    assert count_tokens("Date,Amount\n2024-01-01,4.50\n") > count_tokens(
+        "Date,Amount\n"
+    )
+
+
+def test_build_token_report_reports_savings():
+    """Tests that token reports estimate the tokens saved by compaction."""
+    raw = "Date,Amount,Balance\n2024-01-01,$4.50,$1000.00\n"
+    report = build_token_report(
+        PROMPT_SET, PROMPTS[PROMPT_SET], raw, compact_statement_csv(raw)
+    )
+    assert report.saved_tokens > 0
+    assert report.actual_tokens is None
+
+
+def test_build_token_report_enforces_budget(monkeypatch):
+    """Tests that prompts over MAX_PROMPT_TOKENS are rejected."""
+    monkeypatch.setenv("MAX_PROMPT_TOKENS", "10")
+    with pytest.raises(ValueError) as excinfo:
+        build_token_report(PROMPT_SET, PROMPTS[PROMPT_SET], "a\n", "a\n")
+    assert "exceeds budget of 10" in str(excinfo.value)
+
+
+def test_record_token_report_stores_actual_tokens():
+    """Tests that the actual prompt tokens from the response usage are recorded."""
+    report = build_token_report(PROMPT_SET, PROMPTS[PROMPT_SET], "a\n", "a\n")
+    response = MagicMock()
+    response.usage.prompt_tokens = 321
+    record_token_report(report, response)
+    assert report.actual_tokens == 321
+    assert get_token_reports()[-1] is report
+
+
+@patch("api.utils.statement_parser.get_openai_client")
+def test_extract_statement_details_sends_compacted_csv(mock_openai):
+    """Tests that the statement is compacted before it is sent to the model."""
+    mock_client = MagicMock()
+    mock_response = MagicMock()
+    mock_response.choices[0].message.tool_calls[0].function.arguments = json.dumps(
+        {
+            "transactions": [
+                {
+                    "merchant": "Unknown",
+                    "date": "2024-01-01",
+                    "amount": 4.5,
+                    "currency": "USD",
+                    "transaction_type": "Expense",
+                }
+            ]
+        }
+    )
+    mock_client.chat.completions.create.return_value = mock_response
+    mock_openai.return_value = mock_client
+    os.environ["OPENAI_API_KEY"] = "dummy"
+    extract_statement_details(
+        statement_text="Date,Amount,Balance\n2024-01-01,$4.50,$100.00\n",
+        prompt_set=PROMPT_SET,
+    )
+    sent = mock_client.chat.completions.create.call_args.kwargs["messages"][-1][
+        "content"
+    ]
+    assert sent.endswith("Date,Amount\n2024-01-01,4.50\n")
@@ -0,0 +1,54 @@
+import json
+import os
+from unittest.mock import MagicMock, patch
+
+from api.utils.prompt_templates import get_prompt_template
+from api.utils.prompts import COLUMN_MAPPING_PROMPT, PROMPTS
+from api.utils.statement_parser import extract_statement_details
+
+PROMPT_SET = "card_account_csv_statement_parser"
+
+
+def test_messages_share_a_byte_identical_prefix():
+    """Tests that only the last message differs between statements of the same prompt set."""
+    template = get_prompt_template(PROMPTS[PROMPT_SET])
+    first = template.messages("Date,Amount\n2024-01-01,1\n")
+    second = template.messages("Date,Amount\n2024-02-01,2\n")
+
+    assert json.dumps(first[:-1]) == json.dumps(second[:-1])
+    assert first[-1] == {"role": "user", "content": "Date,Amount\n2024-01-01,1\n"}
+    assert first[1]["content"] == PROMPTS[PROMPT_SET]["user_prompt"]
+
+
+def test_templates_are_compiled_once_per_prompt():
+    """Tests that templates are reused and cache keys are stable and distinct per prompt set."""
+    card = get_prompt_template(PROMPTS[PROMPT_SET])
+    checking = get_prompt_template(PROMPTS["checking_account_csv_statement_parser"])
+
+    assert get_prompt_template(PROMPTS[PROMPT_SET]) is card
+    assert card.cache_key.startswith("extract_transaction-")
+    assert card.cache_key != checking.cache_key
+    assert card.options["prompt_cache_key"] == card.cache_key
+    assert card.options["tool_choice"] == card.tools["tool_choice"]
+    assert get_prompt_template(COLUMN_MAPPING_PROMPT).validator is None
+
+
+@patch.dict(os.environ, {"OPENAI_API_KEY": "fake_key"})
+@patch("api.utils.statement_parser.get_openai_client")
+def test_extract_statement_details_sends_prompt_cache_key(mock_get_client):
+    """Tests that requests carry the template's prompt cache key and the statement last."""
+    response = MagicMock()
+    response.choices[0].message.tool_calls[0].function.arguments = json.dumps(
+        {"transactions": []}
+    )
+    mock_client = MagicMock()
+    mock_client.chat.completions.create.return_value = response
+    mock_get_client.return_value = mock_client
+
+    extract_statement_details("Date,Amount\n", PROMPT_SET)
+
+    kwargs = mock_client.chat.completions.create.call_args.kwargs
+    template = get_prompt_template(PROMPTS[PROMPT_SET])
+    assert kwargs["prompt_cache_key"] == template.cache_key
+    assert kwargs["messages"][:-1] == list(template.prefix)
+    assert kwargs["messages"][-1]["content"] == "Date,Amount\n"
@@ -0,0 +1,171 @@
+import random
+import time
+
+from api.utils.reconciliation import (
+    find_transfers,
+    merchant_similarity,
+    reconcile_transfers,
+)
+from api.utils.transaction_store import TransactionStore
+
+
+def _transaction(account, merchant, date, amount, transaction_type="Expense"):
+    return {
+        "account": account,
+        "merchant": merchant,
+        "date": date,
+        "amount": amount,
+        "currency": "USD",
+        "transaction_type": transaction_type,
+    }
+
+
+def test_merchant_similarity():
+    """Tests keyword and word-overlap scoring of merchant descriptions."""
+    assert (
+        merchant_similarity("CHASE CREDIT CRD AUTOPAY", "AUTOMATIC PAYMENT - THANK YOU")
+        == 1.0
+    )
+    assert merchant_similarity("ONLINE TRANSFER TO SAVINGS", "Deposit") == 0.5
+    assert merchant_similarity("Acme Corp 123", "ACME CORP") == 1.0
+    assert merchant_similarity("Coffee Shop", "Grocer") == 0.0
+
+
+def test_find_transfers_matches_card_payment():
+    """Tests that a checking debit and a card payment of the same amount are paired."""
+    transactions = [
+        _transaction("checking", "CHASE CREDIT CRD AUTOPAY", "2024-03-05", 812.4),
+        _transaction("checking", "Grocer", "2024-03-05", 812.4),
+        _transaction("card", "Grocer", "2024-03-04", 812.4),
+        _transaction("card", "PAYMENT THANK YOU", "2024-03-07", 812.4, "Payment"),
+    ]
+    matches = find_transfers(transactions)
+    assert [(m.outflow, m.inflow) for m in matches] == [(0, 3)]
+    assert matches[0].amount_cents == 81240
+    assert matches[0].days_apart == 2
+
+
+def test_find_transfers_respects_window_accounts_and_threshold():
+    """Tests that pairs outside the window, in one account or with dissimilar merchants are skipped."""
+    transactions = [
+        _transaction("checking", "TRANSFER TO SAVINGS", "2024-03-01", 100),
+        _transaction("savings", "TRANSFER FROM CHECKING", "2024-03-09", 100, "Income"),
+        _transaction("checking", "TRANSFER TO SAVINGS", "2024-04-01", 50),
+        _transaction("checking", "TRANSFER FROM SAVINGS", "2024-04-01", 50, "Income"),
+        _transaction("checking", "Coffee Shop", "2024-05-01", 4.5),
+        _transaction("card", "Bakery", "2024-05-01", 4.5, "Income"),
+        _transaction("card", "Bakery", "2024-05-01", 4.5, "Refund"),
+    ]
+    assert find_transfers(transactions) == []
+    assert [
+        (m.outflow, m.inflow) for m in find_transfers(transactions, window_days=8)
+    ] == [(0, 1)]
+    assert (4, 5) in [
+        (m.outflow, m.inflow) for m in find_transfers(transactions, min_similarity=0)
+    ]
+
+
+def test_find_transfers_matches_one_to_one_closest_first():
+    """Tests that each transaction is used once and the closest dates win."""
+    transactions = [
+        _transaction("checking", "ONLINE TRANSFER", "2024-06-01", 200),
+        _transaction("checking", "ONLINE TRANSFER", "2024-06-03", 200),
+        _transaction("savings", "TRANSFER IN", "2024-06-03", 200, "Income"),
+        _transaction("savings", "TRANSFER IN", "2024-06-04", 200, "Income"),
+    ]
+    assert [(m.outflow, m.inflow) for m in find_transfers(transactions)] == [
+        (0, 3),
+        (1, 2),
+    ]
+
+
+def test_find_transfers_year_of_data_is_fast():
+    """Tests that a year of transactions across several accounts reconciles well under a second."""
+    rng = random.Random(7)
+    transactions = []
+    for index in range(20000):
+        transactions.append(
+            _transaction(
+                rng.choice(["checking", "card", "savings"]),
+                f"Merchant {rng.randint(0, 400)}",
+                f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+                round(rng.uniform(1, 300), 2),
+                rng.choice(["Expense", "Expense", "Income"]),
+            )
+        )
+    start = time.perf_counter()
+    find_transfers(transactions)
+    assert time.perf_counter() - start < 1.0
+
+
+def test_reconcile_transfers_excludes_transfers_from_summaries():
+    """Tests that reconciled transfers are stored and left out of listings and summaries on request."""
+    store = TransactionStore(":memory:")
+    store.insert_transactions(
+        [
+            _transaction(None, "CHASE CREDIT CRD AUTOPAY", "2024-03-05", 500),
+            _transaction(None, "Rent", "2024-03-01", 1500),
+        ],
+        account="checking",
+    )
+    store.insert_transactions(
+        [
+            _transaction(
+                None, "AUTOMATIC PAYMENT - THANK YOU", "2024-03-06", 500, "Payment"
+            ),
+            _transaction(None, "Grocer", "2024-03-02", 500),
+        ],
+        account="card",
+    )
+    assert reconcile_transfers(store) == 1
+    assert reconcile_transfers(store) == 1
+    [transfer] = store.query_transfers()
+    assert transfer["amount"] == 500
+    assert transfer["outflow"]["account"] == "checking"
+    assert transfer["inflow"]["account"] == "card"
+    summary = store.summarize(group_by="transaction_type", exclude_transfers=True)
+    assert summary == [{"transaction_type": "Expense", "total": 2000.0, "count": 2}]
+    assert len(store.query_transactions(exclude_transfers=True)) == 2
+    assert len(store.query_transactions()) == 4
+
+
+def test_reconcile_transfers_scoped_to_new_dates():
+    """Tests that reconciling around new dates keeps transfers outside and across the window."""
+    store = TransactionStore(":memory:")
+    store.insert_transactions(
+        [
+            _transaction(None, "ONLINE TRANSFER", "2024-01-10", 100),
+            _transaction(None, "CARD AUTOPAY", "2024-03-05", 250),
+        ],
+        account="checking",
+    )
+    store.insert_transactions(
+        [
+            _transaction(None, "TRANSFER IN", "2024-01-11", 100, "Income"),
+            _transaction(None, "PAYMENT THANK YOU", "2024-03-07", 250, "Payment"),
+        ],
+        account="savings",
+    )
+    assert reconcile_transfers(store) == 2
+    store.insert_transactions(
+        [
+            _transaction(None, "ONLINE TRANSFER", "2024-03-10", 75),
+            _transaction(None, "TRANSFER IN", "2024-03-11", 75, "Income"),
+        ],
+        account="brokerage",
+    )
+    store.insert_transactions(
+        [_transaction(None, "TRANSFER IN", "2024-03-12", 75, "Income")],
+        account="savings",
+    )
+    assert (
+        reconcile_transfers(store, start_date="2024-03-10", end_date="2024-03-12") == 1
+    )
+    transfers = store.query_transfers()
+    assert sorted((t["outflow"]["date"], t["inflow"]["date"]) for t in transfers) == [
+        ("2024-01-10", "2024-01-11"),
+        ("2024-03-05", "2024-03-07"),
+        ("2024-03-10", "2024-03-12"),
+    ]
+    summary = store.summarize(group_by="account", exclude_transfers=True)
+    assert {group["account"]: group["count"] for group in summary} == {"brokerage": 1}
@@ -0,0 +1,91 @@
+from datetime import date, timedelta
+
+from api.utils.recurring import (
+    RecurringCharge,
+    classify_cadence,
+    detect_recurring_charges,
+    find_recurring_charges,
+)
+from api.utils.transaction_store import TransactionStore
+
+
+def _transaction(merchant, day, amount):
+    return {
+        "merchant": merchant,
+        "date": day,
+        "amount": amount,
+        "currency": "USD",
+        "transaction_type": "Expense",
+    }
+
+
+def _every(days, count, start="2024-01-05"):
+    """Returns count dates, days apart, from the start date."""
+    first = date.fromisoformat(start)
+    return [(first + timedelta(days=days * i)).isoformat() for i in range(count)]
+
+
+def test_classify_cadence():
+    """Tests that mean intervals map to cadences only when the intervals are regular."""
+    assert classify_cadence(7.0, 0.0) == "weekly"
+    assert classify_cadence(30.3, 1.2) == "monthly"
+    assert classify_cadence(364.0, 1.0) == "yearly"
+    assert classify_cadence(30.3, 9.0) is None
+    assert classify_cadence(45.0, 0.0) is None
+
+
+def test_find_recurring_charges_filters_irregular_merchants():
+    """Tests that too few charges, varying amounts and irregular intervals are not recurring."""
+    stats = {
+        "account": "card",
+        "merchant": "SPOTIFY USA",
+        "first_date": "2024-01-05",
+        "last_date": "2024-03-05",
+        "occurrences": 3,
+        "interval_count": 2,
+        "interval_mean": 30.0,
+        "interval_std": 1.0,
+        "amount_mean": 10.99,
+        "amount_std": 0.0,
+    }
+    [charge] = find_recurring_charges([stats])
+    assert charge == RecurringCharge(
+        account="card",
+        merchant="SPOTIFY USA",
+        cadence="monthly",
+        interval_days=30.0,
+        amount=10.99,
+        occurrences=3,
+        last_date="2024-03-05",
+        next_date="2024-04-04",
+    )
+    assert find_recurring_charges([stats], min_occurrences=4) == []
+    assert find_recurring_charges([{**stats, "amount_std": 5.0}]) == []
+    assert find_recurring_charges([{**stats, "interval_std": 12.0}]) == []
+
+
+def test_detect_recurring_charges_from_store(monkeypatch):
+    """Tests that subscriptions are detected across uploads while irregular spending is not."""
+    monkeypatch.delenv("RECURRING_MIN_OCCURRENCES", raising=False)
+    store = TransactionStore(":memory:")
+    netflix = [
+        _transaction("NETFLIX.COM", day, 15.49)
+        for day in ("2024-01-05", "2024-02-05", "2024-03-05", "2024-04-05")
+    ]
+    gym = [_transaction("GYM", day, 25) for day in _every(7, 6)]
+    coffee = [
+        _transaction("Coffee", day, 4.5)
+        for day in ("2024-01-02", "2024-01-03", "2024-01-20", "2024-02-28")
+    ]
+    store.insert_transactions(netflix[2:] + coffee, "card")
+    store.insert_transactions(netflix[:2] + gym, "card")
+    store.insert_transactions(netflix, "card")
+    charges = detect_recurring_charges(store)
+    assert [(c.merchant, c.cadence, c.occurrences) for c in charges] == [
+        ("GYM", "weekly", 6),
+        ("NETFLIX.COM", "monthly", 4),
+    ]
+    assert charges[1].next_date == "2024-05-05"
+    monkeypatch.setenv("RECURRING_MIN_OCCURRENCES", "5")
+    assert [c.merchant for c in detect_recurring_charges(store)] == ["GYM"]
+    assert detect_recurring_charges(store, account="checking") == []
@@ -1,6 +1,17 @@
+import json
+import os
+from unittest.mock import patch
+
 import pytest
 
-from api.utils.redact_pii import remove_pii_columns
+from api.utils.redact_pii import (
+    RedactionRules,
+    luhn_valid,
+    redact_pii_lines,
+    remove_pii_columns,
+    rules_for_header,
+    scrub_text,
+)
 
 
 def test_remove_pii_columns_removes_specified_columns():
@@ -45,3 +56,118 @@ def test_remove_pii_columns_handles_none_column_key():
     expected_result = "Amount\n100\n"
     result = remove_pii_columns(csv_text)
     assert result == expected_result
+
+
+def test_redact_pii_lines_streams_from_file_object(tmp_path):
+    """Tests that redacted lines are yielded one at a time from a file object."""
+    path = tmp_path / "statement.csv"
+    path.write_text("Card No.,Amount,Description\n1234,100,Payment\n5678,200,Refund\n")
+    with open(path, newline="") as file:
+        lines = redact_pii_lines(file)
+        assert next(lines) == "Amount,Description\n"
+        assert list(lines) == ["100,Payment\n", "200,Refund\n"]
+
+
+def test_redact_pii_lines_keeps_quoted_newlines():
+    """Tests that quoted values spanning several lines are kept as a single row."""
+    lines = ["To,Description,Amount\n", 'Bob,"Multi\n', 'line",5\n']
+    assert list(redact_pii_lines(lines)) == [
+        "Description,Amount\n",
+        '"Multi\nline",5\n',
+    ]
+
+
+def test_redact_pii_lines_pads_short_rows_and_skips_blank_lines():
+    """Tests that short rows are padded with empty values and blank lines are skipped."""
+    lines = ["From,Amount,Description\n", "\n", "Alice,100\n"]
+    assert list(redact_pii_lines(lines)) == ["Amount,Description\n", "100,\n"]
+
+
+def test_redact_pii_lines_raises_on_empty_input():
+    """Tests that input without a header row raises a ValueError."""
+    with pytest.raises(ValueError) as excinfo:
+        list(redact_pii_lines([]))
+    assert "CSV text cannot be empty" in str(excinfo.value)
+
+
+def test_luhn_valid():
+    """Tests the Luhn checksum on valid and invalid card numbers."""
+    assert luhn_valid("4111111111111111")
+    assert luhn_valid("378282246310005")
+    assert not luhn_valid("4111111111111112")
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("REFUND CARD 4111 1111 1111 1111", "REFUND CARD [CARD]"),
+        ("ORDER 4111111111111112", "ORDER 4111111111111112"),
+        ("CALL (415) 555-0123 OR 415.555.0199", "CALL [PHONE] OR [PHONE]"),
+        ("PAYPAL *jane.doe@example.com", "PAYPAL *[EMAIL]"),
+        ("IRS SSN 123-45-6789", "IRS SSN [SSN]"),
+        ("ONLINE TRANSFER TO SAV XXXXXX1234", "ONLINE TRANSFER TO SAV [ACCOUNT]"),
+        ("DEPOSIT ACCT #98765432", "DEPOSIT [ACCOUNT]"),
+        ("ZELLE PAYMENT TO JOHN SMITH", "ZELLE PAYMENT TO [NAME]"),
+        ("Venmo cashout from Jane Doe, ref 1", "Venmo cashout from [NAME], ref 1"),
+        ("WHOLEFDS MKT 10234", "WHOLEFDS MKT 10234"),
+        ("2024-01-02", "2024-01-02"),
+    ],
+)
+def test_scrub_text(text, expected):
+    """Tests that PII inside free text is replaced and ordinary descriptions are kept."""
+    assert scrub_text(text) == expected
+
+
+def test_remove_pii_columns_scrubs_free_text_columns_only():
+    """Tests that only free-text columns are scrubbed, in the same pass as column removal."""
+    csv_text = (
+        "Card No.,Description,Reference,Amount\n"
+        "1234,ZELLE PAYMENT TO JOHN SMITH,4111111111111111,10.00\n"
+        "1234,ZELLE PAYMENT TO JOHN SMITH,5555555555554444,12.00\n"
+    )
+    assert remove_pii_columns(csv_text) == (
+        "Description,Reference,Amount\n"
+        "ZELLE PAYMENT TO [NAME],[CARD],10.00\n"
+        "ZELLE PAYMENT TO [NAME],[CARD],12.00\n"
+    )
+
+
+def test_redact_pii_lines_applies_given_rules():
+    """Tests that explicit rules choose the dropped and scrubbed columns."""
+    rules = RedactionRules(
+        drop_columns=frozenset(["Account"]), scrub_columns=frozenset(["memo"])
+    )
+    lines = [
+        "Account,Memo,Description\n",
+        "123,Call 415-555-0123,Call 415-555-0123\n",
+    ]
+    assert list(redact_pii_lines(lines, rules)) == [
+        "Memo,Description\n",
+        "Call [PHONE],Call 415-555-0123\n",
+    ]
+
+
+def test_rules_for_header_reads_layouts_from_file(tmp_path):
+    """Tests that the first layout whose match columns are in the header is used."""
+    path = tmp_path / "pii_rules.json"
+    path.write_text(
+        json.dumps(
+            [
+                {"match": ["Account Number", "Memo"], "drop": ["Account Number"]},
+                {"match": ["Memo"], "scrub": ["Memo"]},
+            ]
+        )
+    )
+    with patch.dict(os.environ, {"PII_RULES_PATH": str(path)}):
+        bank = rules_for_header(["Date", "Account Number", "Memo"])
+        other = rules_for_header(["Date", "Memo", "Payee"])
+        unknown = rules_for_header(["Date", "Description"])
+        redacted = remove_pii_columns(
+            "Date,Account Number,Memo\n2024-01-02,99887766,ACCT 99887766\n"
+        )
+
+    assert bank.drop_columns == frozenset(["Account Number"])
+    assert other.scrub_columns == frozenset(["memo"])
+    assert other.drop_columns == RedactionRules().drop_columns
+    assert unknown == RedactionRules()
+    assert redacted == "Date,Memo\n2024-01-02,[ACCOUNT]\n"
@@ -0,0 +1,130 @@
+import os
+import time
+from unittest.mock import patch
+
+from api.utils.model_ladder import DEFAULT_MODEL_LADDER
+from api.utils.result_cache import ResultCache, get_result_cache, make_cache_key
+from api.utils.statement_parser import extract_statement_details
+
+
+TRANSACTIONS = [
+    {
+        "merchant": "Store",
+        "date": "2024-01-01",
+        "amount": 10.5,
+        "currency": "USD",
+        "transaction_type": "Expense",
+    }
+]
+
+
+def test_make_cache_key_depends_on_all_inputs():
+    """Tests that changing the text, prompt set or model changes the cache key."""
+    key = make_cache_key("a,b\n1,2\n", "card_account_csv_statement_parser", "m1")
+    assert key == make_cache_key(
+        "a,b\n1,2\n", "card_account_csv_statement_parser", "m1"
+    )
+    assert key != make_cache_key(
+        "a,b\n1,3\n", "card_account_csv_statement_parser", "m1"
+    )
+    assert key != make_cache_key(
+        "a,b\n1,2\n", "checking_account_csv_statement_parser", "m1"
+    )
+    assert key != make_cache_key(
+        "a,b\n1,2\n", "card_account_csv_statement_parser", "m2"
+    )
+
+
+def test_make_cache_key_depends_on_prompt_contents():
+    """Tests that editing a prompt set invalidates previously cached keys."""
+    key = make_cache_key("a\n", "card_account_csv_statement_parser", "m1")
+    with patch.dict(
+        "api.utils.result_cache.PROMPTS",
+        {"card_account_csv_statement_parser": {"system_prompt": "changed"}},
+    ):
+        assert key != make_cache_key("a\n", "card_account_csv_statement_parser", "m1")
+
+
+def test_result_cache_hit_and_miss_counters(tmp_path):
+    """Tests that get returns stored results and counts hits and misses."""
+    cache = ResultCache(path=str(tmp_path / "cache.sqlite3"))
+    assert cache.get("key") is None
+    cache.set("key", TRANSACTIONS)
+    assert cache.get("key") == TRANSACTIONS
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["entries"] == 1
+
+
+def test_result_cache_persists_across_instances(tmp_path):
+    """Tests that cached results survive reopening the database."""
+    path = str(tmp_path / "cache.sqlite3")
+    cache = ResultCache(path=path)
+    cache.set("key", TRANSACTIONS)
+    cache.close()
+    assert ResultCache(path=path).get("key") == TRANSACTIONS
+
+
+def test_result_cache_evicts_least_recently_used(tmp_path):
+    """Tests that the least recently accessed entry is evicted past max_entries."""
+    cache = ResultCache(path=str(tmp_path / "cache.sqlite3"), max_entries=2)
+    with patch("api.utils.result_cache.time") as mock_time:
+        now = time.time()
+        mock_time.time.side_effect = [now + 1, now + 2, now + 3, now + 4]
+        cache.set("a", TRANSACTIONS)
+        cache.set("b", TRANSACTIONS)
+        cache.get("a")
+        cache.set("c", TRANSACTIONS)
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+    assert cache.get("c") is not None
+
+
+def test_result_cache_evicts_by_size(tmp_path):
+    """Tests that entries are evicted when the total size exceeds max_bytes."""
+    cache = ResultCache(path=str(tmp_path / "cache.sqlite3"), max_bytes=200)
+    cache.set("a", TRANSACTIONS)
+    cache.set("b", TRANSACTIONS)
+    assert cache.stats()["entries"] == 1
+    assert cache.get("b") is not None
+
+
+def test_result_cache_expires_old_entries(tmp_path):
+    """Tests that entries older than max_age_seconds are treated as misses."""
+    cache = ResultCache(path=str(tmp_path / "cache.sqlite3"), max_age_seconds=10)
+    with patch("api.utils.result_cache.time") as mock_time:
+        mock_time.time.return_value = 100
+        cache.set("key", TRANSACTIONS)
+    with patch("api.utils.result_cache.time") as mock_time:
+        mock_time.time.return_value = 111
+        assert cache.get("key") is None
+
+
+def test_get_result_cache_disabled_without_path(monkeypatch):
+    """Tests that caching is disabled unless STATEMENT_CACHE_PATH is set."""
+    monkeypatch.delenv("STATEMENT_CACHE_PATH", raising=False)
+    assert get_result_cache() is None
+
+
+@patch("api.utils.statement_parser.get_openai_client")
+def test_extract_statement_details_cache_hit_skips_client(
+    mock_openai, tmp_path, monkeypatch
+):
+    """Tests that a cache hit returns without building an OpenAI client."""
+    monkeypatch.setenv("STATEMENT_CACHE_PATH", str(tmp_path / "cache.sqlite3"))
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    statement_text = "Date,Amount\n2024-01-01,10.5\n"
+    key = make_cache_key(
+        statement_text,
+        "card_account_csv_statement_parser",
+        ",".join(DEFAULT_MODEL_LADDER),
+    )
+    get_result_cache().set(key, TRANSACTIONS)
+    result = extract_statement_details(
+        statement_text=statement_text,
+        prompt_set="card_account_csv_statement_parser",
+    )
+    assert result == TRANSACTIONS
+    mock_openai.assert_not_called()
+    os.environ.pop("STATEMENT_CACHE_PATH", None)
@@ -0,0 +1,130 @@
+import json
+import os
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from api.utils.row_index import (
+    RowIndex,
+    fingerprint_rows,
+    plan_incremental_extraction,
+    row_reference_prompt,
+)
+from api.utils.prompts import PROMPTS
+from api.utils.statement_parser import extract_statement_details
+
+PROMPT_SET = "card_account_csv_statement_parser"
+
+
+def _transaction(merchant, row_id=None):
+    transaction = {
+        "merchant": merchant,
+        "date": "2024-01-01",
+        "amount": 1.0,
+        "currency": "USD",
+        "transaction_type": "Expense",
+    }
+    if row_id is not None:
+        transaction["row_id"] = row_id
+    return transaction
+
+
+def test_fingerprint_rows_distinguishes_identical_rows():
+    """Tests that identical rows get distinct fingerprints by occurrence, stable across files."""
+    header = ["Date", "Amount"]
+    first = fingerprint_rows(PROMPT_SET, header, [["d", "1"], ["d", "1"]])
+    second = fingerprint_rows(PROMPT_SET, header, [["d", "1"], ["d", "1"], ["e", "2"]])
+    assert first[0] != first[1]
+    assert second[:2] == first
+
+
+def test_fingerprint_rows_depends_on_header_and_prompt_set():
+    """Tests that the same values under another header or prompt set get new fingerprints."""
+    rows = [["d", "1"]]
+    fingerprint = fingerprint_rows(PROMPT_SET, ["Date", "Amount"], rows)
+    assert fingerprint != fingerprint_rows(PROMPT_SET, ["Date", "Total"], rows)
+    assert fingerprint != fingerprint_rows(
+        "checking_account_csv_statement_parser", ["Date", "Amount"], rows
+    )
+
+
+def test_row_reference_prompt_requires_row_id():
+    """Tests that the row reference prompt asks for and requires a row_id per transaction."""
+    prompt = row_reference_prompt(PROMPT_SET)
+    items = prompt["function_schema"]["parameters"]["properties"]["transactions"][
+        "items"
+    ]
+    assert "row_id" in items["required"]
+    assert "row_id" in prompt["user_prompt"]
+    assert prompt["user_prompt"].startswith(PROMPTS[PROMPT_SET]["user_prompt"])
+
+
+def test_plan_incremental_extraction_only_sends_unseen_rows(tmp_path):
+    """Tests that known rows are reused and only unseen rows are put in the pending CSV."""
+    index = RowIndex(str(tmp_path / "rows.sqlite3"))
+    first = plan_incremental_extraction("Date,Merchant\n1,A\n2,B\n", PROMPT_SET, index)
+    assert first.pending_csv == "row_id,Date,Merchant\n0,1,A\n1,2,B\n"
+    assert first.merge([_transaction("A", 0), _transaction("B", 1)]) == [
+        _transaction("A"),
+        _transaction("B"),
+    ]
+    second = plan_incremental_extraction(
+        "Date,Merchant\n1,A\n2,B\n3,C\n", PROMPT_SET, index
+    )
+    assert second.pending_csv == "row_id,Date,Merchant\n2,3,C\n"
+    assert [t["merchant"] for t in second.merge([_transaction("C", 2)])] == [
+        "A",
+        "B",
+        "C",
+    ]
+
+
+def test_plan_merge_remembers_rows_without_transactions(tmp_path):
+    """Tests that rows without a transaction, such as totals, are not sent again."""
+    index = RowIndex(str(tmp_path / "rows.sqlite3"))
+    plan = plan_incremental_extraction(
+        "Date,Merchant\n1,A\nTotal,\n", PROMPT_SET, index
+    )
+    plan.merge([_transaction("A", 0)])
+    again = plan_incremental_extraction(
+        "Date,Merchant\n1,A\nTotal,\n", PROMPT_SET, index
+    )
+    assert again.pending_csv is None
+    assert again.merge([]) == [_transaction("A")]
+
+
+def test_plan_merge_rejects_unknown_row(tmp_path):
+    """Tests that transactions pointing at rows that were not sent are rejected."""
+    index = RowIndex(str(tmp_path / "rows.sqlite3"))
+    plan = plan_incremental_extraction("Date,Merchant\n1,A\n", PROMPT_SET, index)
+    with pytest.raises(ValueError) as excinfo:
+        plan.merge([_transaction("A", 5)])
+    assert "unknown row 5" in str(excinfo.value)
+
+
+@patch("api.utils.statement_parser.get_openai_client")
+def test_extract_statement_details_incremental(mock_openai, tmp_path, monkeypatch):
+    """Tests that overlapping re-uploads only send new rows and skip the model when nothing is new."""
+    monkeypatch.setenv("ROW_INDEX_PATH", str(tmp_path / "rows.sqlite3"))
+    os.environ["OPENAI_API_KEY"] = "dummy"
+    mock_client = MagicMock()
+    responses = []
+    for transactions in ([_transaction("A", 0)], [_transaction("B", 1)]):
+        response = MagicMock()
+        response.choices[0].message.tool_calls[0].function.arguments = json.dumps(
+            {"transactions": transactions}
+        )
+        responses.append(response)
+    mock_client.chat.completions.create.side_effect = responses
+    mock_openai.return_value = mock_client
+
+    extract_statement_details("Date,Merchant\n1,A\n", PROMPT_SET)
+    result = extract_statement_details("Date,Merchant\n1,A\n2,B\n", PROMPT_SET)
+    assert [t["merchant"] for t in result] == ["A", "B"]
+    sent = mock_client.chat.completions.create.call_args.kwargs["messages"][-1][
+        "content"
+    ]
+    assert sent.endswith("row_id,Date,Merchant\n1,2,B\n")
+
+    assert extract_statement_details("Date,Merchant\n1,A\n2,B\n", PROMPT_SET) == result
+    assert mock_client.chat.completions.create.call_count == 2
@@ -1,9 +1,18 @@
 import io
+import json
 import logging
 import sys
+from logging.handlers import QueueHandler
 from unittest.mock import MagicMock, patch
 
-from api.utils.setup_logger import setup_logger
+import pytest
+
+from api.utils.setup_logger import (
+    log_context,
+    parse_sample_rates,
+    setup_logger,
+    stop_log_listener,
+)
 
 
 def test_setup_logger_returns_correct_name_and_level():
@@ -75,3 +84,71 @@ def test_setup_logger_formatter_format(monkeypatch):
     assert logger_name in output
     assert "INFO" in output
     assert log_msg in output
+
+
+def test_setup_logger_json_lines_include_context_ids(monkeypatch):
+    """Tests that LOG_FORMAT=json writes one JSON object per record with the log_context ids."""
+    stream = io.StringIO()
+    monkeypatch.setattr(sys, "stdout", stream)
+    monkeypatch.setenv("LOG_FORMAT", "json")
+    logger = setup_logger(logger_name="json_test")
+    with log_context(request_id="req-1"), log_context(job_id="job-1"):
+        logger.info("Parsed %d rows", 3)
+    logger.info("Outside")
+    first, second = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert first["message"] == "Parsed 3 rows"
+    assert first["level"] == "INFO"
+    assert first["logger"] == "json_test"
+    assert first["request_id"] == "req-1"
+    assert first["job_id"] == "job-1"
+    assert "request_id" not in second
+
+
+def test_setup_logger_queue_mode_shares_one_handler(monkeypatch):
+    """Tests that with LOG_QUEUE every logger feeds the same QueueHandler, drained by a listener."""
+    stream = io.StringIO()
+    monkeypatch.setattr(sys, "stdout", stream)
+    monkeypatch.setenv("LOG_QUEUE", "true")
+    try:
+        first = setup_logger(logger_name="queue_one")
+        second = setup_logger(logger_name="queue_two")
+        setup_logger(logger_name="queue_one")
+        assert len(first.handlers) == 1
+        assert isinstance(first.handlers[0], QueueHandler)
+        assert first.handlers[0] is second.handlers[0]
+        with log_context(request_id="req-2"):
+            first.info("From one")
+        second.warning("From two")
+    finally:
+        stop_log_listener()
+    output = stream.getvalue()
+    assert "queue_one - INFO - From one" in output
+    assert "queue_two - WARNING - From two" in output
+
+
+def test_setup_logger_samples_info_but_not_warnings(monkeypatch):
+    """Tests that LOG_SAMPLE_RATES keeps one in N records per call site and never drops warnings."""
+    stream = io.StringIO()
+    monkeypatch.setattr(sys, "stdout", stream)
+    monkeypatch.setenv("LOG_SAMPLE_RATES", "INFO=0.25,WARNING=0")
+    logger = setup_logger(logger_name="sampling_test")
+    for index in range(8):
+        logger.info("Row %d", index)
+        logger.warning("Slow row %d", index)
+    output = stream.getvalue()
+    assert output.count("INFO - Row") == 2
+    assert "INFO - Row 0" in output and "INFO - Row 4" in output
+    assert output.count("WARNING - Slow row") == 8
+
+
+def test_parse_sample_rates():
+    """Tests that sample rates are parsed by level name and invalid values are rejected."""
+    assert parse_sample_rates("debug=0.01, INFO=0.5") == {
+        logging.DEBUG: 0.01,
+        logging.INFO: 0.5,
+    }
+    assert parse_sample_rates(None) == {}
+    with pytest.raises(ValueError):
+        parse_sample_rates("LOUD=0.5")
+    with pytest.raises(ValueError):
+        parse_sample_rates("INFO=2")
@@ -1,15 +1,21 @@
+import asyncio
 import os
 import json
-from unittest.mock import patch, MagicMock
+from unittest.mock import AsyncMock, patch, MagicMock
 
 import pytest
 from openai import OpenAIError
 
-from api.utils.statement_parser import extract_statement_details
+from api.utils.statement_parser import (
+    extract_statement_details,
+    extract_statement_details_chunked,
+    split_csv_into_chunks,
+    stream_statement_details,
+)
 
 
 @patch("api.utils.statement_parser.remove_pii_columns")
-@patch("api.utils.statement_parser.OpenAI")
+@patch("api.utils.statement_parser.get_openai_client")
 @patch("api.utils.statement_parser.logger")
 def test_extract_statement_details_success(mock_logger, mock_openai, mock_redact):
     """Tests successful extraction of statement details."""
@@ -34,7 +40,9 @@ def test_extract_statement_details_success(mock_logger, mock_openai, mock_redact
         },
     ]
     mock_redact.side_effect = lambda csv_text: f"REDACTED:{csv_text}"
-    mock_message.function_call.arguments = json.dumps({"transactions": transactions})
+    mock_message.tool_calls[0].function.arguments = json.dumps(
+        {"transactions": transactions}
+    )
     mock_choice.message = mock_message
     mock_response.choices = [mock_choice]
     mock_client.chat.completions.create.return_value = mock_response
@@ -80,7 +88,7 @@ def test_extract_statement_details_no_api_key(mock_logger):
 
 
 @patch("api.utils.statement_parser.remove_pii_columns")
-@patch("api.utils.statement_parser.OpenAI")
+@patch("api.utils.statement_parser.get_openai_client")
 @patch("api.utils.statement_parser.logger")
 def test_extract_statement_details_invalid_json(mock_logger, mock_openai, mock_redact):
     """Tests that invalid JSON in the OpenAI response raises a ValueError."""
@@ -89,7 +97,7 @@ def test_extract_statement_details_invalid_json(mock_logger, mock_openai, mock_r
     mock_choice = MagicMock()
     mock_message = MagicMock()
     mock_redact.side_effect = lambda csv_text: f"REDACTED:{csv_text}"
-    mock_message.function_call.arguments = "not a json"
+    mock_message.tool_calls[0].function.arguments = "not a json"
     mock_choice.message = mock_message
     mock_response.choices = [mock_choice]
     mock_client.chat.completions.create.return_value = mock_response
@@ -107,7 +115,7 @@ def test_extract_statement_details_invalid_json(mock_logger, mock_openai, mock_r
 
 
 @patch("api.utils.statement_parser.remove_pii_columns")
-@patch("api.utils.statement_parser.OpenAI")
+@patch("api.utils.statement_parser.get_openai_client")
 def test_extract_statement_details_results_not_dict(mock_openai, mock_redact):
     """Tests that if `transactions` object is not a dict, a ValueError is raised."""
     mock_client = MagicMock()
@@ -115,7 +123,7 @@ def test_extract_statement_details_results_not_dict(mock_openai, mock_redact):
     mock_choice = MagicMock()
     mock_message = MagicMock()
     mock_redact.side_effect = lambda csv_text: f"REDACTED:{csv_text}"
-    mock_message.function_call.arguments = json.dumps(["not a dict"])
+    mock_message.tool_calls[0].function.arguments = json.dumps(["not a dict"])
     mock_choice.message = mock_message
     mock_response.choices = [mock_choice]
     mock_client.chat.completions.create.return_value = mock_response
@@ -130,7 +138,7 @@ def test_extract_statement_details_results_not_dict(mock_openai, mock_redact):
 
 
 @patch("api.utils.statement_parser.remove_pii_columns")
-@patch("api.utils.statement_parser.OpenAI")
+@patch("api.utils.statement_parser.get_openai_client")
 @patch("api.utils.statement_parser.logger")
 def test_extract_statement_details_transaction_not_dict(
     mock_logger, mock_openai, mock_redact
@@ -142,7 +150,9 @@ def test_extract_statement_details_transaction_not_dict(
     mock_message = MagicMock()
     transactions = ["merchant"]
     mock_redact.side_effect = lambda csv_text: f"REDACTED:{csv_text}"
-    mock_message.function_call.arguments = json.dumps({"transactions": transactions})
+    mock_message.tool_calls[0].function.arguments = json.dumps(
+        {"transactions": transactions}
+    )
     mock_choice.message = mock_message
     mock_response.choices = [mock_choice]
     mock_client.chat.completions.create.return_value = mock_response
@@ -157,14 +167,14 @@ def test_extract_statement_details_transaction_not_dict(
 
 
 @patch("api.utils.statement_parser.remove_pii_columns")
-@patch("api.utils.statement_parser.OpenAI")
+@patch("api.utils.statement_parser.get_openai_client")
 def test_extract_statement_details_transaction_missing_fields(mock_openai, mock_redact):
     mock_client = MagicMock()
     mock_response = MagicMock()
     mock_choice = MagicMock()
     mock_message = MagicMock()
     mock_redact.side_effect = lambda csv_text: f"REDACTED:{csv_text}"
-    mock_message.function_call.arguments = json.dumps(
+    mock_message.tool_calls[0].function.arguments = json.dumps(
         {"transactions": [{"merchant": "A", "date": "2024-01-01", "amount": 1.0}]}
     )
     mock_choice.message = mock_message
@@ -182,7 +192,7 @@ def test_extract_statement_details_transaction_missing_fields(mock_openai, mock_
 
 
 @patch("api.utils.statement_parser.remove_pii_columns")
-@patch("api.utils.statement_parser.OpenAI")
+@patch("api.utils.statement_parser.get_openai_client")
 @patch("api.utils.statement_parser.logger")
 def test_extract_statement_details_openai_error(mock_logger, mock_openai, mock_redact):
     mock_client = MagicMock()
@@ -202,3 +212,272 @@ def test_extract_statement_details_openai_error(mock_logger, mock_openai, mock_r
         and str(call_args[0][1]) == "fail"
         for call_args in args_list
     )
+
+
+def _mock_async_response(transactions):
+    """Builds a mock chat completion response carrying the given transactions."""
+    mock_response = MagicMock()
+    mock_response.choices[0].message.tool_calls[0].function.arguments = json.dumps(
+        {"transactions": transactions}
+    )
+    return mock_response
+
+
+def test_split_csv_into_chunks_repeats_header():
+    """Tests that each chunk repeats the header row and keeps rows in order."""
+    csv_text = "Date,Amount\n2024-01-01,1\n2024-01-02,2\n2024-01-03,3\n"
+    chunks = split_csv_into_chunks(csv_text, rows_per_chunk=2)
+    assert chunks == [
+        "Date,Amount\n2024-01-01,1\n2024-01-02,2\n",
+        "Date,Amount\n2024-01-03,3\n",
+    ]
+
+
+def test_split_csv_into_chunks_keeps_quoted_newlines():
+    """Tests that quoted fields spanning several lines stay within a single row."""
+    csv_text = 'Description,Amount\n"Multi\nline",1\nOther,2\n'
+    chunks = split_csv_into_chunks(csv_text, rows_per_chunk=1)
+    assert chunks == [
+        'Description,Amount\n"Multi\nline",1\n',
+        "Description,Amount\nOther,2\n",
+    ]
+
+
+def test_split_csv_into_chunks_header_only():
+    """Tests that a header-only CSV yields a single chunk with just the header."""
+    assert split_csv_into_chunks("Date,Amount\n", rows_per_chunk=5) == ["Date,Amount\n"]
+
+
+@patch("api.utils.statement_parser.get_async_openai_client")
+def test_extract_statement_details_chunked_merges_in_row_order(mock_async_openai):
+    """Tests that chunk results are merged in original row order regardless of completion order."""
+    mock_client = MagicMock()
+
+    async def create(**kwargs):
+        content = kwargs["messages"][-1]["content"]
+        if "2024-01-01" in content:
+            await asyncio.sleep(0.01)
+            return _mock_async_response(
+                [
+                    {
+                        "merchant": "A",
+                        "date": "2024-01-01",
+                        "amount": 1,
+                        "currency": "USD",
+                        "transaction_type": "Expense",
+                    }
+                ]
+            )
+        return _mock_async_response(
+            [
+                {
+                    "merchant": "B",
+                    "date": "2024-01-02",
+                    "amount": 2,
+                    "currency": "USD",
+                    "transaction_type": "Expense",
+                }
+            ]
+        )
+
+    mock_client.chat.completions.create = AsyncMock(side_effect=create)
+    mock_async_openai.return_value = mock_client
+    os.environ["OPENAI_API_KEY"] = "dummy"
+    result = asyncio.run(
+        extract_statement_details_chunked(
+            statement_text="Date,Amount\n2024-01-01,1\n2024-01-02,2\n",
+            prompt_set="card_account_csv_statement_parser",
+            rows_per_chunk=1,
+        )
+    )
+    assert [t["merchant"] for t in result] == ["A", "B"]
+    assert mock_client.chat.completions.create.await_count == 2
+    for call in mock_client.chat.completions.create.await_args_list:
+        assert "Date,Amount" in call.kwargs["messages"][-1]["content"]
+
+
+@patch("api.utils.statement_parser.get_async_openai_client")
+def test_extract_statement_details_chunked_retries_invalid_chunk(
+    mock_async_openai, monkeypatch
+):
+    """Tests that a chunk whose output fails validation on the last model is retried."""
+    monkeypatch.setenv("MODEL_LADDER", "gpt-5-mini")
+    mock_client = MagicMock()
+    good = _mock_async_response(
+        [
+            {
+                "merchant": "A",
+                "date": "2024-01-01",
+                "amount": 1,
+                "currency": "USD",
+                "transaction_type": "Expense",
+            }
+        ]
+    )
+    invalid = _mock_async_response([{"merchant": "A"}])
+    mock_client.chat.completions.create = AsyncMock(side_effect=[invalid, good])
+    mock_async_openai.return_value = mock_client
+    os.environ["OPENAI_API_KEY"] = "dummy"
+    result = asyncio.run(
+        extract_statement_details_chunked(
+            statement_text="Date,Amount\n2024-01-01,1\n",
+            prompt_set="card_account_csv_statement_parser",
+        )
+    )
+    assert len(result) == 1
+    assert mock_client.chat.completions.create.await_count == 2
+
+
+@patch("api.utils.statement_parser.get_async_openai_client")
+def test_extract_statement_details_chunked_does_not_retry_api_errors(mock_async_openai):
+    """Tests that API errors, already retried by the client, fail the chunk without retrying."""
+    mock_client = MagicMock()
+    mock_client.chat.completions.create = AsyncMock(side_effect=OpenAIError("fail"))
+    mock_async_openai.return_value = mock_client
+    os.environ["OPENAI_API_KEY"] = "dummy"
+    with pytest.raises(RuntimeError) as excinfo:
+        asyncio.run(
+            extract_statement_details_chunked(
+                statement_text="Date,Amount\n2024-01-01,1\n",
+                prompt_set="card_account_csv_statement_parser",
+                max_retries=1,
+            )
+        )
+    assert "chunk 0" in str(excinfo.value)
+    assert mock_client.chat.completions.create.await_count == 1
+
+
+@patch("api.utils.statement_parser.get_async_openai_client")
+def test_extract_statement_details_chunked_cancels_other_chunks(mock_async_openai):
+    """Tests that chunks still in flight are cancelled once one chunk fails."""
+    mock_client = MagicMock()
+    cancelled = []
+
+    async def create(**kwargs):
+        if "2024-01-01" in kwargs["messages"][-1]["content"]:
+            raise OpenAIError("fail")
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    mock_client.chat.completions.create = AsyncMock(side_effect=create)
+    mock_async_openai.return_value = mock_client
+    os.environ["OPENAI_API_KEY"] = "dummy"
+    with pytest.raises(RuntimeError):
+        asyncio.run(
+            extract_statement_details_chunked(
+                statement_text="Date,Amount\n2024-01-01,1\n2024-01-02,2\n",
+                prompt_set="card_account_csv_statement_parser",
+                rows_per_chunk=1,
+            )
+        )
+    assert cancelled == [True]
+
+
+def _stream_chunks(arguments, fragment_size=7, prompt_tokens=42):
+    """Builds mock streamed chunks carrying the function call arguments, then a usage chunk."""
+    chunks = []
+    for start in range(0, len(arguments), fragment_size):
+        chunk = MagicMock(usage=None)
+        chunk.choices[0].delta.tool_calls[0].function.arguments = arguments[
+            start : start + fragment_size
+        ]
+        chunks.append(chunk)
+    usage_chunk = MagicMock(choices=[])
+    usage_chunk.usage.prompt_tokens = prompt_tokens
+    chunks.append(usage_chunk)
+    return chunks
+
+
+@patch.dict(os.environ, {"OPENAI_API_KEY": "dummy"})
+@patch("api.utils.statement_parser.get_openai_client")
+def test_stream_statement_details_yields_validated_transactions(mock_openai):
+    """Tests that streamed transactions are yielded one at a time as their objects close."""
+    transactions = [
+        {
+            "merchant": "Store",
+            "date": "2024-01-01",
+            "amount": 10.5,
+            "currency": "USD",
+            "transaction_type": "Expense",
+        },
+        {
+            "merchant": "Cafe",
+            "date": "2024-01-02",
+            "amount": 5.0,
+            "currency": "USD",
+            "transaction_type": "Expense",
+        },
+    ]
+    mock_create = mock_openai.return_value.chat.completions.create
+    mock_create.return_value = iter(
+        _stream_chunks(json.dumps({"transactions": transactions}))
+    )
+    stream = stream_statement_details(
+        "Date,Description,Amount\n2024-01-01,Store,10.50\n",
+        "card_account_csv_statement_parser",
+    )
+    assert next(stream) == transactions[0]
+    assert list(stream) == transactions[1:]
+    assert mock_create.call_args.kwargs["stream"] is True
+
+
+@patch.dict(os.environ, {"OPENAI_API_KEY": "dummy"})
+@patch("api.utils.statement_parser.get_openai_client")
+def test_stream_statement_details_yields_copies_of_cached_transactions(
+    mock_openai, tmp_path, monkeypatch
+):
+    """Tests that annotating streamed transactions does not change the cached result."""
+    monkeypatch.setenv("STATEMENT_CACHE_PATH", str(tmp_path / "cache.sqlite3"))
+    transaction = {
+        "merchant": "Store",
+        "date": "2024-01-01",
+        "amount": 10.5,
+        "currency": "USD",
+        "transaction_type": "Expense",
+    }
+    mock_create = mock_openai.return_value.chat.completions.create
+    mock_create.return_value = iter(
+        _stream_chunks(json.dumps({"transactions": [transaction]}))
+    )
+    statement_text = "Date,Description,Amount\n2024-01-01,Store,10.50\n"
+    for streamed in stream_statement_details(
+        statement_text, "card_account_csv_statement_parser"
+    ):
+        streamed["category"] = "Merchandise"
+    cached = list(
+        stream_statement_details(statement_text, "card_account_csv_statement_parser")
+    )
+    assert cached == [transaction]
+    assert mock_create.call_count == 1
+
+
+@patch.dict(os.environ, {"OPENAI_API_KEY": "dummy"})
+@patch("api.utils.statement_parser.get_openai_client")
+def test_stream_statement_details_invalid_transaction(mock_openai):
+    """Tests that a streamed transaction missing fields raises a ValueError."""
+    arguments = json.dumps({"transactions": [{"merchant": "Store"}]})
+    mock_openai.return_value.chat.completions.create.return_value = iter(
+        _stream_chunks(arguments)
+    )
+    with pytest.raises(ValueError, match="missing expected fields"):
+        list(
+            stream_statement_details(
+                "Date,Amount\n2024-01-01,1.00\n", "card_account_csv_statement_parser"
+            )
+        )
+
+
+@patch.dict(os.environ, {"OPENAI_API_KEY": "dummy"})
+@patch("api.utils.statement_parser.get_openai_client")
+def test_stream_statement_details_openai_error(mock_openai):
+    """Tests that an OpenAI error while streaming raises a RuntimeError."""
+    mock_openai.return_value.chat.completions.create.side_effect = OpenAIError("boom")
+    with pytest.raises(RuntimeError, match="Failed to call OpenAI API."):
+        list(
+            stream_statement_details(
+                "Date,Amount\n2024-01-01,1.00\n", "card_account_csv_statement_parser"
+            )
+        )
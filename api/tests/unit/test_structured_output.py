@@ -0,0 +1,101 @@
+from decimal import Decimal
+
+import pytest
+
+from api.utils.prompts import PROMPTS
+from api.utils.structured_output import (
+    TransactionValidator,
+    get_structured_output,
+    strict_schema,
+    tool_request,
+)
+
+CARD_SCHEMA = PROMPTS["card_account_csv_statement_parser"]["function_schema"]
+CHECKING_SCHEMA = PROMPTS["checking_account_csv_statement_parser"]["function_schema"]
+
+
+def _transaction(**overrides):
+    transaction = {
+        "merchant": "Store",
+        "date": "2024-01-01",
+        "amount": Decimal("10.5"),
+        "currency": "USD",
+        "transaction_type": "Expense",
+    }
+    transaction.update(overrides)
+    return transaction
+
+
+def test_strict_schema_requires_all_properties():
+    """Tests that optional properties become required but nullable and extras are forbidden."""
+    items = strict_schema(CHECKING_SCHEMA["parameters"])["properties"]["transactions"][
+        "items"
+    ]
+    assert items["additionalProperties"] is False
+    assert set(items["required"]) == set(items["properties"])
+    assert items["properties"]["transaction_type"]["type"] == ["string", "null"]
+    assert items["properties"]["merchant"]["type"] == "string"
+    assert "additionalProperties" not in CHECKING_SCHEMA["parameters"]
+
+
+def test_tool_request_forces_strict_tool():
+    """Tests that the tool request forces a strict call of the prompt's function."""
+    request = tool_request(CARD_SCHEMA)
+    assert request["tools"][0]["function"]["strict"] is True
+    assert request["tool_choice"]["function"]["name"] == "extract_transaction"
+
+
+def test_get_structured_output_is_compiled_once():
+    """Tests that the tool request and validator are reused for the same schema."""
+    first = get_structured_output(CARD_SCHEMA)
+    assert get_structured_output(CARD_SCHEMA)[1] is first[1]
+
+
+def test_validator_coerces_amounts_and_dates():
+    """Tests that amounts are rounded to cents from Decimal and dates are normalized."""
+    validator = TransactionValidator(CARD_SCHEMA)
+    result = validator.validate_payload(
+        {
+            "transactions": [
+                _transaction(amount=Decimal("10.005")),
+                _transaction(amount=3),
+            ]
+        }
+    )
+    assert result[0]["amount"] == 10.01
+    assert result[1]["amount"] == 3.0
+    assert result[0]["date"] == "2024-01-01"
+
+
+def test_validator_drops_null_optional_fields():
+    """Tests that null optional fields are dropped while null required fields are rejected."""
+    validator = TransactionValidator(CHECKING_SCHEMA)
+    assert "transaction_type" not in validator.validate_transaction(
+        _transaction(transaction_type=None)
+    )
+    with pytest.raises(ValueError, match="null merchant"):
+        validator.validate_transaction(_transaction(merchant=None))
+
+
+@pytest.mark.parametrize(
+    "overrides, message",
+    [
+        ({"date": "01/02/2024"}, "invalid date"),
+        ({"date": "2024-02-30"}, "invalid date"),
+        ({"amount": "10.50"}, "invalid amount"),
+        ({"amount": True}, "invalid amount"),
+        ({"merchant": 5}, "invalid merchant"),
+        ({"category": "Dining"}, "unexpected fields"),
+    ],
+)
+def test_validator_rejects_malformed_transactions(overrides, message):
+    """Tests that malformed fields are rejected with the field named in the error."""
+    validator = TransactionValidator(CARD_SCHEMA)
+    with pytest.raises(ValueError, match=message):
+        validator.validate_transaction(_transaction(**overrides))
+
+
+def test_validator_rejects_non_list_transactions():
+    """Tests that a transactions value other than a list is rejected."""
+    with pytest.raises(ValueError, match="to be a list"):
+        TransactionValidator(CARD_SCHEMA).validate_payload({"transactions": {}})
@@ -0,0 +1,144 @@
+import asyncio
+from decimal import Decimal
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from api.utils.statement_parser import extract_statement_batch
+from api.utils.transaction_batch import (
+    TransactionBatch,
+    TransactionType,
+    from_day_number,
+    to_day_number,
+)
+
+TRANSACTIONS = [
+    {
+        "merchant": "Coffee Shop",
+        "date": "2024-01-02",
+        "amount": 3.5,
+        "currency": "USD",
+        "transaction_type": "Expense",
+    },
+    {
+        "merchant": "Payroll",
+        "date": "2024-01-15",
+        "amount": 2500.0,
+        "currency": "USD",
+        "transaction_type": "Income",
+    },
+    {
+        "merchant": "Coffee Shop",
+        "date": "2024-01-20",
+        "amount": 0.1,
+        "currency": "EUR",
+        "transaction_type": "Purchase",
+    },
+    {"merchant": "Bookstore", "date": "1969-12-31", "amount": 12.34, "currency": "USD"},
+]
+
+
+def test_day_numbers():
+    """Tests that dates convert to days since 1970-01-01 and back."""
+    assert to_day_number("1970-01-01") == 0
+    assert to_day_number("1969-12-31") == -1
+    assert from_day_number(to_day_number("2024-02-29")) == "2024-02-29"
+
+
+def test_transaction_batch_round_trips_dicts():
+    """Tests that a batch converts back to the exact dict shape it was built from."""
+    batch = TransactionBatch.from_dicts(TRANSACTIONS)
+    assert len(batch) == 4
+    assert batch.to_dicts() == TRANSACTIONS
+    assert list(batch) == TRANSACTIONS
+    assert batch[1] == TRANSACTIONS[1]
+
+
+def test_transaction_batch_columns():
+    """Tests the typed columns and dictionary encodings."""
+    batch = TransactionBatch.from_dicts(TRANSACTIONS)
+    assert list(batch.cents) == [350, 250000, 10, 1234]
+    assert batch.cents.itemsize == 8
+    assert list(batch.days) == [19724, 19737, 19742, -1]
+    assert batch.merchants == ["Coffee Shop", "Payroll", "Bookstore"]
+    assert list(batch.merchant_codes) == [0, 1, 0, 2]
+    assert list(batch.type_codes[:2]) == [
+        TransactionType.EXPENSE,
+        TransactionType.INCOME,
+    ]
+    assert batch.transaction_types[batch.type_codes[2]] == "Purchase"
+    assert batch.transaction_types[batch.type_codes[3]] is None
+
+
+def test_transaction_batch_converts_exact_amounts():
+    """Tests that Decimal and string amounts are converted to cents without float rounding."""
+    batch = TransactionBatch.from_dicts(
+        [
+            {"merchant": "A", "date": "2024-01-01", "amount": Decimal("0.285")},
+            {"merchant": "B", "date": "2024-01-01", "amount": "19.99"},
+            {"merchant": "C", "date": "2024-01-01", "amount": 7},
+        ]
+    )
+    assert list(batch.cents) == [29, 1999, 700]
+    assert batch.currencies == ["USD"]
+
+
+def test_transaction_batch_totals():
+    """Tests grouped sums over encoded columns."""
+    batch = TransactionBatch.from_dicts(TRANSACTIONS)
+    assert batch.total_cents() == 251594
+    assert batch.total_cents_by("merchant") == {
+        "Coffee Shop": 360,
+        "Payroll": 250000,
+        "Bookstore": 1234,
+    }
+    assert batch.total_cents_by("transaction_type") == {
+        "Expense": 350,
+        "Income": 250000,
+        "Purchase": 10,
+        None: 1234,
+    }
+    with pytest.raises(ValueError):
+        batch.total_cents_by("date")
+
+
+def test_transaction_batch_rejects_invalid_dates():
+    """Tests that dates that are not YYYY-MM-DD raise ValueError."""
+    with pytest.raises(ValueError):
+        TransactionBatch.from_dicts(
+            [{"merchant": "A", "date": "01/02/2024", "amount": 1.0}]
+        )
+
+
+def test_transaction_batch_to_numpy_shares_memory():
+    """Tests that NumPy arrays are views over the batch columns."""
+    np = pytest.importorskip("numpy")
+    batch = TransactionBatch.from_dicts(TRANSACTIONS)
+    arrays = batch.to_numpy()
+    assert arrays["amount_cents"].dtype == np.int64
+    assert arrays["amount_cents"].tolist() == [350, 250000, 10, 1234]
+    batch.cents[0] = 999
+    assert arrays["amount_cents"][0] == 999
+
+
+def test_transaction_batch_to_arrow():
+    """Tests the Arrow export types and values."""
+    pa = pytest.importorskip("pyarrow")
+    record_batch = TransactionBatch.from_dicts(TRANSACTIONS).to_arrow()
+    assert record_batch.schema.field("date").type == pa.date32()
+    assert record_batch.column("amount_cents").to_pylist() == [350, 250000, 10, 1234]
+    assert record_batch.column("merchant").to_pylist()[2] == "Coffee Shop"
+
+
+@patch(
+    "api.utils.statement_parser.extract_statement_details_chunked",
+    new_callable=AsyncMock,
+)
+def test_extract_statement_batch(mock_extract):
+    """Tests that the parser can return its transactions as a batch."""
+    mock_extract.return_value = TRANSACTIONS
+    batch = asyncio.run(
+        extract_statement_batch("Date,Amount\n", "card_account_csv_statement_parser")
+    )
+    assert isinstance(batch, TransactionBatch)
+    assert batch.to_dicts() == TRANSACTIONS
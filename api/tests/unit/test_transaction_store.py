@@ -0,0 +1,183 @@
+from unittest.mock import patch
+
+import pytest
+
+from api.utils.transaction_store import TransactionStore, to_cents
+
+
+def _transaction(merchant, date, amount, transaction_type="Expense"):
+    return {
+        "merchant": merchant,
+        "date": date,
+        "amount": amount,
+        "currency": "USD",
+        "transaction_type": transaction_type,
+    }
+
+
+TRANSACTIONS = [
+    _transaction("Coffee", "2024-01-02", 4.5),
+    _transaction("Coffee", "2024-01-02", 4.5),
+    _transaction("Grocer", "2024-01-15", 82.13),
+    _transaction("Payroll", "2024-02-01", 2500, "Income"),
+]
+
+
+def test_to_cents_avoids_float_errors():
+    """Tests that amounts are converted to exact cents."""
+    assert to_cents(0.1 + 0.2) == 30
+    assert to_cents(19.99) == 1999
+    assert to_cents("-12.345") == -1235
+
+
+def test_insert_transactions_is_idempotent():
+    """Tests that re-inserting a statement inserts nothing while identical purchases are kept."""
+    store = TransactionStore(":memory:")
+    assert store.insert_transactions(TRANSACTIONS, account="card") == 4
+    assert store.insert_transactions(TRANSACTIONS, account="card") == 0
+    assert store.insert_transactions(TRANSACTIONS[:1], account="checking") == 1
+
+
+def test_query_transactions_filters():
+    """Tests that listings are filtered by account, date range, merchant and type."""
+    store = TransactionStore(":memory:")
+    store.insert_transactions(TRANSACTIONS, account="card")
+    store.insert_transactions([_transaction("Rent", "2024-01-03", 1200)], "checking")
+    assert len(store.query_transactions(account="card")) == 4
+    assert [t["merchant"] for t in store.query_transactions(end_date="2024-01-03")] == [
+        "Rent",
+        "Coffee",
+        "Coffee",
+    ]
+    assert store.query_transactions(merchant="Grocer")[0]["amount"] == 82.13
+    assert len(store.query_transactions(transaction_type="Income")) == 1
+    assert len(store.query_transactions(limit=2, offset=4)) == 1
+
+
+def test_summarize_groups():
+    """Tests grouped sums per month, merchant and transaction type."""
+    store = TransactionStore(":memory:")
+    store.insert_transactions(TRANSACTIONS, account="card")
+    assert store.summarize("month") == [
+        {"month": "2024-01", "total": 91.13, "count": 3},
+        {"month": "2024-02", "total": 2500.0, "count": 1},
+    ]
+    assert store.summarize("merchant", transaction_type="Expense")[0] == {
+        "merchant": "Coffee",
+        "total": 9.0,
+        "count": 2,
+    }
+    assert [g["transaction_type"] for g in store.summarize("transaction_type")] == [
+        "Expense",
+        "Income",
+    ]
+
+
+def test_summarize_rejects_unknown_group():
+    """Tests that unknown group_by values raise a ValueError."""
+    with pytest.raises(ValueError) as excinfo:
+        TransactionStore(":memory:").summarize("date; DROP TABLE transactions")
+    assert "Cannot group by" in str(excinfo.value)
+
+
+def test_transaction_store_persists(tmp_path):
+    """Tests that transactions survive reopening the database."""
+    path = str(tmp_path / "transactions.sqlite3")
+    TransactionStore(path).insert_transactions(TRANSACTIONS, account="card")
+    assert len(TransactionStore(path).query_transactions()) == 4
+
+
+def _raw_summary(store, group_by, **filters):
+    """Sums straight from the transactions table, bypassing the monthly rollups."""
+    with patch("api.utils.transaction_store._month_bounds", return_value=None):
+        return store.summarize(group_by, **filters)
+
+
+def test_summarize_from_rollups_matches_transactions():
+    """Tests that month-aligned summaries from the rollups equal sums over the transactions."""
+    store = TransactionStore(":memory:")
+    store.insert_transactions(TRANSACTIONS, account="card")
+    store.insert_transactions(TRANSACTIONS, account="card")
+    store.insert_transactions(
+        [
+            _transaction("Rent", "2024-01-31", 1200),
+            _transaction("Rent", "2024-02-29", 1200),
+        ],
+        "checking",
+    )
+    store.replace_transfers([(5, 6, 29, 1.0)])
+    for group_by in ("month", "merchant", "transaction_type", "account"):
+        for filters in (
+            {},
+            {"start_date": "2024-02-01"},
+            {"start_date": "2024-01-01", "end_date": "2024-01-31"},
+            {"account": "card", "transaction_type": "Expense"},
+            {"merchant": "Rent", "exclude_transfers": True},
+            {"exclude_transfers": True},
+        ):
+            assert store.summarize(group_by, **filters) == _raw_summary(
+                store, group_by, **filters
+            )
+    store.replace_transfers([])
+    assert store.summarize("merchant", merchant="Rent") == [
+        {"merchant": "Rent", "total": 2400.0, "count": 2}
+    ]
+
+
+def test_summarize_cuts_through_month_from_transactions():
+    """Tests that date ranges that cut through a month are summed from the transactions."""
+    store = TransactionStore(":memory:")
+    store.insert_transactions(TRANSACTIONS, account="card")
+    assert store.summarize("month", start_date="2024-01-10", end_date="2024-02-15") == [
+        {"month": "2024-01", "total": 82.13, "count": 1},
+        {"month": "2024-02", "total": 2500.0, "count": 1},
+    ]
+
+
+def test_rollups_are_backfilled_for_existing_stores(tmp_path):
+    """Tests that a store created before rollups existed gets them built on open."""
+    path = str(tmp_path / "transactions.sqlite3")
+    store = TransactionStore(path)
+    store.insert_transactions(TRANSACTIONS, account="card")
+    store._conn.executescript(
+        "DROP TRIGGER transactions_rollup; DROP TRIGGER transactions_intervals; "
+        "DROP TABLE monthly_rollups; DROP TABLE merchant_intervals;"
+    )
+    reopened = TransactionStore(path)
+    assert reopened.summarize("month") == _raw_summary(reopened, "month")
+    [coffee] = reopened.merchant_intervals(min_occurrences=2)
+    assert (coffee["merchant"], coffee["occurrences"]) == ("Coffee", 2)
+
+
+def test_merchant_intervals_are_maintained_incrementally():
+    """Tests that interval statistics match a recomputation, including out-of-order inserts."""
+    store = TransactionStore(":memory:")
+    charges = [
+        _transaction("NETFLIX.COM", day, amount)
+        for day, amount in (
+            ("2024-01-05", 15.49),
+            ("2024-02-05", 15.49),
+            ("2024-03-06", 15.49),
+            ("2024-04-05", 17.99),
+        )
+    ]
+    store.insert_transactions(charges[2:], "card")
+    store.insert_transactions(charges[:2], "card")
+    store.insert_transactions(
+        [_transaction("NETFLIX.COM", "2024-02-05", -15.49)], "card"
+    )
+    store.insert_transactions(charges, "card")
+    [stats] = store.merchant_intervals()
+    assert stats["occurrences"] == 4
+    assert stats["interval_count"] == 3
+    assert stats["interval_mean"] == pytest.approx(91 / 3)
+    assert stats["interval_std"] == pytest.approx(0.4714, abs=1e-4)
+    assert stats["amount_mean"] == pytest.approx(16.115)
+    assert stats["amount_std"] == pytest.approx(1.0825, abs=1e-4)
+    assert (stats["first_date"], stats["last_date"]) == ("2024-01-05", "2024-04-05")
+    store.insert_transactions(
+        [_transaction("NETFLIX.COM", "2024-05-05", 17.99)], "card"
+    )
+    assert store.merchant_intervals()[0]["interval_count"] == 4
+    assert store.merchant_intervals(min_occurrences=6) == []
+    assert store.merchant_intervals(account="checking") == []
@@ -0,0 +1,58 @@
+import json
+
+import pytest
+
+from api.utils.transaction_stream import TransactionStreamParser
+
+TRANSACTIONS = [
+    {"merchant": 'Joe\'s "Cafe" {NYC}', "date": "2024-01-01", "amount": 4.5},
+    {"merchant": "Store\\Outlet [2]", "date": "2024-01-02", "amount": 10.0},
+]
+
+
+def _parse(fragments):
+    """Feeds fragments to a new parser and returns every emitted transaction."""
+    parser = TransactionStreamParser()
+    emitted = [item for fragment in fragments for item in parser.feed(fragment)]
+    parser.close()
+    return emitted
+
+
+def test_parser_emits_transactions_at_any_split():
+    """Tests that objects are emitted correctly however the payload is fragmented."""
+    payload = json.dumps({"notes": "a,b:c", "transactions": TRANSACTIONS})
+    for split in range(1, len(payload)):
+        assert _parse([payload[:split], payload[split:]]) == TRANSACTIONS
+    assert _parse(list(payload)) == TRANSACTIONS
+
+
+def test_parser_emits_each_object_when_it_closes():
+    """Tests that a transaction is emitted before the rest of the payload arrives."""
+    parser = TransactionStreamParser()
+    first = json.dumps(TRANSACTIONS[0])
+    assert list(parser.feed('{"transactions": [' + first[:-1])) == []
+    assert list(parser.feed("}, {")) == [TRANSACTIONS[0]]
+
+
+def test_parser_ignores_arrays_under_other_keys():
+    """Tests that only elements of the transactions array are emitted."""
+    payload = json.dumps({"other": [{"a": 1}], "transactions": []})
+    assert _parse([payload]) == []
+
+
+def test_parser_rejects_non_object_payload():
+    """Tests that a payload that is not an object raises a ValueError."""
+    with pytest.raises(ValueError, match="Expected response to be a dict"):
+        _parse(['["transactions"]'])
+
+
+def test_parser_rejects_non_object_transactions():
+    """Tests that array elements other than objects raise a ValueError."""
+    with pytest.raises(ValueError, match="only objects"):
+        _parse(['{"transactions": ["Store"]}'])
+
+
+def test_parser_rejects_incomplete_payload():
+    """Tests that a payload cut off before its closing brace raises a ValueError."""
+    with pytest.raises(ValueError, match="Failed to parse"):
+        _parse(['{"transactions": [{"merchant": "Store"}'])
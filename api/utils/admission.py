@@ -0,0 +1,203 @@
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Any
+
+from api.utils.metrics import record_admission
+from api.utils.setup_logger import setup_logger
+
+logger = setup_logger(__name__)
+
+DEFAULT_MAX_IN_FLIGHT = 8
+DEFAULT_MAX_PER_CLIENT = 2
+DEFAULT_MAX_QUEUED = 32
+DEFAULT_QUEUE_TIMEOUT = 10.0
+INITIAL_HOLD_SECONDS = 1.0
+HOLD_SMOOTHING = 0.2
+
+
+class AdmissionRejectedError(Exception):
+    """Raised when a request is not admitted because the queue is full or its wait timed out."""
+
+    def __init__(self, message: str, retry_after: int):
+        """
+        Args:
+            message (str): The reason the request was rejected.
+            retry_after (int): The suggested number of seconds before retrying.
+        """
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdmissionTicket:
+    """A slot held by an admitted request. Releasing it more than once has no effect."""
+
+    __slots__ = ("controller", "client", "admitted_at", "released")
+
+    def __init__(self, controller: "AdmissionController", client: str):
+        self.controller = controller
+        self.client = client
+        self.admitted_at = time.monotonic()
+        self.released = False
+
+    def release(self) -> None:
+        """Gives the slot back, admitting the next waiting request that fits."""
+        if not self.released:
+            self.released = True
+            self.controller._release(self)
+
+
+class AdmissionController:
+    """
+    Caps the number of statement parses in flight, overall and per client. Requests over a cap wait
+    in a FIFO queue of bounded depth; when a slot frees, it goes to the oldest waiting request whose
+    client is under its own cap. Requests are rejected when the queue is full or their wait times
+    out, with a retry hint based on how long parses have recently held their slots.
+
+    All methods must be called from the event loop the controller is used on.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+        max_per_client: int = DEFAULT_MAX_PER_CLIENT,
+        max_queued: int = DEFAULT_MAX_QUEUED,
+        queue_timeout: float = DEFAULT_QUEUE_TIMEOUT,
+    ):
+        """
+        Args:
+            max_in_flight (int): The maximum number of admitted parses across all clients.
+            max_per_client (int): The maximum number of admitted parses per client.
+            max_queued (int): The maximum number of requests waiting for admission.
+            queue_timeout (float): The longest a request waits for admission, in seconds.
+        """
+        if min(max_in_flight, max_per_client) < 1 or max_queued < 0:
+            raise ValueError(
+                "Admission limits must be positive and the queue depth non-negative."
+            )
+        self.max_in_flight = max_in_flight
+        self.max_per_client = max_per_client
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self._clients: dict[str, int] = {}
+        self._waiters: deque[tuple[str, asyncio.Future]] = deque()
+        self._average_hold = INITIAL_HOLD_SECONDS
+        self._counts = {"admitted": 0, "timeout": 0, "rejected": 0}
+        self._total_wait = 0.0
+
+    @property
+    def depth(self) -> int:
+        """The number of requests waiting for admission."""
+        return len(self._waiters)
+
+    def _fits(self, client: str) -> bool:
+        return (
+            self.in_flight < self.max_in_flight
+            and self._clients.get(client, 0) < self.max_per_client
+        )
+
+    def _take(self, client: str) -> None:
+        self.in_flight += 1
+        self._clients[client] = self._clients.get(client, 0) + 1
+
+    def _retry_after(self) -> int:
+        """Estimates the seconds until the queue ahead of a new request has drained."""
+        waves = (len(self._waiters) + 1) / self.max_in_flight
+        return max(math.ceil(self._average_hold * waves), 1)
+
+    def _record(self, outcome: str | None = None, started: float = 0.0) -> None:
+        seconds = time.monotonic() - started if outcome else 0.0
+        if outcome:
+            self._counts[outcome] += 1
+            self._total_wait += seconds
+        record_admission(self.in_flight, len(self._waiters), outcome, seconds)
+
+    def _reject(self, message: str, outcome: str, started: float) -> None:
+        self._record(outcome, started)
+        logger.warning("%s (%d in flight).", message, self.in_flight)
+        raise AdmissionRejectedError(message, self._retry_after())
+
+    async def acquire(self, client: str) -> AdmissionTicket:
+        """
+        Admits a request, waiting in the queue while the global or per-client cap is reached.
+
+        Args:
+            client (str): The client the request comes from, e.g. its address.
+
+        Returns:
+            AdmissionTicket: The slot, which must be released once the parse finishes.
+
+        Raises:
+            AdmissionRejectedError: If the queue is full or the wait exceeded queue_timeout.
+        """
+        started = time.monotonic()
+        if self._fits(client):
+            self._take(client)
+            self._record("admitted", started)
+            return AdmissionTicket(self, client)
+        if len(self._waiters) >= self.max_queued:
+            self._reject("Admission queue is full", "rejected", started)
+        future = asyncio.get_running_loop().create_future()
+        waiter = (client, future)
+        self._waiters.append(waiter)
+        self._record()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if not future.done():
+                future.cancel()
+                self._waiters.remove(waiter)
+                if isinstance(e, asyncio.CancelledError):
+                    self._record()
+                    raise
+                self._reject("Timed out waiting for admission", "timeout", started)
+            if isinstance(e, asyncio.CancelledError):
+                AdmissionTicket(self, client).release()
+                raise
+        self._record("admitted", started)
+        return AdmissionTicket(self, client)
+
+    def _release(self, ticket: AdmissionTicket) -> None:
+        """Frees a ticket's slot and hands freed slots to the oldest waiters that fit."""
+        held = time.monotonic() - ticket.admitted_at
+        self._average_hold += HOLD_SMOOTHING * (held - self._average_hold)
+        self.in_flight -= 1
+        remaining = self._clients[ticket.client] - 1
+        if remaining:
+            self._clients[ticket.client] = remaining
+        else:
+            del self._clients[ticket.client]
+        for waiter in list(self._waiters):
+            if self.in_flight >= self.max_in_flight:
+                break
+            client, future = waiter
+            if self._fits(client):
+                self._waiters.remove(waiter)
+                self._take(client)
+                future.set_result(None)
+        self._record()
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Returns the current load and the wait statistics since the controller was created.
+
+        Returns:
+            dict[str, Any]: The limits, in_flight, queued and per-client in-flight counts, the
+                admitted, timeout and rejected counts, and the average wait in seconds.
+        """
+        waited = sum(self._counts.values())
+        return {
+            "max_in_flight": self.max_in_flight,
+            "max_per_client": self.max_per_client,
+            "max_queued": self.max_queued,
+            "queue_timeout": self.queue_timeout,
+            "in_flight": self.in_flight,
+            "queued": len(self._waiters),
+            "clients": dict(self._clients),
+            **self._counts,
+            "average_wait_seconds": round(self._total_wait / waited, 6)
+            if waited
+            else 0.0,
+        }
@@ -0,0 +1,288 @@
+"""
+Bulk ingestion of statement folders and archives.
+
+Usage (from the repository root):
+    python -m api.utils.bulk_ingest statements/ --prompt-set card_account_csv_statement_parser
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import multiprocessing
+import os
+import sys
+import time
+import zipfile
+from collections.abc import AsyncIterator, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any
+
+from api.utils.environment import load_environment
+from api.utils.file_reader import decode_csv_bytes
+from api.utils.openai_client import aclose_clients
+from api.utils.prompts import PROMPTS
+from api.utils.reconciliation import save_transactions
+from api.utils.redact_pii import remove_pii_columns
+from api.utils.setup_logger import setup_logger
+from api.utils.statement_parser import (
+    DEFAULT_MAX_CONCURRENCY,
+    categorize_transactions,
+    extract_statement_details_chunked,
+)
+from api.utils.transaction_store import get_transaction_store
+
+logger = setup_logger(__name__)
+
+STATEMENT_SUFFIX = ".csv"
+START_METHOD = (
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+
+@dataclass(frozen=True)
+class StatementSource:
+    """A statement file on disk, optionally a member of a zip archive or a gzip-compressed file."""
+
+    name: str
+    path: str
+    member: str | None = None
+
+    def read_bytes(self) -> bytes:
+        """
+        Reads the raw statement bytes, decompressing them if needed.
+
+        Returns:
+            bytes: The statement content.
+        """
+        if self.member is not None:
+            with zipfile.ZipFile(self.path) as archive:
+                return archive.read(self.member)
+        if self.path.lower().endswith(".gz"):
+            with gzip.open(self.path, "rb") as file:
+                return file.read()
+        with open(self.path, "rb") as file:
+            return file.read()
+
+
+@dataclass
+class IngestResult:
+    """The outcome of ingesting a single statement."""
+
+    source: str
+    status: str
+    transactions: list[dict] | None = None
+    error: str | None = None
+    encoding: str | None = None
+    inserted: int | None = None
+    seconds: float = 0.0
+    started_at: float = field(default_factory=time.perf_counter, repr=False)
+
+    def to_dict(self) -> dict[str, Any]:
+        """
+        Returns the result fields for reporting.
+
+        Returns:
+            dict[str, Any]: The source, status, transactions, error, encoding, inserted count and
+                duration.
+        """
+        return {
+            "source": self.source,
+            "status": self.status,
+            "transactions": self.transactions,
+            "error": self.error,
+            "encoding": self.encoding,
+            "inserted": self.inserted,
+            "seconds": round(self.seconds, 3),
+        }
+
+
+def iter_statement_sources(path: str) -> Iterator[StatementSource]:
+    """
+    Finds the statements under a path: CSV files, gzip-compressed CSV files and the CSV members of
+    zip archives, walking directories recursively in sorted order.
+
+    Args:
+        path (str): A statement file, archive or directory.
+
+    Yields:
+        StatementSource: Each statement found.
+    """
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                yield from iter_statement_sources(os.path.join(root, name))
+        return
+    lowered = path.lower()
+    if lowered.endswith(".zip"):
+        try:
+            with zipfile.ZipFile(path) as archive:
+                members = sorted(archive.namelist())
+        except zipfile.BadZipFile:
+            logger.error("Skipping unreadable zip archive %s.", path)
+            return
+        for member in members:
+            if member.lower().endswith(STATEMENT_SUFFIX) and not member.endswith("/"):
+                yield StatementSource(name=f"{path}!{member}", path=path, member=member)
+    elif lowered.endswith(STATEMENT_SUFFIX) or lowered.endswith(
+        STATEMENT_SUFFIX + ".gz"
+    ):
+        yield StatementSource(name=path, path=path)
+
+
+def preprocess_statement(source: StatementSource) -> tuple[str, str]:
+    """
+    Reads, decodes and redacts a statement. Runs in a worker process.
+
+    Args:
+        source (StatementSource): The statement to read.
+
+    Returns:
+        tuple[str, str]: The redacted statement text and the encoding it was decoded with.
+    """
+    text, encoding = decode_csv_bytes(source.read_bytes())
+    return remove_pii_columns(csv_text=text), encoding
+
+
+async def ingest_statements(
+    path: str,
+    prompt_set: str,
+    account: str | None = None,
+    max_processes: int | None = None,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    **extract_options,
+) -> AsyncIterator[IngestResult]:
+    """
+    Ingests every statement under a directory or archive. Reading, decoding and PII redaction run on
+    a process pool, and redacted statements feed a bounded async stage that sends at most
+    max_concurrency statements to the model at once. Preprocessing pauses while that stage is busy,
+    so memory stays bounded however many files there are. Transactions are categorized by merchant
+    and, when an account is given, saved with their transfers reconciled, as for uploads.
+
+    Args:
+        path (str): A statement file, archive or directory.
+        prompt_set (str): The prompt set used for every statement.
+        account (str | None): When set, the transactions are saved to the transaction store under
+            this account and transfers between accounts are reconciled around their dates.
+        max_processes (int | None): The number of preprocessing processes, or None for one per CPU.
+        max_concurrency (int): The maximum number of statements being extracted at once.
+        **extract_options: Passed to extract_statement_details_chunked.
+
+    Yields:
+        IngestResult: The result of each statement, in completion order.
+    """
+    if prompt_set not in PROMPTS:
+        logger.error("Invalid prompt set: %s", prompt_set)
+        raise ValueError(f"Prompt set '{prompt_set}' not found in PROMPTS dictionary.")
+    if max_concurrency < 1:
+        raise ValueError("max_concurrency must be at least 1")
+    sources = list(iter_statement_sources(path))
+    logger.info("Found %d statements under %s.", len(sources), path)
+    if not sources:
+        return
+    loop = asyncio.get_running_loop()
+    redacted: asyncio.Queue = asyncio.Queue(maxsize=max_concurrency)
+    results: asyncio.Queue = asyncio.Queue()
+    processes = max_processes or os.cpu_count() or 1
+    # Workers start lazily while the log listener and store threads run, so they must not be forked.
+    pool = ProcessPoolExecutor(
+        max_workers=processes, mp_context=multiprocessing.get_context(START_METHOD)
+    )
+    preprocess_slots = asyncio.Semaphore(processes + max_concurrency)
+
+    async def preprocess(source: StatementSource) -> None:
+        result = IngestResult(source=source.name, status="running")
+        async with preprocess_slots:
+            try:
+                text, result.encoding = await loop.run_in_executor(
+                    pool, preprocess_statement, source
+                )
+            except Exception as e:
+                result.status, result.error = "failed", str(e)
+                result.seconds = time.perf_counter() - result.started_at
+                await results.put(result)
+                return
+            await redacted.put((result, text))
+
+    async def extract() -> None:
+        while (item := await redacted.get()) is not None:
+            result, text = item
+            try:
+                result.transactions = await extract_statement_details_chunked(
+                    statement_text=text,
+                    prompt_set=prompt_set,
+                    redacted=True,
+                    **extract_options,
+                )
+                result.transactions = await asyncio.to_thread(
+                    categorize_transactions, result.transactions
+                )
+                if account:
+                    result.inserted = await asyncio.to_thread(
+                        save_transactions,
+                        get_transaction_store(),
+                        result.transactions,
+                        account,
+                    )
+                result.status = "succeeded"
+            except Exception as e:
+                result.status, result.error = "failed", str(e)
+            result.seconds = time.perf_counter() - result.started_at
+            await results.put(result)
+
+    async def produce() -> None:
+        await asyncio.gather(*(preprocess(source) for source in sources))
+        for _ in range(max_concurrency):
+            await redacted.put(None)
+
+    tasks = [asyncio.create_task(produce())]
+    tasks.extend(asyncio.create_task(extract()) for _ in range(max_concurrency))
+    try:
+        for _ in range(len(sources)):
+            result = await results.get()
+            if result.status == "failed":
+                logger.error("Failed to ingest %s: %s", result.source, result.error)
+            yield result
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def _report(args: argparse.Namespace) -> int:
+    failed = 0
+    try:
+        async for result in ingest_statements(
+            path=args.path,
+            prompt_set=args.prompt_set,
+            account=args.account,
+            max_processes=args.processes,
+            max_concurrency=args.concurrency,
+        ):
+            failed += result.status == "failed"
+            print(json.dumps(result.to_dict()), flush=True)
+    finally:
+        await aclose_clients()
+    return 1 if failed else 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Ingest every CSV statement under a directory, .zip or .gz file, writing one "
+        "JSON result per statement to stdout."
+    )
+    parser.add_argument("path")
+    parser.add_argument("--prompt-set", required=True, choices=sorted(PROMPTS))
+    parser.add_argument("--account", help="Save transactions under this account.")
+    parser.add_argument("--processes", type=int, help="Preprocessing processes.")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_MAX_CONCURRENCY)
+    args = parser.parse_args(argv)
+    load_environment()
+    return asyncio.run(_report(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,290 @@
+import csv
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from api.utils.setup_logger import setup_logger
+
+logger = setup_logger(__name__)
+
+MAPPING_FIELDS = (
+    "merchant_column",
+    "date_column",
+    "date_format",
+    "amount_column",
+    "amount_sign",
+    "debit_column",
+    "credit_column",
+    "currency_column",
+)
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def _normalize_column(column: str) -> str:
+    """Returns a column name as compared across layouts: lower-cased and stripped."""
+    return column.strip().lower()
+
+
+def header_signature(header: list[str]) -> str:
+    """
+    Builds a stable signature for a CSV layout from its header row. Column names are compared
+    case-insensitively and ignoring surrounding whitespace.
+
+    Args:
+        header (list[str]): The column names from the header row.
+
+    Returns:
+        str: A hex digest identifying the CSV layout.
+    """
+    normalized = "\x1f".join(_normalize_column(column) for column in header)
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def validate_column_mapping(mapping: dict, header: list[str]) -> dict:
+    """
+    Checks that a column mapping only refers to columns present in the header and describes
+    either a single amount column or a debit/credit column pair. Columns are matched the same way
+    as in header_signature, ignoring case and surrounding whitespace.
+
+    Args:
+        mapping (dict): The column mapping to validate.
+        header (list[str]): The column names from the header row.
+
+    Returns:
+        dict: The mapping restricted to the known mapping fields.
+
+    Raises:
+        ValueError: If the mapping is incomplete or refers to unknown columns.
+    """
+    missing = set(MAPPING_FIELDS) - mapping.keys()
+    if missing:
+        raise ValueError(f"Column mapping is missing expected fields: {missing}")
+    mapping = {field: mapping[field] for field in MAPPING_FIELDS}
+    columns = {_normalize_column(column) for column in header}
+    for field in (
+        "merchant_column",
+        "date_column",
+        "amount_column",
+        "debit_column",
+        "credit_column",
+        "currency_column",
+    ):
+        column = mapping[field]
+        if column is not None and (
+            not isinstance(column, str) or _normalize_column(column) not in columns
+        ):
+            raise ValueError(f"Column mapping {field} '{column}' is not in the header.")
+    if mapping["merchant_column"] is None or mapping["date_column"] is None:
+        raise ValueError("Column mapping must include merchant and date columns.")
+    if mapping["amount_column"] is None and (
+        mapping["debit_column"] is None and mapping["credit_column"] is None
+    ):
+        raise ValueError(
+            "Column mapping must include an amount or debit/credit column."
+        )
+    if mapping["amount_sign"] not in ("expense_positive", "expense_negative"):
+        raise ValueError(f"Unknown amount sign '{mapping['amount_sign']}'.")
+    return mapping
+
+
+def _parse_amount(value: str) -> float | None:
+    """
+    Parses an amount string such as '$1,234.50', '(12.00)' or '-3.5'.
+
+    Args:
+        value (str): The raw amount value from the CSV.
+
+    Returns:
+        float | None: The parsed amount, or None if the value is blank or not a number.
+    """
+    value = value.strip().replace("$", "").replace(",", "")
+    if not value:
+        return None
+    negative = value.startswith("(") and value.endswith(")")
+    if negative:
+        value = value[1:-1]
+    try:
+        amount = float(value)
+    except ValueError:
+        return None
+    return -amount if negative else amount
+
+
+def parse_with_column_mapping(
+    csv_text: str, mapping: dict, prompt_set: str
+) -> list[dict[str, str | float]]:
+    """
+    Parses a CSV statement locally using a known column mapping. The returned transactions have the
+    same shape and sign conventions as the model output for the given prompt set: card statements
+    report expenses as positive amounts and refunds as negative ones, while checking statements
+    report absolute amounts with an 'Expense' or 'Income' transaction type. Rows without a parsable
+    date or amount, such as summaries or footers, are skipped. Mapped columns are resolved ignoring
+    case and surrounding whitespace, as in header_signature.
+
+    Args:
+        csv_text (str): The redacted CSV text, including the header row.
+        mapping (dict): A validated column mapping.
+        prompt_set (str): Either 'card_account_csv_statement_parser' or
+            'checking_account_csv_statement_parser'.
+
+    Returns:
+        list[dict[str, str | float]]: The parsed transactions, in row order.
+
+    Raises:
+        ValueError: If the prompt set is not supported or a mapped column is not in the header.
+    """
+    if prompt_set not in (
+        "card_account_csv_statement_parser",
+        "checking_account_csv_statement_parser",
+    ):
+        raise ValueError(
+            f"Local parsing is not supported for prompt set '{prompt_set}'."
+        )
+    reader = csv.reader(io.StringIO(csv_text))
+    header = next(reader, [])
+    index = {}
+    for position, column in enumerate(header):
+        index.setdefault(_normalize_column(column), position)
+
+    def column_index(field):
+        column = mapping[field]
+        if column is None:
+            return None
+        position = index.get(_normalize_column(column))
+        if position is None:
+            raise ValueError(f"Column mapping {field} '{column}' is not in the header.")
+        return position
+
+    merchant_index = column_index("merchant_column")
+    date_index = column_index("date_column")
+    amount_index = column_index("amount_column")
+    debit_index = column_index("debit_column")
+    credit_index = column_index("credit_column")
+    currency_index = column_index("currency_column")
+    date_format = mapping["date_format"]
+    expense_sign = 1 if mapping["amount_sign"] == "expense_positive" else -1
+    is_card = prompt_set == "card_account_csv_statement_parser"
+
+    def cell(row, position):
+        return row[position] if position is not None and position < len(row) else ""
+
+    transactions = []
+    for row in reader:
+        if not row:
+            continue
+        try:
+            date = datetime.strptime(cell(row, date_index).strip(), date_format)
+        except ValueError:
+            continue
+        if amount_index is not None:
+            amount = _parse_amount(cell(row, amount_index))
+            expense_amount = None if amount is None else expense_sign * amount
+        else:
+            debit = _parse_amount(cell(row, debit_index))
+            credit = _parse_amount(cell(row, credit_index))
+            if debit:
+                expense_amount = abs(debit)
+            elif credit:
+                expense_amount = -abs(credit)
+            else:
+                expense_amount = debit if debit is not None else credit
+        if expense_amount is None:
+            continue
+        if is_card:
+            amount = round(expense_amount, 2)
+            transaction_type = "Expense"
+        else:
+            amount = round(abs(expense_amount), 2)
+            transaction_type = "Income" if expense_amount < 0 else "Expense"
+        transactions.append(
+            {
+                "merchant": cell(row, merchant_index).strip(),
+                "date": date.strftime("%Y-%m-%d"),
+                "amount": amount,
+                "currency": cell(row, currency_index).strip() or "USD",
+                "transaction_type": transaction_type,
+            }
+        )
+    return transactions
+
+
+class ColumnMappingStore:
+    """
+    A persistent SQLite store of column mappings keyed by CSV header signature.
+    """
+
+    def __init__(self, path: str):
+        """
+        Opens (or creates) the mapping database at the given path.
+
+        Args:
+            path (str): The path to the SQLite database file, or ':memory:' for a per-process store.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS column_mappings ("
+            "signature TEXT PRIMARY KEY, header TEXT NOT NULL, mapping TEXT NOT NULL, "
+            "created_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, signature: str) -> dict | None:
+        """
+        Looks up the column mapping for a header signature.
+
+        Args:
+            signature (str): The signature built by header_signature.
+
+        Returns:
+            dict | None: The stored column mapping, or None if the layout has not been seen.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT mapping FROM column_mappings WHERE signature = ?", (signature,)
+            ).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def set(self, signature: str, header: list[str], mapping: dict) -> None:
+        """
+        Stores the column mapping for a header signature.
+
+        Args:
+            signature (str): The signature built by header_signature.
+            header (list[str]): The column names from the header row.
+            mapping (dict): The validated column mapping.
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO column_mappings (signature, header, mapping, created_at) "
+                "VALUES (?, ?, ?, ?)",
+                (signature, json.dumps(header), json.dumps(mapping), time.time()),
+            )
+            self._conn.commit()
+
+
+def get_column_mapping_store() -> ColumnMappingStore:
+    """
+    Returns the process-wide column mapping store. Mappings are persisted to the SQLite file at
+    COLUMN_MAPPING_PATH when it is set, and kept in memory for the life of the process otherwise.
+
+    Returns:
+        ColumnMappingStore: The shared mapping store.
+    """
+    global _store
+    path = os.environ.get("COLUMN_MAPPING_PATH") or ":memory:"
+    with _store_lock:
+        if _store is None or _store.path != path:
+            _store = ColumnMappingStore(path=path)
+        return _store
@@ -0,0 +1,21 @@
+import threading
+
+_loaded = False
+_lock = threading.Lock()
+
+
+def load_environment() -> None:
+    """
+    Loads variables from a .env file into the environment, once per process. Variables that are
+    already set are not overridden. It is called on app startup and before the first model call
+    instead of at import time, so importing the package stays cheap.
+    """
+    global _loaded
+    if _loaded:
+        return
+    with _lock:
+        if not _loaded:
+            from dotenv import load_dotenv
+
+            load_dotenv()
+            _loaded = True
@@ -1,7 +1,11 @@
+from api.utils.metrics import span
 from api.utils.setup_logger import setup_logger
 
 logger = setup_logger(__name__)
 
+UTF8_BOM = b"\xef\xbb\xbf"
+FALLBACK_ENCODINGS = ("cp1252", "latin-1")
+
 
 def read_csv_file(file_path: str) -> str:
     """
@@ -14,7 +18,7 @@ def read_csv_file(file_path: str) -> str:
         str: The text content of the CSV file.
     """
     try:
-        with open(file_path, "r", encoding="utf-8") as file:
+        with span("read_csv_file"), open(file_path, "r", encoding="utf-8") as file:
             content = file.read()
         logger.info(f"Read CSV file {file_path} successfully.")
         return content
@@ -27,3 +31,31 @@ def read_csv_file(file_path: str) -> str:
     except UnicodeDecodeError:
         logger.error("CSV file is not UTF-8 encoded")
         raise
+
+
+def decode_csv_bytes(data: bytes) -> tuple[str, str]:
+    """
+    Decodes the raw bytes of a CSV statement, trying UTF-8 first (dropping a byte order mark) and
+    falling back to cp1252 and then latin-1, which accepts any byte sequence. The bytes are decoded
+    in memory, so the file is never re-read for a second attempt.
+
+    Args:
+        data (bytes): The raw file content.
+
+    Returns:
+        tuple[str, str]: The decoded text and the encoding that was used.
+    """
+    if data.startswith(UTF8_BOM):
+        data = data[len(UTF8_BOM) :]
+    try:
+        return data.decode("utf-8"), "utf-8"
+    except UnicodeDecodeError:
+        pass
+    for encoding in FALLBACK_ENCODINGS:
+        try:
+            text = data.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+        logger.warning("CSV file is not UTF-8 encoded, decoded as %s.", encoding)
+        return text, encoding
+    raise ValueError("Could not decode CSV file.")
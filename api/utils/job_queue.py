@@ -0,0 +1,182 @@
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+from api.utils.setup_logger import log_context, setup_logger
+
+logger = setup_logger(__name__)
+
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_MAX_QUEUED = 100
+DEFAULT_MAX_FINISHED = 1000
+
+
+@dataclass
+class Job:
+    """A statement parse job tracked by the JobQueue."""
+
+    id: str
+    file_path: str
+    prompt_set: str
+    status: str = "queued"
+    result: Any = None
+    error: str | None = None
+    options: dict[str, Any] = field(default_factory=dict)
+    created_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+
+    def to_dict(self) -> dict[str, Any]:
+        """
+        Returns the job status fields, excluding the result payload.
+
+        Returns:
+            dict[str, Any]: The job id, status, prompt set, error and timestamps.
+        """
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "prompt_set": self.prompt_set,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobQueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at capacity."""
+
+
+class JobQueue:
+    """
+    A bounded in-process queue of parse jobs drained by a fixed number of asyncio worker tasks.
+    Workers await the handler directly, so a job waiting on the model holds neither a thread
+    nor the event loop.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Job], Awaitable[Any]],
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        max_queued: int = DEFAULT_MAX_QUEUED,
+        max_finished: int = DEFAULT_MAX_FINISHED,
+    ):
+        """
+        Args:
+            handler (Callable[[Job], Awaitable[Any]]): The coroutine function that runs a job and
+                returns its result.
+            max_workers (int): The number of jobs processed concurrently.
+            max_queued (int): The maximum number of jobs waiting to be processed.
+            max_finished (int): The number of finished jobs retained for status lookups.
+        """
+        self.handler = handler
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.max_finished = max_finished
+        self._jobs: OrderedDict[str, Job] = OrderedDict()
+        self._queue: asyncio.Queue | None = None
+        self._workers: list[asyncio.Task] = []
+
+    async def start(self) -> None:
+        """Starts the worker tasks on the running event loop."""
+        self._queue = asyncio.Queue(maxsize=self.max_queued)
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"job-worker-{index}")
+            for index in range(self.max_workers)
+        ]
+        logger.info("Started job queue with %d workers.", self.max_workers)
+
+    async def stop(self) -> None:
+        """Cancels the worker tasks and waits for them to exit."""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        logger.info("Stopped job queue.")
+
+    def submit(self, file_path: str, prompt_set: str, **options: Any) -> Job:
+        """
+        Enqueues a parse job without waiting for it to run.
+
+        Args:
+            file_path (str): The path to the uploaded statement file.
+            prompt_set (str): The prompt set used to parse the statement.
+            **options: Extra job options made available to the handler.
+
+        Returns:
+            Job: The queued job.
+
+        Raises:
+            JobQueueFullError: If the queue is at capacity.
+        """
+        if self._queue is None:
+            raise RuntimeError("Job queue has not been started.")
+        job = Job(
+            id=uuid.uuid4().hex,
+            file_path=file_path,
+            prompt_set=prompt_set,
+            options=options,
+        )
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            logger.warning("Job queue is full, rejecting job.")
+            raise JobQueueFullError("Job queue is full.")
+        self._jobs[job.id] = job
+        logger.info("Queued job %s.", job.id)
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        """
+        Looks up a job by id.
+
+        Args:
+            job_id (str): The job id returned by submit.
+
+        Returns:
+            Job | None: The job, or None if it is unknown or has been evicted.
+        """
+        return self._jobs.get(job_id)
+
+    @property
+    def depth(self) -> int:
+        """The number of jobs waiting to be processed."""
+        return 0 if self._queue is None else self._queue.qsize()
+
+    async def _worker(self) -> None:
+        """Processes jobs from the queue until cancelled."""
+        while True:
+            job = await self._queue.get()
+            job.status = "running"
+            job.started_at = time.time()
+            try:
+                with log_context(job_id=job.id):
+                    job.result = await self.handler(job)
+                job.status = "succeeded"
+            except asyncio.CancelledError:
+                job.status = "failed"
+                job.error = "Job was cancelled."
+                raise
+            except Exception as e:
+                logger.error("Job %s failed: %s", job.id, e)
+                job.status = "failed"
+                job.error = str(e)
+            finally:
+                job.finished_at = time.time()
+                self._queue.task_done()
+                self._evict_finished()
+
+    def _evict_finished(self) -> None:
+        """Drops the oldest finished jobs beyond max_finished."""
+        finished = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job.status in ("succeeded", "failed")
+        ]
+        for job_id in finished[: max(len(finished) - self.max_finished, 0)]:
+            del self._jobs[job_id]
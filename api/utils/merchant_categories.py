@@ -0,0 +1,326 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+
+from api.utils.setup_logger import setup_logger
+
+logger = setup_logger(__name__)
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(__file__), "merchant_rules.json")
+DEFAULT_MEMO_SIZE = 8192
+PROCESSOR_PREFIXES = (
+    "SQ",
+    "SQSP",
+    "TST",
+    "SP",
+    "PY",
+    "PP",
+    "PAYPAL",
+    "DD",
+    "IC",
+    "GOOGLE",
+    "APL",
+    "BT",
+    "LS",
+    "FS",
+    "EB",
+)
+US_STATES = (
+    "AL AK AZ AR CA CO CT DC DE FL GA HI ID IL IN IA KS KY LA ME MD MA MI MN MS MO MT NE NV NH "
+    "NJ NM NY NC ND OH OK OR PA RI SC SD TN TX UT VT VA WA WV WI WY"
+).split()
+NOISE_PATTERN = re.compile(
+    # Card processor prefixes such as 'SQ *' and 'TST* '.
+    rf"^(?:{'|'.join(PROCESSOR_PREFIXES)})\s?\*\s*"
+    # Order and reference codes after a '*', such as '*2K4TB1'.
+    r"|\*\s*[A-Z0-9]*\d[A-Z0-9]*"
+    # Web domain suffixes.
+    r"|\.(?:COM|NET|ORG)\b"
+    # Store, terminal and masked account numbers.
+    r"|#\s*\d+|\bX*\d{3,}\b"
+    # A trailing city and state, such as 'SEATTLE WA'.
+    rf"|\s+(?:[A-Z]{{3,}}\s+)?(?:{'|'.join(US_STATES)})\s*$"
+    # Any other punctuation.
+    r"|[^\w\s&']+|_+"
+)
+
+_categorizer = None
+_categorizer_paths = None
+_categorizer_lock = threading.Lock()
+
+
+def normalize_merchant(merchant: str) -> str:
+    """
+    Normalizes a raw merchant description, e.g. 'SQ *COFFEE 1234 SEATTLE WA' to 'COFFEE', in one
+    pass of NOISE_PATTERN: card processor prefixes, reference codes, web domains, store numbers, a
+    trailing city and state, and punctuation are removed, and whitespace is collapsed.
+
+    Args:
+        merchant (str): The merchant description.
+
+    Returns:
+        str: The upper-cased merchant name, or '' if nothing is left.
+    """
+    return " ".join(NOISE_PATTERN.sub(" ", merchant.upper()).split())
+
+
+class MerchantTrie:
+    """
+    A trie of merchant rules keyed by the words of their normalized names. A lookup walks the trie
+    from each word of a merchant name in turn, so rules match at any word boundary; the match
+    starting at the earliest word wins, and the longest among those, so 'UBER EATS' takes
+    precedence over 'UBER'.
+    """
+
+    __slots__ = ("root", "size")
+
+    def __init__(self):
+        self.root: dict = {}
+        self.size = 0
+
+    def insert(self, name: str, category: str) -> None:
+        """
+        Adds a rule, replacing any earlier rule for the same name.
+
+        Args:
+            name (str): The merchant name or keyword, normalized with normalize_merchant.
+            category (str): The category of merchants matching the rule.
+
+        Raises:
+            ValueError: If the name is empty once normalized.
+        """
+        words = normalize_merchant(name).split()
+        if not words:
+            raise ValueError(f"Merchant rule '{name}' is empty once normalized.")
+        node = self.root
+        for word in words:
+            node = node.setdefault(word, {})
+        if "" not in node:
+            self.size += 1
+        node[""] = category
+
+    def match(self, name: str) -> str | None:
+        """
+        Finds the category of a normalized merchant name.
+
+        Args:
+            name (str): The merchant name, normalized with normalize_merchant.
+
+        Returns:
+            str | None: The category of the best matching rule, or None if no rule matches.
+        """
+        words = name.split()
+        for start in range(len(words)):
+            node = self.root
+            category = None
+            for word in words[start:]:
+                node = node.get(word)
+                if node is None:
+                    break
+                category = node.get("", category)
+            if category is not None:
+                return category
+        return None
+
+
+def load_merchant_rules(path: str) -> MerchantTrie:
+    """
+    Builds the rule trie from a JSON file mapping each category to a list of merchant names or
+    keywords.
+
+    Args:
+        path (str): The path to the JSON rule file.
+
+    Returns:
+        MerchantTrie: The rule trie.
+
+    Raises:
+        ValueError: If the file is not an object of category name lists.
+    """
+    with open(path, encoding="utf-8") as file:
+        rules = json.load(file)
+    if not isinstance(rules, dict) or not all(
+        isinstance(names, list) and all(isinstance(name, str) for name in names)
+        for names in rules.values()
+    ):
+        raise ValueError(
+            f"Merchant rules in {path} must map each category to a list of names."
+        )
+    trie = MerchantTrie()
+    for category, names in rules.items():
+        for name in names:
+            trie.insert(name, category)
+    logger.info("Loaded %d merchant rules from %s.", trie.size, path)
+    return trie
+
+
+class MerchantCategoryStore:
+    """
+    A persistent SQLite store of merchant categories learned from the model, keyed by normalized
+    merchant name.
+    """
+
+    def __init__(self, path: str):
+        """
+        Opens (or creates) the category database at the given path.
+
+        Args:
+            path (str): The path to the SQLite database file, or ':memory:' for a per-process store.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS merchant_categories ("
+            "merchant TEXT PRIMARY KEY, category TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, merchant: str) -> str | None:
+        """
+        Looks up the learned category of a merchant.
+
+        Args:
+            merchant (str): The normalized merchant name.
+
+        Returns:
+            str | None: The stored category, or None if the merchant has not been categorized.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT category FROM merchant_categories WHERE merchant = ?",
+                (merchant,),
+            ).fetchone()
+        return None if row is None else row[0]
+
+    def set_many(self, categories: dict[str, str]) -> None:
+        """
+        Stores the categories of several merchants in a single transaction.
+
+        Args:
+            categories (dict[str, str]): The category of each normalized merchant name.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO merchant_categories (merchant, category, created_at) "
+                "VALUES (?, ?, ?)",
+                [
+                    (merchant, category, now)
+                    for merchant, category in categories.items()
+                ],
+            )
+            self._conn.commit()
+
+
+class MerchantCategorizer:
+    """
+    Categorizes merchants locally: descriptions are normalized, matched against the rule trie and,
+    failing that, looked up among the categories learned from the model. Results are memoized in
+    bounded LRUs per raw description and per normalized name, so a merchant is normalized once per
+    description and looked up once however many store numbers or locations it appears with.
+    """
+
+    def __init__(
+        self,
+        rules: MerchantTrie,
+        store: MerchantCategoryStore | None = None,
+        memo_size: int = DEFAULT_MEMO_SIZE,
+    ):
+        """
+        Args:
+            rules (MerchantTrie): The rule trie.
+            store (MerchantCategoryStore | None): The learned categories, or None to use rules only.
+            memo_size (int): The maximum number of memoized descriptions and of memoized names.
+        """
+        self.rules = rules
+        self.store = store
+        self.lookup = lru_cache(maxsize=memo_size)(self._lookup)
+        self.categorize = lru_cache(maxsize=memo_size)(self._categorize)
+
+    def _lookup(self, name: str) -> str | None:
+        """
+        Returns the category of a normalized merchant name, or None when neither the rules nor the
+        learned categories know the merchant.
+        """
+        category = self.rules.match(name)
+        if category is None and self.store is not None and name:
+            category = self.store.get(name)
+        return category
+
+    def _categorize(self, merchant: str) -> tuple[str, str | None]:
+        """Returns the normalized name and category of a merchant description."""
+        name = normalize_merchant(merchant)
+        return name, self.lookup(name)
+
+    def apply(self, transactions: list[dict]) -> list[str]:
+        """
+        Sets the normalized_merchant and category of each transaction in place. Descriptions are
+        also memoized for the length of the call, so a statement with more distinct descriptions
+        than the LRU holds is still categorized once per description.
+
+        Args:
+            transactions (list[dict]): Transactions with a merchant.
+
+        Returns:
+            list[str]: The distinct normalized names of merchants left uncategorized, in first-seen
+                order.
+        """
+        seen: dict[str, tuple[str, str | None]] = {}
+        unknown: dict[str, None] = {}
+        for transaction in transactions:
+            merchant = transaction["merchant"]
+            result = seen.get(merchant)
+            if result is None:
+                result = seen[merchant] = self.categorize(merchant)
+                if result[1] is None and result[0]:
+                    unknown[result[0]] = None
+            transaction["normalized_merchant"], transaction["category"] = result
+        return list(unknown)
+
+    def learn(self, categories: dict[str, str]) -> None:
+        """
+        Persists categories answered by the model and clears the memos so they take effect.
+
+        Args:
+            categories (dict[str, str]): The category of each normalized merchant name.
+
+        Raises:
+            RuntimeError: If the categorizer has no store.
+        """
+        if self.store is None:
+            raise RuntimeError("Merchant categorizer has no category store.")
+        self.store.set_many(categories)
+        self.lookup.cache_clear()
+        self.categorize.cache_clear()
+
+
+def get_merchant_categorizer() -> MerchantCategorizer:
+    """
+    Returns the process-wide merchant categorizer. Rules are read from the JSON file at
+    MERCHANT_RULES_PATH, or the built-in merchant_rules.json when unset. Categories learned from the
+    model are persisted to the SQLite file at MERCHANT_CATEGORY_PATH when it is set, and kept in
+    memory for the life of the process otherwise.
+
+    Returns:
+        MerchantCategorizer: The shared categorizer.
+    """
+    global _categorizer, _categorizer_paths
+    paths = (
+        os.environ.get("MERCHANT_RULES_PATH") or DEFAULT_RULES_PATH,
+        os.environ.get("MERCHANT_CATEGORY_PATH") or ":memory:",
+    )
+    with _categorizer_lock:
+        if _categorizer is None or _categorizer_paths != paths:
+            _categorizer = MerchantCategorizer(
+                load_merchant_rules(paths[0]), MerchantCategoryStore(paths[1])
+            )
+            _categorizer_paths = paths
+        return _categorizer
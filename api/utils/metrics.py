@@ -0,0 +1,410 @@
+import bisect
+import contextlib
+import csv
+import io
+import os
+import threading
+import time
+
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+ROW_BUCKETS = (10, 50, 100, 500, 1000, 5000, 10000, 50000, 100000, 1000000)
+
+_enabled = os.environ.get("METRICS_ENABLED", "true").lower() not in ("0", "false")
+_DISABLED_SPAN = contextlib.nullcontext()
+
+
+def _format_labels(names: tuple[str, ...], values: tuple) -> str:
+    """
+    Formats label names and values as a Prometheus label set.
+
+    Args:
+        names (tuple[str, ...]): The label names.
+        values (tuple): The label values, in the same order as the names.
+
+    Returns:
+        str: The label set, such as '{stage="api_call"}', or '' if there are no labels.
+    """
+    if not names:
+        return ""
+    pairs = (
+        '{}="{}"'.format(
+            name,
+            str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"),
+        )
+        for name, value in zip(names, values)
+    )
+    return "{" + ",".join(pairs) + "}"
+
+
+class Counter:
+    """A monotonically increasing count, optionally split by labels."""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        """
+        Args:
+            name (str): The metric name.
+            documentation (str): The help text shown in the exposition format.
+            labelnames (tuple[str, ...]): The names of the labels each value is recorded under.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, *labelvalues) -> None:
+        """
+        Increments the counter for the given label values.
+
+        Args:
+            amount (float): The amount to add.
+            *labelvalues: The label values, in the order of labelnames.
+        """
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def value(self, *labelvalues) -> float:
+        """Returns the current count for the given label values."""
+        with self._lock:
+            return self._values.get(labelvalues, 0)
+
+    def render(self) -> list[str]:
+        """Returns the counter in the Prometheus text exposition format."""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} counter",
+        ]
+        with self._lock:
+            for labelvalues, value in sorted(self._values.items()):
+                labels = _format_labels(self.labelnames, labelvalues)
+                lines.append(f"{self.name}{labels} {value:g}")
+        return lines
+
+    def reset(self) -> None:
+        """Clears all recorded values."""
+        with self._lock:
+            self._values.clear()
+
+
+class Gauge:
+    """A value that can go up and down, optionally split by labels."""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        """
+        Args:
+            name (str): The metric name.
+            documentation (str): The help text shown in the exposition format.
+            labelnames (tuple[str, ...]): The names of the labels each value is recorded under.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def set(self, value: float, *labelvalues) -> None:
+        """
+        Sets the gauge for the given label values.
+
+        Args:
+            value (float): The new value.
+            *labelvalues: The label values, in the order of labelnames.
+        """
+        with self._lock:
+            self._values[labelvalues] = value
+
+    def value(self, *labelvalues) -> float:
+        """Returns the current value for the given label values."""
+        with self._lock:
+            return self._values.get(labelvalues, 0)
+
+    def render(self) -> list[str]:
+        """Returns the gauge in the Prometheus text exposition format."""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} gauge",
+        ]
+        with self._lock:
+            for labelvalues, value in sorted(self._values.items()):
+                labels = _format_labels(self.labelnames, labelvalues)
+                lines.append(f"{self.name}{labels} {value:g}")
+        return lines
+
+    def reset(self) -> None:
+        """Clears all recorded values."""
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram:
+    """A distribution of observed values in cumulative buckets, optionally split by labels."""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        buckets: tuple[float, ...],
+        labelnames: tuple[str, ...] = (),
+    ):
+        """
+        Args:
+            name (str): The metric name.
+            documentation (str): The help text shown in the exposition format.
+            buckets (tuple[float, ...]): The upper bounds of the buckets, excluding +Inf.
+            labelnames (tuple[str, ...]): The names of the labels each observation is recorded under.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets))
+        self.labelnames = labelnames
+        self._series: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labelvalues) -> None:
+        """
+        Records an observation for the given label values.
+
+        Args:
+            value (float): The observed value.
+            *labelvalues: The label values, in the order of labelnames.
+        """
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [
+                    [0] * (len(self.buckets) + 1),
+                    0.0,
+                    0,
+                ]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, *labelvalues) -> int:
+        """Returns the number of observations for the given label values."""
+        with self._lock:
+            series = self._series.get(labelvalues)
+            return series[2] if series else 0
+
+    def render(self) -> list[str]:
+        """Returns the histogram in the Prometheus text exposition format."""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        with self._lock:
+            for labelvalues, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(
+                    [*self.buckets, "+Inf"], counts, strict=True
+                ):
+                    cumulative += bucket_count
+                    labels = _format_labels(
+                        (*self.labelnames, "le"),
+                        (*labelvalues, bound if bound == "+Inf" else f"{bound:g}"),
+                    )
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(self.labelnames, labelvalues)
+                lines.append(f"{self.name}_sum{labels} {total:g}")
+                lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+    def reset(self) -> None:
+        """Clears all recorded observations."""
+        with self._lock:
+            self._series.clear()
+
+
+STAGE_SECONDS = Histogram(
+    "statement_stage_duration_seconds",
+    "Time spent in each statement parsing stage.",
+    buckets=STAGE_BUCKETS,
+    labelnames=("stage",),
+)
+OPENAI_TOKENS = Counter(
+    "openai_tokens_total",
+    "Tokens reported in OpenAI API usage, by prompt set and kind.",
+    labelnames=("prompt_set", "kind"),
+)
+STATEMENT_ROWS = Histogram(
+    "statement_rows",
+    "Data rows per parsed statement.",
+    buckets=ROW_BUCKETS,
+)
+MODEL_TIER_SECONDS = Histogram(
+    "model_tier_request_duration_seconds",
+    "Latency of model requests by prompt set, model and outcome (success, invalid or error).",
+    buckets=STAGE_BUCKETS,
+    labelnames=("prompt_set", "model", "outcome"),
+)
+ADMISSION_IN_FLIGHT = Gauge(
+    "admission_in_flight",
+    "Statement parses currently admitted by the admission controller.",
+)
+ADMISSION_QUEUE_DEPTH = Gauge(
+    "admission_queue_depth",
+    "Requests waiting for the admission controller to admit them.",
+)
+ADMISSION_WAIT_SECONDS = Histogram(
+    "admission_wait_seconds",
+    "Time requests waited for admission, by outcome (admitted, timeout or rejected).",
+    buckets=STAGE_BUCKETS,
+    labelnames=("outcome",),
+)
+REGISTRY = [
+    STAGE_SECONDS,
+    OPENAI_TOKENS,
+    STATEMENT_ROWS,
+    MODEL_TIER_SECONDS,
+    ADMISSION_IN_FLIGHT,
+    ADMISSION_QUEUE_DEPTH,
+    ADMISSION_WAIT_SECONDS,
+]
+
+
+class _Span:
+    """Times a block and records its duration under a stage label."""
+
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self) -> "_Span":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        STAGE_SECONDS.observe(time.perf_counter() - self.start, self.stage)
+
+
+def metrics_enabled() -> bool:
+    """Returns whether metrics are being recorded."""
+    return _enabled
+
+
+def set_metrics_enabled(enabled: bool) -> None:
+    """
+    Turns metric recording on or off. Recording is on unless METRICS_ENABLED is '0' or 'false'.
+
+    Args:
+        enabled (bool): Whether to record metrics.
+    """
+    global _enabled
+    _enabled = enabled
+
+
+def span(stage: str):
+    """
+    Returns a context manager timing a parsing stage. When metrics are disabled a shared no-op
+    context manager is returned, so instrumented code pays only for the flag check.
+
+    Args:
+        stage (str): The stage name, such as 'read_csv_file' or 'api_call'.
+
+    Returns:
+        A context manager that records the duration of its block.
+    """
+    return _Span(stage) if _enabled else _DISABLED_SPAN
+
+
+def observe_statement_rows(csv_text: str) -> None:
+    """
+    Records the number of data rows in a statement, excluding the header row and blank rows. Rows
+    are counted with the CSV reader, so quoted fields spanning several lines count once.
+
+    Args:
+        csv_text (str): The statement CSV text, including the header row.
+    """
+    if not _enabled or not csv_text:
+        return
+    reader = csv.reader(io.StringIO(csv_text))
+    next(reader, None)
+    STATEMENT_ROWS.observe(sum(1 for row in reader if any(row)))
+
+
+def record_usage(prompt_set: str, response) -> None:
+    """
+    Adds the prompt, completion, cached and uncached prompt tokens reported in a response's usage to
+    the token counters, so the share of prompt tokens served from the provider's prompt cache can be
+    compared per prompt set.
+
+    Args:
+        prompt_set (str): The prompt set used for the request.
+        response: The chat completion response.
+    """
+    if not _enabled:
+        return
+    usage = getattr(response, "usage", None)
+    details = getattr(usage, "prompt_tokens_details", None)
+    prompt_tokens = getattr(usage, "prompt_tokens", None)
+    cached_tokens = getattr(details, "cached_tokens", None)
+    uncached_tokens = None
+    if isinstance(prompt_tokens, int):
+        uncached_tokens = prompt_tokens - (
+            cached_tokens if isinstance(cached_tokens, int) else 0
+        )
+    for kind, value in (
+        ("prompt", prompt_tokens),
+        ("completion", getattr(usage, "completion_tokens", None)),
+        ("cached", cached_tokens),
+        ("uncached", uncached_tokens),
+    ):
+        if isinstance(value, int):
+            OPENAI_TOKENS.inc(value, prompt_set, kind)
+
+
+def record_model_tier(
+    prompt_set: str, model: str, outcome: str, seconds: float
+) -> None:
+    """
+    Records the latency and outcome of a request to one model of the ladder, so per-tier success
+    rates can be read from the histogram counts.
+
+    Args:
+        prompt_set (str): The prompt set used for the request.
+        model (str): The model the request was sent to.
+        outcome (str): 'success', 'invalid' if the output failed validation, or 'error'.
+        seconds (float): The request latency.
+    """
+    if _enabled:
+        MODEL_TIER_SECONDS.observe(seconds, prompt_set, model, outcome)
+
+
+def record_admission(
+    in_flight: int, queued: int, outcome: str | None = None, seconds: float = 0.0
+) -> None:
+    """
+    Records the admission controller's in-flight and queued counts and, when a request was just
+    admitted or turned away, how long it waited.
+
+    Args:
+        in_flight (int): The number of admitted parses.
+        queued (int): The number of requests waiting for admission.
+        outcome (str | None): 'admitted', 'timeout' if the request gave up waiting, 'rejected' if the
+            queue was full, or None when only the counts changed.
+        seconds (float): The time the request waited.
+    """
+    if not _enabled:
+        return
+    ADMISSION_IN_FLIGHT.set(in_flight)
+    ADMISSION_QUEUE_DEPTH.set(queued)
+    if outcome is not None:
+        ADMISSION_WAIT_SECONDS.observe(seconds, outcome)
+
+
+def render_metrics() -> str:
+    """
+    Renders every registered metric in the Prometheus text exposition format.
+
+    Returns:
+        str: The exposition text.
+    """
+    return "\n".join(line for metric in REGISTRY for line in metric.render()) + "\n"
+
+
+def reset_metrics() -> None:
+    """Clears every registered metric."""
+    for metric in REGISTRY:
+        metric.reset()
@@ -0,0 +1,91 @@
+import csv
+import io
+import os
+
+DEFAULT_MODEL_LADDER = ("gpt-5-nano", "gpt-5-mini")
+DEFAULT_MIN_ROW_COVERAGE = 0.5
+
+
+def get_model_ladder(prompt_set: str) -> tuple[str, ...]:
+    """
+    Returns the models to try for a prompt set, cheapest first. The ladder is read from
+    MODEL_LADDER_<PROMPT_SET> (e.g. MODEL_LADDER_CARD_ACCOUNT_CSV_STATEMENT_PARSER), then
+    MODEL_LADDER, as a comma-separated list of models.
+
+    Args:
+        prompt_set (str): The name of the prompt set.
+
+    Returns:
+        tuple[str, ...]: The models in the order they are tried.
+    """
+    value = os.environ.get(f"MODEL_LADDER_{prompt_set.upper()}") or os.environ.get(
+        "MODEL_LADDER"
+    )
+    if not value:
+        return DEFAULT_MODEL_LADDER
+    ladder = tuple(model.strip() for model in value.split(",") if model.strip())
+    if not ladder:
+        raise ValueError(f"Model ladder '{value}' does not name any models.")
+    return ladder
+
+
+def get_min_row_coverage() -> float:
+    """
+    Returns the minimum ratio of transactions to CSV data rows, configured by MIN_ROW_COVERAGE,
+    below which a model's output is treated as incomplete.
+
+    Returns:
+        float: The minimum row coverage.
+    """
+    value = os.environ.get("MIN_ROW_COVERAGE")
+    return float(value) if value else DEFAULT_MIN_ROW_COVERAGE
+
+
+def count_data_rows(csv_text: str) -> int:
+    """
+    Counts the non-blank rows of CSV text after the header row.
+
+    Args:
+        csv_text (str): The CSV text, including the header row.
+
+    Returns:
+        int: The number of data rows.
+    """
+    reader = csv.reader(io.StringIO(csv_text))
+    next(reader, None)
+    return sum(1 for row in reader if any(row))
+
+
+def check_transactions(
+    transactions: list[dict],
+    expected_rows: int,
+    row_ids: frozenset[int] | None = None,
+    row_id_column: str = "row_id",
+) -> None:
+    """
+    Sanity checks validated transactions against the CSV they were extracted from. Models that drop
+    rows or reference rows that were not sent fail the check, so the next model in the ladder can be
+    tried.
+
+    Args:
+        transactions (list[dict]): The validated transactions.
+        expected_rows (int): The number of data rows sent to the model.
+        row_ids (frozenset[int] | None): The row ids sent to the model, when rows carry ids.
+        row_id_column (str): The field holding each transaction's row id.
+
+    Raises:
+        ValueError: If too few transactions were extracted or a transaction references an unknown row.
+    """
+    minimum = expected_rows * get_min_row_coverage()
+    if len(transactions) < minimum:
+        raise ValueError(
+            f"Extracted {len(transactions)} transactions from {expected_rows} rows, "
+            f"expected at least {minimum:g}."
+        )
+    if row_ids is not None:
+        for transaction in transactions:
+            if transaction.get(row_id_column) not in row_ids:
+                raise ValueError(
+                    f"Transaction {transaction} references unknown row "
+                    f"{transaction.get(row_id_column)}."
+                )
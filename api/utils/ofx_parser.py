@@ -0,0 +1,233 @@
+import codecs
+import html
+import re
+from collections.abc import Iterable, Iterator
+
+from api.utils.file_reader import UTF8_BOM
+from api.utils.metrics import span
+from api.utils.redact_pii import scrub_text
+from api.utils.setup_logger import setup_logger
+
+logger = setup_logger(__name__)
+
+DEFAULT_CURRENCY = "USD"
+OFX_SNIFF_BYTES = 1024
+STATEMENT_TYPES = {"CCSTMTRS": "card", "STMTRS": "bank"}
+TRANSACTION_FIELDS = frozenset(
+    ["TRNTYPE", "DTPOSTED", "DTUSER", "TRNAMT", "NAME", "MEMO", "CURSYM"]
+)
+THOUSANDS_PATTERN = re.compile(r"[+-]?\d{1,3}(?:,\d{3})+")
+TAG_PATTERN = re.compile(r"<(/?)([A-Za-z0-9.]+)>([^<]*)")
+CHARSET_PATTERN = re.compile(
+    rb"CHARSET:\s*(\d+)|encoding=[\"']([\w-]+)[\"']", re.IGNORECASE
+)
+
+
+def is_ofx(head: str | bytes) -> bool:
+    """
+    Checks whether a statement is an OFX or QFX export rather than a CSV file, from its first bytes.
+
+    Args:
+        head (str | bytes): The start of the statement, at least the first few hundred characters.
+
+    Returns:
+        bool: Whether the statement starts with an OFX header or element.
+    """
+    if isinstance(head, bytes):
+        head = head[:OFX_SNIFF_BYTES].removeprefix(UTF8_BOM).decode("latin-1")
+    head = head[:OFX_SNIFF_BYTES].lstrip("\ufeff \t\r\n").upper()
+    return head.startswith("OFXHEADER") or (
+        head.startswith("<") and ("<OFX>" in head or "<?OFX " in head)
+    )
+
+
+def is_ofx_file(file_path: str) -> bool:
+    """
+    Checks whether a statement file is an OFX or QFX export, reading only its first bytes.
+
+    Args:
+        file_path (str): The path to the statement file.
+
+    Returns:
+        bool: Whether the file starts with an OFX header or element.
+    """
+    with open(file_path, "rb") as file:
+        return is_ofx(file.read(OFX_SNIFF_BYTES))
+
+
+def _complete_tags(chunks: Iterable[str]) -> Iterator[str]:
+    """Re-splits text chunks so that no tag or value is cut at a chunk boundary."""
+    pending = ""
+    for chunk in chunks:
+        text = pending + chunk
+        cut = text.rfind("<")
+        if cut <= 0:
+            pending = text
+            continue
+        pending = text[cut:]
+        yield text[:cut]
+    if pending:
+        yield pending
+
+
+def _parse_amount(value: str) -> float:
+    """
+    Parses an OFX amount. A comma is a thousands separator when every comma group has three digits
+    and there is no '.', as in '1,234' or '1,234,567', or when a '.' follows it, as in '1,234.56'.
+    Otherwise whichever of ',' and '.' comes last is the decimal separator, as in '12,50' or
+    '1.234,56'.
+
+    Raises:
+        ValueError: If the value is not a number.
+    """
+    if THOUSANDS_PATTERN.fullmatch(value) or value.rfind(",") < value.rfind("."):
+        return float(value.replace(",", ""))
+    return float(value.replace(".", "").replace(",", "."))
+
+
+def _to_transaction(
+    fields: dict[str, str], statement: str, currency: str
+) -> dict[str, str | float] | None:
+    """
+    Converts the fields of one STMTTRN element to the transaction shape returned by
+    extract_statement_details, or logs the invalid field and returns None when it has no valid date
+    or amount.
+    """
+    posted = fields.get("DTPOSTED") or fields.get("DTUSER") or ""
+    if len(posted) < 8 or not posted[:8].isdigit():
+        logger.warning("Skipping OFX transaction with invalid date '%s'.", posted)
+        return None
+    try:
+        amount = _parse_amount(fields.get("TRNAMT", ""))
+    except ValueError:
+        logger.warning(
+            "Skipping OFX transaction dated %s with invalid amount '%s'.",
+            posted[:8],
+            fields.get("TRNAMT", ""),
+        )
+        return None
+    if statement == "card":
+        amount = round(-amount, 2)
+        transaction_type = "Expense"
+    else:
+        transaction_type = "Income" if amount > 0 else "Expense"
+        amount = round(abs(amount), 2)
+    return {
+        "merchant": fields.get("NAME") or fields.get("MEMO") or "",
+        "date": f"{posted[:4]}-{posted[4:6]}-{posted[6:8]}",
+        "amount": amount,
+        "currency": fields.get("CURSYM") or currency,
+        "transaction_type": transaction_type,
+    }
+
+
+def iter_ofx_transactions(chunks: Iterable[str]) -> Iterator[dict[str, str | float]]:
+    """
+    Parses the transactions of an OFX or QFX statement in a single streaming pass, without any
+    model calls. Both the SGML (OFX 1.x, unclosed leaf elements) and XML (OFX 2.x) formats are
+    read by one tag tokenizer, so only the current transaction is held in memory.
+
+    Card statements (CCSTMTRS) follow the card prompt set: expenses are positive, refunds and
+    payments negative, and every transaction is an 'Expense'. Bank statements (STMTRS) follow the
+    checking prompt set: absolute amounts with an 'Expense' or 'Income' type. Account identifiers
+    (ACCTID, BANKID and the accounts of transfers) are never read, and merchant names are passed
+    through scrub_text. Transactions outside card and bank statements, e.g. investment accounts,
+    or without a valid date or amount are skipped.
+
+    Args:
+        chunks (Iterable[str]): The statement text, e.g. an open file object or a list holding the
+            whole text.
+
+    Yields:
+        dict[str, str | float]: Each transaction, with merchant, date, amount, currency and
+            transaction_type.
+    """
+    statement = None
+    currency = DEFAULT_CURRENCY
+    fields = None
+    scrubbed: dict[str, str] = {}
+    skipped = 0
+    for text in _complete_tags(chunks):
+        for closing, tag, value in TAG_PATTERN.findall(text):
+            if closing:
+                if tag == "STMTTRN" and fields is not None:
+                    transaction = (
+                        _to_transaction(fields, statement, currency)
+                        if statement
+                        else None
+                    )
+                    fields = None
+                    if transaction is None:
+                        skipped += 1
+                        continue
+                    merchant = transaction["merchant"]
+                    if merchant not in scrubbed:
+                        scrubbed[merchant] = scrub_text(merchant)
+                    transaction["merchant"] = scrubbed[merchant]
+                    yield transaction
+                elif tag in STATEMENT_TYPES:
+                    statement = None
+            elif tag == "STMTTRN":
+                fields = {}
+            elif fields is not None:
+                if tag in TRANSACTION_FIELDS and tag not in fields:
+                    value = value.strip()
+                    fields[tag] = html.unescape(value) if "&" in value else value
+            elif tag in STATEMENT_TYPES:
+                statement = STATEMENT_TYPES[tag]
+                currency = DEFAULT_CURRENCY
+            elif tag == "CURDEF":
+                currency = value.strip() or DEFAULT_CURRENCY
+    if skipped:
+        logger.warning("Skipped %d OFX transactions that could not be parsed.", skipped)
+
+
+def parse_ofx(statement_text: str) -> list[dict[str, str | float]]:
+    """
+    Parses the transactions of an OFX or QFX statement held in memory.
+
+    Args:
+        statement_text (str): The statement text.
+
+    Returns:
+        list[dict[str, str | float]]: The transactions, in statement order.
+    """
+    with span("parse_ofx"):
+        return list(iter_ofx_transactions([statement_text]))
+
+
+def _detect_encoding(head: bytes) -> str:
+    """Returns the text encoding declared in an OFX header, defaulting to UTF-8."""
+    match = CHARSET_PATTERN.search(head)
+    if match is None:
+        return "utf-8"
+    if match.group(1):
+        return "cp1252" if match.group(1) == b"1252" else "latin-1"
+    encoding = match.group(2).decode("ascii")
+    try:
+        codecs.lookup(encoding)
+    except LookupError:
+        return "utf-8"
+    return encoding
+
+
+def parse_ofx_file(file_path: str) -> list[dict[str, str | float]]:
+    """
+    Parses the transactions of an OFX or QFX file, streaming it from disk. The encoding comes from
+    the CHARSET header of SGML files or the XML declaration, with undecodable bytes replaced.
+
+    Args:
+        file_path (str): The path to the statement file.
+
+    Returns:
+        list[dict[str, str | float]]: The transactions, in statement order.
+    """
+    with open(file_path, "rb") as file:
+        encoding = _detect_encoding(file.read(OFX_SNIFF_BYTES))
+    with (
+        span("parse_ofx"),
+        open(file_path, encoding=encoding, errors="replace") as file,
+    ):
+        transactions = list(iter_ofx_transactions(file))
+    logger.info("Parsed %d OFX transactions from %s.", len(transactions), file_path)
+    return transactions
@@ -0,0 +1,379 @@
+import asyncio
+import os
+import random
+import threading
+import time
+import weakref
+from typing import TYPE_CHECKING
+
+from api.utils.prompt_compaction import count_tokens
+from api.utils.setup_logger import setup_logger
+
+if TYPE_CHECKING:
+    import httpx
+    from openai import AsyncOpenAI, OpenAI
+
+logger = setup_logger(__name__)
+
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BACKOFF_BASE = 0.5
+DEFAULT_BACKOFF_MAX = 30.0
+DEFAULT_MAX_CONNECTIONS = 20
+DEFAULT_MAX_KEEPALIVE_CONNECTIONS = 10
+DEFAULT_KEEPALIVE_EXPIRY = 60.0
+DEFAULT_TIMEOUT = 120.0
+
+_clients: dict[str, "OpenAI"] = {}
+_async_clients = weakref.WeakKeyDictionary()
+_rate_limiter = None
+_lock = threading.Lock()
+
+
+class TokenBucket:
+    """
+    A thread-safe token bucket that refills continuously at a fixed rate per minute.
+    """
+
+    def __init__(self, per_minute: float):
+        """
+        Args:
+            per_minute (float): The bucket capacity and the number of tokens refilled per minute.
+        """
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float) -> float:
+        """
+        Takes tokens from the bucket, allowing the balance to go negative, and returns how long the
+        caller must wait before the reservation is covered.
+
+        Args:
+            amount (float): The number of tokens to take. Amounts above the capacity are capped so a
+                single large request cannot block forever.
+
+        Returns:
+            float: The number of seconds to wait before proceeding.
+        """
+        amount = min(float(amount), self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated_at) * self.rate
+            )
+            self.updated_at = now
+            self.tokens -= amount
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+
+class RateLimiter:
+    """
+    A client-side limiter enforcing requests-per-minute and tokens-per-minute budgets, so bursts of
+    calls are spread out instead of being rejected by the API.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float | None = None,
+        tokens_per_minute: float | None = None,
+    ):
+        """
+        Args:
+            requests_per_minute (float | None): The request budget, or None for no limit.
+            tokens_per_minute (float | None): The token budget, or None for no limit.
+        """
+        self.requests = (
+            TokenBucket(requests_per_minute) if requests_per_minute else None
+        )
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+
+    def _reserve(self, tokens: int) -> float:
+        delay = 0.0
+        if self.requests is not None:
+            delay = max(delay, self.requests.reserve(1))
+        if self.tokens is not None:
+            delay = max(delay, self.tokens.reserve(tokens))
+        return delay
+
+    def wait(self, tokens: int) -> None:
+        """
+        Blocks until a request of the given size fits within the budgets.
+
+        Args:
+            tokens (int): The estimated number of tokens used by the request.
+        """
+        delay = self._reserve(tokens)
+        if delay > 0:
+            logger.info("Rate limiting request for %.2f seconds.", delay)
+            time.sleep(delay)
+
+    async def wait_async(self, tokens: int) -> None:
+        """
+        Waits without blocking the event loop until a request of the given size fits within the
+        budgets.
+
+        Args:
+            tokens (int): The estimated number of tokens used by the request.
+        """
+        delay = self._reserve(tokens)
+        if delay > 0:
+            logger.info("Rate limiting request for %.2f seconds.", delay)
+            await asyncio.sleep(delay)
+
+
+def estimate_request_tokens(messages: list[dict[str, str]]) -> int:
+    """
+    Estimates the prompt tokens of a chat request by counting the tokens of its messages locally.
+
+    Args:
+        messages (list[dict[str, str]]): The chat messages of the request.
+
+    Returns:
+        int: The estimated number of prompt tokens.
+    """
+    return sum(count_tokens(str(message.get("content", ""))) for message in messages)
+
+
+def openai_error_type() -> type[Exception]:
+    """
+    Returns openai.OpenAIError. The openai package is imported on first use rather than at import
+    time, since importing it dominates the startup time of the API.
+
+    Returns:
+        type[Exception]: The base class of the errors raised by the OpenAI client.
+    """
+    from openai import OpenAIError
+
+    return OpenAIError
+
+
+def _is_retryable(error: Exception) -> bool:
+    """Returns True for rate limit (429), server (5xx), timeout and connection errors."""
+    from openai import APIConnectionError, APIStatusError
+
+    if isinstance(error, APIConnectionError):
+        return True
+    if isinstance(error, APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
+
+
+def _retry_delay(error: Exception, attempt: int) -> float:
+    """
+    Computes the delay before the next attempt using exponential backoff with full jitter, honoring
+    any Retry-After header sent by the API.
+
+    Args:
+        error (Exception): The error raised by the failed attempt.
+        attempt (int): The zero-based number of the failed attempt.
+
+    Returns:
+        float: The number of seconds to wait before retrying.
+    """
+    base = float(os.environ.get("OPENAI_BACKOFF_BASE", DEFAULT_BACKOFF_BASE))
+    cap = float(os.environ.get("OPENAI_BACKOFF_MAX", DEFAULT_BACKOFF_MAX))
+    delay = random.uniform(0, min(cap, base * 2**attempt))
+    response = getattr(error, "response", None)
+    retry_after = None if response is None else response.headers.get("retry-after")
+    if retry_after:
+        try:
+            delay = max(delay, min(cap, float(retry_after)))
+        except ValueError:
+            pass
+    return delay
+
+
+def _max_retries() -> int:
+    return int(os.environ.get("OPENAI_MAX_RETRIES", DEFAULT_MAX_RETRIES))
+
+
+def get_rate_limiter() -> RateLimiter:
+    """
+    Returns the process-wide rate limiter configured from OPENAI_REQUESTS_PER_MINUTE and
+    OPENAI_TOKENS_PER_MINUTE. Budgets that are not set are not enforced.
+
+    Returns:
+        RateLimiter: The shared rate limiter.
+    """
+    global _rate_limiter
+    with _lock:
+        if _rate_limiter is None:
+            rpm = os.environ.get("OPENAI_REQUESTS_PER_MINUTE")
+            tpm = os.environ.get("OPENAI_TOKENS_PER_MINUTE")
+            _rate_limiter = RateLimiter(
+                requests_per_minute=float(rpm) if rpm else None,
+                tokens_per_minute=float(tpm) if tpm else None,
+            )
+        return _rate_limiter
+
+
+def _pool_limits() -> "httpx.Limits":
+    import httpx
+
+    return httpx.Limits(
+        max_connections=int(
+            os.environ.get("OPENAI_MAX_CONNECTIONS", DEFAULT_MAX_CONNECTIONS)
+        ),
+        max_keepalive_connections=int(
+            os.environ.get(
+                "OPENAI_MAX_KEEPALIVE_CONNECTIONS", DEFAULT_MAX_KEEPALIVE_CONNECTIONS
+            )
+        ),
+        keepalive_expiry=DEFAULT_KEEPALIVE_EXPIRY,
+    )
+
+
+def get_openai_client(api_key: str) -> "OpenAI":
+    """
+    Returns a process-wide OpenAI client with a pooled, keep-alive HTTP connection pool. Retries are
+    handled by create_chat_completion, so the SDK's own retries are disabled.
+
+    Args:
+        api_key (str): The OpenAI API key.
+
+    Returns:
+        OpenAI: The shared client for the API key.
+    """
+    import httpx
+    from openai import OpenAI
+
+    with _lock:
+        client = _clients.get(api_key)
+        if client is None:
+            client = OpenAI(
+                api_key=api_key,
+                max_retries=0,
+                http_client=httpx.Client(
+                    limits=_pool_limits(), timeout=DEFAULT_TIMEOUT
+                ),
+            )
+            _clients[api_key] = client
+        return client
+
+
+def get_async_openai_client(api_key: str) -> "AsyncOpenAI":
+    """
+    Returns an AsyncOpenAI client with a pooled HTTP connection pool, shared by all callers on the
+    running event loop.
+
+    Args:
+        api_key (str): The OpenAI API key.
+
+    Returns:
+        AsyncOpenAI: The shared async client for the API key and event loop.
+    """
+    import httpx
+    from openai import AsyncOpenAI
+
+    loop = asyncio.get_running_loop()
+    with _lock:
+        clients = _async_clients.setdefault(loop, {})
+        client = clients.get(api_key)
+        if client is None:
+            client = AsyncOpenAI(
+                api_key=api_key,
+                max_retries=0,
+                http_client=httpx.AsyncClient(
+                    limits=_pool_limits(), timeout=DEFAULT_TIMEOUT
+                ),
+            )
+            clients[api_key] = client
+        return client
+
+
+async def aclose_clients() -> None:
+    """
+    Closes the async clients of the running event loop and their connection pools. Call it before
+    the loop stops, e.g. at application shutdown; later calls on the loop build new clients.
+    """
+    loop = asyncio.get_running_loop()
+    with _lock:
+        clients = _async_clients.pop(loop, {})
+    for client in clients.values():
+        await client.close()
+
+
+def reset_clients() -> None:
+    """
+    Drops the shared clients and rate limiter so they are rebuilt from the environment. Sync
+    clients are closed; async clients can only be closed on their own loop, with aclose_clients.
+    """
+    global _rate_limiter
+    with _lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
+        _async_clients.clear()
+        _rate_limiter = None
+
+
+def create_chat_completion(client: "OpenAI", **kwargs):
+    """
+    Calls client.chat.completions.create within the rate limits, retrying 429 and 5xx responses with
+    exponential backoff and jitter.
+
+    Args:
+        client (OpenAI): The client used for the call.
+        **kwargs: The arguments passed to client.chat.completions.create.
+
+    Returns:
+        The chat completion response.
+
+    Raises:
+        OpenAIError: If the call fails with a non-retryable error or retries are exhausted.
+    """
+    limiter = get_rate_limiter()
+    tokens = estimate_request_tokens(kwargs.get("messages", []))
+    max_retries = _max_retries()
+    attempt = 0
+    while True:
+        limiter.wait(tokens)
+        try:
+            return client.chat.completions.create(**kwargs)
+        except Exception as e:
+            if not _is_retryable(e) or attempt >= max_retries:
+                raise
+            delay = _retry_delay(e, attempt)
+            logger.warning(
+                "OpenAI API call failed (%s), retrying in %.2f seconds.", e, delay
+            )
+            time.sleep(delay)
+            attempt += 1
+
+
+async def create_chat_completion_async(client: "AsyncOpenAI", **kwargs):
+    """
+    Async version of create_chat_completion that waits on the rate limits and backoff without
+    blocking the event loop.
+
+    Args:
+        client (AsyncOpenAI): The client used for the call.
+        **kwargs: The arguments passed to client.chat.completions.create.
+
+    Returns:
+        The chat completion response.
+
+    Raises:
+        OpenAIError: If the call fails with a non-retryable error or retries are exhausted.
+    """
+    limiter = get_rate_limiter()
+    tokens = estimate_request_tokens(kwargs.get("messages", []))
+    max_retries = _max_retries()
+    attempt = 0
+    while True:
+        await limiter.wait_async(tokens)
+        try:
+            return await client.chat.completions.create(**kwargs)
+        except Exception as e:
+            if not _is_retryable(e) or attempt >= max_retries:
+                raise
+            delay = _retry_delay(e, attempt)
+            logger.warning(
+                "OpenAI API call failed (%s), retrying in %.2f seconds.", e, delay
+            )
+            await asyncio.sleep(delay)
+            attempt += 1
@@ -0,0 +1,215 @@
+import csv
+import io
+import json
+import os
+import re
+import threading
+from collections import deque
+from dataclasses import dataclass
+
+from api.utils.setup_logger import setup_logger
+
+logger = setup_logger(__name__)
+
+IRRELEVANT_COLUMN_PATTERN = re.compile(
+    r"^\s*(running\s+)?(available\s+|ledger\s+)?(balance|bal\.?)\s*$"
+    r"|^\s*(memo|notes?|comments?)\s*$",
+    re.IGNORECASE,
+)
+NUMERIC_PATTERN = re.compile(
+    r"^(?P<sign>[+-]?)(?P<open>\()?\$?(?P<int>\d{1,3}(?:,\d{3})+|\d+)(?P<frac>\.\d+)?(?P<close>\))?$"
+)
+WHITESPACE_PATTERN = re.compile(r"\s+")
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+_encoding = None
+_reports = deque(maxlen=1000)
+_reports_lock = threading.Lock()
+
+
+def _normalize_cell(value: str) -> str:
+    """
+    Collapses whitespace in a cell and normalizes amounts such as '$1,234.50' to '1234.50' and
+    '(12.00)' to '-12.00'. Other values are returned with whitespace collapsed.
+
+    Args:
+        value (str): The raw cell value.
+
+    Returns:
+        str: The normalized cell value.
+    """
+    value = WHITESPACE_PATTERN.sub(" ", value).strip()
+    match = NUMERIC_PATTERN.match(value)
+    if match is None or bool(match["open"]) != bool(match["close"]):
+        return value
+    number = match["int"].replace(",", "") + (match["frac"] or "")
+    negative = match["sign"] == "-" or match["open"] is not None
+    return f"-{number}" if negative else number
+
+
+def compact_statement_csv(csv_text: str) -> str:
+    """
+    Shrinks redacted CSV text before it is sent to the model. Columns that are irrelevant to the
+    transaction schema, such as running balances and memos, are dropped when their header is
+    recognized. Values are stripped of redundant whitespace, amounts are normalized to plain numbers,
+    blank rows are removed and quoting is rewritten to the minimum needed.
+
+    Args:
+        csv_text (str): The redacted CSV text, including the header row.
+
+    Returns:
+        str: The compacted CSV text.
+    """
+    reader = csv.reader(io.StringIO(csv_text))
+    header = next(reader, None)
+    if header is None:
+        return csv_text
+    keep = [
+        index
+        for index, column in enumerate(header)
+        if not IRRELEVANT_COLUMN_PATTERN.match(column)
+    ]
+    output = io.StringIO()
+    writer = csv.writer(output, lineterminator="\n")
+    writer.writerow([header[index].strip() for index in keep])
+    for row in reader:
+        values = [
+            _normalize_cell(row[index]) if index < len(row) else "" for index in keep
+        ]
+        if any(values):
+            writer.writerow(values)
+    return output.getvalue()
+
+
+def count_tokens(text: str) -> int:
+    """
+    Counts the tokens of a text locally. Uses tiktoken's o200k_base encoding when tiktoken is
+    installed, and otherwise approximates tokens as runs of word characters and single punctuation
+    marks, which tracks BPE token counts for CSV content reasonably well.
+
+    Args:
+        text (str): The text to count.
+
+    Returns:
+        int: The number of tokens.
+    """
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+
+            _encoding = tiktoken.get_encoding("o200k_base")
+        except ImportError:
+            _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return len(TOKEN_PATTERN.findall(text))
+
+
+def get_prompt_token_budget() -> int | None:
+    """
+    Returns the per-request prompt token budget configured by MAX_PROMPT_TOKENS.
+
+    Returns:
+        int | None: The budget, or None if no budget is enforced.
+    """
+    budget = os.environ.get("MAX_PROMPT_TOKENS")
+    return int(budget) if budget else None
+
+
+@dataclass
+class TokenReport:
+    """Estimated and actual prompt tokens of a single model request."""
+
+    prompt_set: str
+    raw_tokens: int
+    estimated_tokens: int
+    actual_tokens: int | None = None
+    cached_tokens: int | None = None
+
+    @property
+    def saved_tokens(self) -> int:
+        """The estimated number of prompt tokens saved by compaction."""
+        return self.raw_tokens - self.estimated_tokens
+
+
+def build_token_report(
+    prompt_set: str, prompt: dict, raw_text: str, compacted_text: str
+) -> TokenReport:
+    """
+    Estimates the prompt tokens of a request before and after compaction and enforces the per-request
+    budget.
+
+    Args:
+        prompt_set (str): The name of the prompt set.
+        prompt (dict): The prompt entry used for the request.
+        raw_text (str): The statement text before compaction.
+        compacted_text (str): The statement text sent to the model.
+
+    Returns:
+        TokenReport: The token estimates for the request.
+
+    Raises:
+        ValueError: If the estimated prompt tokens exceed MAX_PROMPT_TOKENS.
+    """
+    static_tokens = count_tokens(
+        prompt["system_prompt"]
+        + prompt["user_prompt"]
+        + json.dumps(prompt["function_schema"])
+    )
+    report = TokenReport(
+        prompt_set=prompt_set,
+        raw_tokens=static_tokens + count_tokens(raw_text),
+        estimated_tokens=static_tokens + count_tokens(compacted_text),
+    )
+    budget = get_prompt_token_budget()
+    if budget is not None and report.estimated_tokens > budget:
+        logger.error(
+            "Prompt of %d estimated tokens exceeds budget of %d.",
+            report.estimated_tokens,
+            budget,
+        )
+        raise ValueError(
+            f"Prompt of {report.estimated_tokens} estimated tokens exceeds budget of {budget}."
+        )
+    return report
+
+
+def record_token_report(report: TokenReport, response) -> None:
+    """
+    Records the actual and cached prompt tokens reported by the API alongside the local estimates.
+
+    Args:
+        report (TokenReport): The estimates built before the request.
+        response: The chat completion response, whose usage holds the actual prompt tokens.
+    """
+    usage = getattr(response, "usage", None)
+    actual = getattr(usage, "prompt_tokens", None)
+    if isinstance(actual, int):
+        report.actual_tokens = actual
+    cached = getattr(
+        getattr(usage, "prompt_tokens_details", None), "cached_tokens", None
+    )
+    if isinstance(cached, int):
+        report.cached_tokens = cached
+    logger.info(
+        "Prompt tokens for %s: raw %d, estimated %d, actual %s, cached %s.",
+        report.prompt_set,
+        report.raw_tokens,
+        report.estimated_tokens,
+        report.actual_tokens,
+        report.cached_tokens,
+    )
+    with _reports_lock:
+        _reports.append(report)
+
+
+def get_token_reports() -> list[TokenReport]:
+    """
+    Returns the token reports of the most recent requests.
+
+    Returns:
+        list[TokenReport]: Up to the last 1000 token reports, oldest first.
+    """
+    with _reports_lock:
+        return list(_reports)
@@ -0,0 +1,87 @@
+import hashlib
+import json
+import threading
+from typing import Any
+
+from api.utils.prompts import (
+    COLUMN_MAPPING_PROMPT,
+    MERCHANT_CATEGORY_PROMPT,
+    PROMPTS,
+)
+from api.utils.structured_output import get_structured_output, tool_request
+
+_templates: dict[int, "PromptTemplate"] = {}
+_templates_lock = threading.Lock()
+
+
+class PromptTemplate:
+    """
+    A prompt compiled once into the parts that never change between requests: the system message,
+    the user instructions and the strict tool definition. These form a byte-identical prefix for
+    every request of the prompt, so provider-side prompt caching can reuse it, and the statement is
+    sent after them as its own user message instead of being spliced into the instructions.
+    """
+
+    __slots__ = ("prompt", "prefix", "tools", "validator", "cache_key", "options")
+
+    def __init__(self, prompt: dict):
+        """
+        Args:
+            prompt (dict): The prompt entry, such as PROMPTS[prompt_set], with system_prompt,
+                user_prompt and function_schema. Prompts without a 'transactions' array, such as
+                COLUMN_MAPPING_PROMPT and MERCHANT_CATEGORY_PROMPT, get no validator.
+        """
+        self.prompt = prompt
+        self.prefix = (
+            {"role": "system", "content": prompt["system_prompt"]},
+            {"role": "user", "content": prompt["user_prompt"]},
+        )
+        schema = prompt["function_schema"]
+        if "transactions" in schema["parameters"]["properties"]:
+            self.tools, self.validator = get_structured_output(schema)
+        else:
+            self.tools, self.validator = tool_request(schema), None
+        digest = hashlib.sha256(
+            json.dumps([self.prefix, self.tools], sort_keys=True).encode()
+        ).hexdigest()
+        self.cache_key = f"{prompt['function_schema']['name']}-{digest[:16]}"
+        self.options: dict[str, Any] = {
+            **self.tools,
+            "prompt_cache_key": self.cache_key,
+        }
+
+    def messages(self, statement_text: str) -> list[dict[str, str]]:
+        """
+        Builds the chat messages of a request: the shared prefix followed by the statement.
+
+        Args:
+            statement_text (str): The redacted statement text.
+
+        Returns:
+            list[dict[str, str]]: The system, instruction and statement messages.
+        """
+        return [*self.prefix, {"role": "user", "content": statement_text}]
+
+
+def get_prompt_template(prompt: dict) -> PromptTemplate:
+    """
+    Returns the compiled template of a prompt entry, compiling it on first use and reusing it
+    afterwards. Templates of PROMPTS, COLUMN_MAPPING_PROMPT and MERCHANT_CATEGORY_PROMPT are
+    compiled at import.
+
+    Args:
+        prompt (dict): The prompt entry.
+
+    Returns:
+        PromptTemplate: The compiled template.
+    """
+    template = _templates.get(id(prompt))
+    if template is None or template.prompt is not prompt:
+        template = PromptTemplate(prompt)
+        with _templates_lock:
+            _templates[id(prompt)] = template
+    return template
+
+
+for _prompt in (*PROMPTS.values(), COLUMN_MAPPING_PROMPT, MERCHANT_CATEGORY_PROMPT):
+    get_prompt_template(_prompt)
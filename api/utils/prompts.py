@@ -18,7 +18,7 @@ PROMPTS = {
             "Exclude any rows that do not represent actual transactions, such as summaries or footers. "
             "If column names vary, use your best judgment to identify the merchant (e.g., 'Description', 'Merchant', 'Vendor' may all indicate the merchant). "
             "If the currency is not specified, assume 'USD'. Normalize all dates to YYYY-MM-DD format. "
-            "REPLACE_ME"
+            "The statement follows in the next message."
         ),
         "function_schema": {
             "name": "extract_transaction",
@@ -38,6 +38,7 @@ PROMPTS = {
                                 },
                                 "date": {
                                     "type": "string",
+                                    "format": "date",
                                     "description": "The date of transaction in YYYY-MM-DD format",
                                 },
                                 "amount": {
@@ -86,7 +87,7 @@ PROMPTS = {
             "Exclude any rows that do not represent actual transactions, such as summaries or footers. "
             "If column names vary, use your best judgment to identify the merchant (e.g., 'Description', 'Merchant', 'Vendor' may all indicate the merchant). "
             "If the currency is not specified, assume 'USD'. Normalize all dates to YYYY-MM-DD format. "
-            "REPLACE_ME"
+            "The statement follows in the next message."
         ),
         "function_schema": {
             "name": "extract_transaction",
@@ -106,6 +107,7 @@ PROMPTS = {
                                 },
                                 "date": {
                                     "type": "string",
+                                    "format": "date",
                                     "description": "The date of transaction in YYYY-MM-DD format",
                                 },
                                 "amount": {
@@ -130,3 +132,136 @@ PROMPTS = {
         },
     },
 }
+
+COLUMN_MAPPING_PROMPT = {
+    "system_prompt": (
+        "You are a helpful assistant that identifies the layout of bank and credit card CSV statements. "
+        "You understand common financial data formats and accurately map CSV columns to transaction fields. "
+    ),
+    "user_prompt": (
+        "You will be given the header row and a few sample rows of a CSV statement. "
+        "Identify which columns hold each transaction field, using the exact column names from the header. "
+        "- 'merchant_column': the column holding the merchant or transaction description, "
+        "- 'date_column': the column holding the transaction date, "
+        "- 'date_format': a Python strptime format string matching the values in the date column (e.g., '%m/%d/%Y'), "
+        "- 'amount_column': the column holding a single signed amount, or null if debits and credits are in separate columns, "
+        "- 'amount_sign': 'expense_positive' if purchases and debits appear as positive amounts, 'expense_negative' if they appear as negative amounts, "
+        "- 'debit_column': the column holding debit or purchase amounts, or null if there is a single amount column, "
+        "- 'credit_column': the column holding credit or refund amounts, or null if there is a single amount column, "
+        "- 'currency_column': the column holding the currency code, or null if there is none. "
+        "The CSV rows follow in the next message."
+    ),
+    "function_schema": {
+        "name": "extract_column_mapping",
+        "description": "Maps the columns of a CSV statement to transaction fields",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "merchant_column": {
+                    "type": "string",
+                    "description": "The column holding the merchant or description",
+                },
+                "date_column": {
+                    "type": "string",
+                    "description": "The column holding the transaction date",
+                },
+                "date_format": {
+                    "type": "string",
+                    "description": "A Python strptime format for the date column",
+                },
+                "amount_column": {
+                    "type": ["string", "null"],
+                    "description": "The column holding a single signed amount",
+                },
+                "amount_sign": {
+                    "type": "string",
+                    "enum": ["expense_positive", "expense_negative"],
+                    "description": "The sign used for expenses in the amount column",
+                },
+                "debit_column": {
+                    "type": ["string", "null"],
+                    "description": "The column holding debit amounts",
+                },
+                "credit_column": {
+                    "type": ["string", "null"],
+                    "description": "The column holding credit amounts",
+                },
+                "currency_column": {
+                    "type": ["string", "null"],
+                    "description": "The column holding the currency code",
+                },
+            },
+            "required": [
+                "merchant_column",
+                "date_column",
+                "date_format",
+                "amount_column",
+                "amount_sign",
+                "debit_column",
+                "credit_column",
+                "currency_column",
+            ],
+        },
+    },
+}
+
+MERCHANT_CATEGORIES = [
+    "Dining",
+    "Groceries",
+    "Merchandise",
+    "Travel",
+    "Entertainment",
+    "Gas/Automotive",
+    "Health Care",
+    "Utilities",
+    "Transfers",
+    "Cash",
+    "Income",
+    "Fees",
+    "Other",
+]
+
+MERCHANT_CATEGORY_PROMPT = {
+    "system_prompt": (
+        "You are a helpful assistant that categorizes merchants from bank and credit card statements. "
+        "You recognize businesses from the abbreviated names used on statements."
+    ),
+    "user_prompt": (
+        "Assign each merchant name, one per line, to exactly one spending category. "
+        "Return a JSON object with a 'merchants' key containing one entry per merchant, each with: "
+        "- 'merchant': the merchant name exactly as given, "
+        "- 'category': one of "
+        + ", ".join(f"'{c}'" for c in MERCHANT_CATEGORIES)
+        + ". "
+        "Use 'Transfers' for payments and transfers between accounts or people, and 'Other' when no category fits. "
+        "The merchant names follow in the next message."
+    ),
+    "function_schema": {
+        "name": "categorize_merchants",
+        "description": "Assigns a spending category to each merchant",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "merchants": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "merchant": {
+                                "type": "string",
+                                "description": "The merchant name exactly as given",
+                            },
+                            "category": {
+                                "type": "string",
+                                "enum": MERCHANT_CATEGORIES,
+                                "description": "The spending category of the merchant",
+                            },
+                        },
+                        "required": ["merchant", "category"],
+                    },
+                }
+            },
+            "required": ["merchants"],
+        },
+    },
+}
@@ -0,0 +1,225 @@
+import bisect
+import os
+import re
+from dataclasses import dataclass
+from datetime import date, timedelta
+from functools import lru_cache
+
+from api.utils.setup_logger import setup_logger
+from api.utils.transaction_store import TransactionStore, to_cents
+
+logger = setup_logger(__name__)
+
+DEFAULT_WINDOW_DAYS = 3
+DEFAULT_MIN_SIMILARITY = 0.5
+INFLOW_TYPES = frozenset(["Income", "Payment", "Credit"])
+NON_TRANSFER_TYPES = frozenset(["Refund", "Fee"])
+TRANSFER_KEYWORDS = frozenset(
+    ["PAYMENT", "PMT", "PYMT", "AUTOPAY", "EPAY", "TRANSFER", "XFER", "TFR"]
+)
+TOKEN_PATTERN = re.compile(r"[A-Z]{2,}")
+
+
+@dataclass(frozen=True)
+class TransferMatch:
+    """A pair of transactions recording the same money moving between two accounts."""
+
+    outflow: int
+    inflow: int
+    amount_cents: int
+    days_apart: int
+    similarity: float
+
+
+@lru_cache(maxsize=8192)
+def merchant_tokens(merchant: str) -> frozenset[str]:
+    """
+    Splits a merchant description into its upper-cased words, ignoring numbers and single letters.
+
+    Args:
+        merchant (str): The merchant description.
+
+    Returns:
+        frozenset[str]: The words.
+    """
+    return frozenset(TOKEN_PATTERN.findall(merchant.upper()))
+
+
+def merchant_similarity(first: str, second: str) -> float:
+    """
+    Scores how likely two merchant descriptions name the two sides of one transfer. Descriptions
+    that both mention a payment or transfer score 1.0, since banks rarely describe both sides
+    alike. Otherwise the score is the word overlap (Jaccard index), raised to 0.5 when one side
+    mentions a payment or transfer.
+
+    Args:
+        first (str): The first merchant description.
+        second (str): The second merchant description.
+
+    Returns:
+        float: The similarity, between 0 and 1.
+    """
+    first_tokens = merchant_tokens(first)
+    second_tokens = merchant_tokens(second)
+    first_transfer = not first_tokens.isdisjoint(TRANSFER_KEYWORDS)
+    second_transfer = not second_tokens.isdisjoint(TRANSFER_KEYWORDS)
+    if first_transfer and second_transfer:
+        return 1.0
+    union = first_tokens | second_tokens
+    overlap = len(first_tokens & second_tokens) / len(union) if union else 0.0
+    return max(overlap, 0.5) if first_transfer or second_transfer else overlap
+
+
+def _flow(transaction: dict) -> tuple[int, int]:
+    """
+    Returns the direction (1 for money in, -1 for money out, 0 for refunds and fees, which are never
+    transfers) and absolute cents of a transaction.
+    """
+    if transaction.get("transaction_type") in NON_TRANSFER_TYPES:
+        return 0, 0
+    cents = to_cents(transaction["amount"])
+    direction = 1 if transaction.get("transaction_type") in INFLOW_TYPES else -1
+    if cents < 0:
+        direction, cents = -direction, -cents
+    return direction, cents
+
+
+def find_transfers(
+    transactions: list[dict],
+    window_days: int = DEFAULT_WINDOW_DAYS,
+    min_similarity: float = DEFAULT_MIN_SIMILARITY,
+) -> list[TransferMatch]:
+    """
+    Finds card payments and internal transfers recorded once as money leaving one account and once
+    as money arriving in another. Inflows are indexed by amount and currency, with each bucket
+    sorted by date, so every outflow is compared only with inflows of the same amount inside the
+    date window. Candidate pairs are then matched one-to-one, closest dates and most similar
+    merchants first.
+
+    Args:
+        transactions (list[dict]): Transactions with account, date, merchant, amount and optionally
+            currency and transaction_type.
+        window_days (int): The maximum number of days between the two sides of a transfer.
+        min_similarity (float): The minimum merchant_similarity of the two sides.
+
+    Returns:
+        list[TransferMatch]: The matches, as indexes into transactions, ordered by outflow.
+    """
+    days = [date.fromisoformat(str(t["date"])).toordinal() for t in transactions]
+    flows = [_flow(t) for t in transactions]
+    inflows: dict[tuple[int, str], list[tuple[int, int]]] = {}
+    for index, (direction, cents) in enumerate(flows):
+        if direction > 0 and cents:
+            key = (cents, transactions[index].get("currency") or "USD")
+            inflows.setdefault(key, []).append((days[index], index))
+    for bucket in inflows.values():
+        bucket.sort()
+    candidates = []
+    for index, (direction, cents) in enumerate(flows):
+        if direction >= 0:
+            continue
+        outflow = transactions[index]
+        bucket = inflows.get((cents, outflow.get("currency") or "USD"))
+        if not bucket:
+            continue
+        day = days[index]
+        start = bisect.bisect_left(bucket, (day - window_days, -1))
+        for position in range(start, len(bucket)):
+            inflow_day, inflow_index = bucket[position]
+            if inflow_day > day + window_days:
+                break
+            inflow = transactions[inflow_index]
+            if inflow.get("account") == outflow.get("account"):
+                continue
+            similarity = merchant_similarity(outflow["merchant"], inflow["merchant"])
+            if similarity >= min_similarity:
+                candidates.append(
+                    (abs(inflow_day - day), -similarity, index, inflow_index, cents)
+                )
+    candidates.sort()
+    matched: set[int] = set()
+    matches = []
+    for days_apart, similarity, outflow, inflow, cents in candidates:
+        if outflow in matched or inflow in matched:
+            continue
+        matched.update((outflow, inflow))
+        matches.append(TransferMatch(outflow, inflow, cents, days_apart, -similarity))
+    matches.sort(key=lambda match: match.outflow)
+    return matches
+
+
+def reconcile_transfers(
+    store: TransactionStore,
+    window_days: int | None = None,
+    min_similarity: float | None = None,
+    start_date: str | None = None,
+    end_date: str | None = None,
+) -> int:
+    """
+    Re-runs find_transfers over the stored transactions and replaces the stored transfers, so
+    summaries can leave out card payments and internal transfers instead of counting them twice.
+    When the dates of newly inserted transactions are given, only transactions within window_days
+    of them are re-matched, instead of every stored transaction.
+
+    Args:
+        store (TransactionStore): The transaction store.
+        window_days (int | None): The maximum number of days between the two sides of a transfer,
+            or None for RECONCILE_WINDOW_DAYS (default 3).
+        min_similarity (float | None): The minimum merchant similarity of the two sides, or None for
+            RECONCILE_MIN_SIMILARITY (default 0.5).
+        start_date (str | None): The earliest date of the newly inserted transactions, or None to
+            re-match every stored transaction.
+        end_date (str | None): The latest date of the newly inserted transactions, or None to
+            re-match every stored transaction.
+
+    Returns:
+        int: The number of transfers found.
+    """
+    if window_days is None:
+        window_days = int(os.environ.get("RECONCILE_WINDOW_DAYS", DEFAULT_WINDOW_DAYS))
+    if min_similarity is None:
+        min_similarity = float(
+            os.environ.get("RECONCILE_MIN_SIMILARITY", DEFAULT_MIN_SIMILARITY)
+        )
+    scope = {}
+    if start_date is not None and end_date is not None:
+        margin = timedelta(days=window_days)
+        scope = {
+            "start_date": (date.fromisoformat(start_date) - margin).isoformat(),
+            "end_date": (date.fromisoformat(end_date) + margin).isoformat(),
+        }
+    ids, transactions = store.transfer_candidates(**scope)
+    matches = find_transfers(transactions, window_days, min_similarity)
+    store.replace_transfers(
+        [
+            (ids[match.outflow], ids[match.inflow], match.days_apart, match.similarity)
+            for match in matches
+        ],
+        **scope,
+    )
+    logger.info(
+        "Matched %d transfers among %d transactions.", len(matches), len(transactions)
+    )
+    return len(matches)
+
+
+def save_transactions(
+    store: TransactionStore, transactions: list[dict], account: str
+) -> int:
+    """
+    Saves a statement's transactions to the store and, when any are new, reconciles transfers
+    around their dates, so both sides of a transfer between two saved statements are marked.
+
+    Args:
+        store (TransactionStore): The transaction store.
+        transactions (list[dict]): The extracted transactions.
+        account (str): The account the transactions belong to.
+
+    Returns:
+        int: The number of newly inserted transactions.
+    """
+    inserted = store.insert_transactions(transactions, account)
+    if inserted:
+        dates = [str(transaction["date"]) for transaction in transactions]
+        reconcile_transfers(store, start_date=min(dates), end_date=max(dates))
+    return inserted
@@ -0,0 +1,140 @@
+import os
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+from api.utils.setup_logger import setup_logger
+from api.utils.transaction_store import TransactionStore
+
+logger = setup_logger(__name__)
+
+DEFAULT_MIN_OCCURRENCES = 3
+DEFAULT_MAX_AMOUNT_VARIATION = 0.2
+# Each cadence's expected interval and the tolerance, in days, for both the mean interval and its
+# standard deviation.
+CADENCES = (
+    ("weekly", 7.0, 1.5),
+    ("biweekly", 14.0, 2.0),
+    ("monthly", 30.44, 4.0),
+    ("quarterly", 91.31, 8.0),
+    ("yearly", 365.25, 15.0),
+)
+
+
+@dataclass(frozen=True)
+class RecurringCharge:
+    """A merchant charging an account at a regular cadence, such as a subscription."""
+
+    account: str
+    merchant: str
+    cadence: str
+    interval_days: float
+    amount: float
+    occurrences: int
+    last_date: str
+    next_date: str
+
+
+def classify_cadence(interval_mean: float, interval_std: float) -> str | None:
+    """
+    Finds the cadence of a merchant's charges from the mean and standard deviation of the days
+    between them.
+
+    Args:
+        interval_mean (float): The mean interval in days.
+        interval_std (float): The standard deviation of the intervals in days.
+
+    Returns:
+        str | None: 'weekly', 'biweekly', 'monthly', 'quarterly' or 'yearly', or None if the
+            charges are not regular.
+    """
+    for cadence, expected, tolerance in CADENCES:
+        if abs(interval_mean - expected) <= tolerance and interval_std <= tolerance:
+            return cadence
+    return None
+
+
+def find_recurring_charges(
+    intervals: list[dict],
+    min_occurrences: int = DEFAULT_MIN_OCCURRENCES,
+    max_amount_variation: float = DEFAULT_MAX_AMOUNT_VARIATION,
+) -> list[RecurringCharge]:
+    """
+    Picks the merchants whose charges recur at a regular cadence for a similar amount, from the
+    per-merchant interval statistics of TransactionStore.merchant_intervals.
+
+    Args:
+        intervals (list[dict]): The interval statistics of each merchant.
+        min_occurrences (int): The minimum number of charges on distinct days.
+        max_amount_variation (float): The maximum standard deviation of the amount relative to its
+            mean.
+
+    Returns:
+        list[RecurringCharge]: The recurring charges, in the order of intervals.
+    """
+    charges = []
+    for stats in intervals:
+        if stats["interval_count"] < min_occurrences - 1 or stats["amount_mean"] <= 0:
+            continue
+        if stats["amount_std"] > max_amount_variation * stats["amount_mean"]:
+            continue
+        cadence = classify_cadence(stats["interval_mean"], stats["interval_std"])
+        if cadence is None:
+            continue
+        next_date = date.fromisoformat(stats["last_date"]) + timedelta(
+            days=round(stats["interval_mean"])
+        )
+        charges.append(
+            RecurringCharge(
+                account=stats["account"],
+                merchant=stats["merchant"],
+                cadence=cadence,
+                interval_days=round(stats["interval_mean"], 1),
+                amount=round(stats["amount_mean"], 2),
+                occurrences=stats["occurrences"],
+                last_date=stats["last_date"],
+                next_date=next_date.isoformat(),
+            )
+        )
+    return charges
+
+
+def detect_recurring_charges(
+    store: TransactionStore,
+    account: str | None = None,
+    min_occurrences: int | None = None,
+    max_amount_variation: float | None = None,
+) -> list[RecurringCharge]:
+    """
+    Detects subscriptions and other recurring charges among the stored transactions. The store keeps
+    each merchant's interval statistics current as transactions are inserted, so detection reads
+    one row per merchant instead of every transaction.
+
+    Args:
+        store (TransactionStore): The transaction store.
+        account (str | None): Only detect charges to this account.
+        min_occurrences (int | None): The minimum number of charges, or None for
+            RECURRING_MIN_OCCURRENCES (default 3).
+        max_amount_variation (float | None): The maximum standard deviation of the amount relative
+            to its mean, or None for RECURRING_MAX_AMOUNT_VARIATION (default 0.2).
+
+    Returns:
+        list[RecurringCharge]: The recurring charges, ordered by account and merchant.
+    """
+    if min_occurrences is None:
+        min_occurrences = int(
+            os.environ.get("RECURRING_MIN_OCCURRENCES", DEFAULT_MIN_OCCURRENCES)
+        )
+    if max_amount_variation is None:
+        max_amount_variation = float(
+            os.environ.get(
+                "RECURRING_MAX_AMOUNT_VARIATION", DEFAULT_MAX_AMOUNT_VARIATION
+            )
+        )
+    intervals = store.merchant_intervals(
+        account=account, min_occurrences=min_occurrences
+    )
+    charges = find_recurring_charges(intervals, min_occurrences, max_amount_variation)
+    logger.info(
+        "Found %d recurring charges among %d merchants.", len(charges), len(intervals)
+    )
+    return charges
@@ -1,13 +1,237 @@
 import csv
 import io
+import os
+import re
+from collections.abc import Iterable, Iterator
+from functools import lru_cache
+from typing import NamedTuple
 
+from api.utils.metrics import span
 from api.utils.setup_logger import setup_logger
 
 logger = setup_logger(__name__)
 
+PII_COLUMNS = frozenset(
+    [
+        "Card No.",
+        "Check or Slip #",
+        "From",
+        "To",
+    ]
+)
+
+SCRUB_COLUMNS = frozenset(
+    [
+        "description",
+        "details",
+        "extended details",
+        "memo",
+        "merchant",
+        "name",
+        "notes",
+        "payee",
+        "reference",
+        "transaction description",
+    ]
+)
+PII_PATTERN = re.compile(
+    r"(?P<email>(?<![\w.+-])[\w.+-]+@[\w-]+\.[\w.-]+)"
+    r"|(?P<ssn>(?<!\d)\d{3}-\d{2}-\d{4}(?!\d))"
+    r"|(?P<phone>(?<![\d-])(?:\+?1[ .-]?)?(?:\(\d{3}\) ?|\d{3}[ .-])\d{3}[ .-]\d{4}(?![\d-]))"
+    r"|(?P<card>(?<!\d)\d(?:[ -]?\d){12,18}(?!\d))"
+    r"|(?P<account>(?:[Xx*#]{2,}[ -]?\d{2,6}|\b(?i:ACCT|ACCOUNT|A/C)\b[ .:#]*\d{4,})(?!\d))"
+    r"|(?P<payment_app>\b(?i:ZELLE|VENMO|PAYPAL|CASH ?APP)\b[^,]*?\b(?i:TO|FROM)\s+)"
+    r"(?P<name>[A-Z][A-Za-z'.-]+(?:\s+[A-Z][A-Za-z'.-]+){0,2})"
+)
+MAX_SCRUB_CACHE_ENTRIES = 65536
+PLACEHOLDERS = {
+    "email": "[EMAIL]",
+    "ssn": "[SSN]",
+    "phone": "[PHONE]",
+    "card": "[CARD]",
+    "account": "[ACCOUNT]",
+}
+
+
+class RedactionRules(NamedTuple):
+    """The columns dropped and the columns scrubbed of free-text PII for a statement layout."""
+
+    drop_columns: frozenset[str] = PII_COLUMNS
+    scrub_columns: frozenset[str] = SCRUB_COLUMNS
+
+    def plan(self, header: list[str]) -> tuple[list[int], list[int]]:
+        """
+        Resolves the rules against a header row.
+
+        Args:
+            header (list[str]): The CSV header row.
+
+        Returns:
+            tuple[list[int], list[int]]: The positions of the kept columns, and the positions within
+                the kept columns of those scrubbed. Scrub column names are matched ignoring case.
+        """
+        keep = [i for i, column in enumerate(header) if column not in self.drop_columns]
+        scrub = [
+            position
+            for position, index in enumerate(keep)
+            if header[index].strip().lower() in self.scrub_columns
+        ]
+        return keep, scrub
+
+
+DEFAULT_RULES = RedactionRules()
+
+
+def luhn_valid(digits: str) -> bool:
+    """
+    Checks a digit string against the Luhn checksum used by payment card numbers.
+
+    Args:
+        digits (str): The digits, without separators.
+
+    Returns:
+        bool: Whether the checksum is valid.
+    """
+    total = 0
+    for position, char in enumerate(reversed(digits)):
+        digit = ord(char) - 48
+        if position % 2:
+            digit = digit * 2 - 9 if digit > 4 else digit * 2
+        total += digit
+    return total % 10 == 0
+
+
+def _replace(match: re.Match) -> str:
+    kind = match.lastgroup
+    if kind == "name":
+        return match.group("payment_app") + "[NAME]"
+    if kind == "card":
+        digits = match.group().replace(" ", "").replace("-", "")
+        if not luhn_valid(digits):
+            return match.group()
+    return PLACEHOLDERS[kind]
+
+
+def scrub_text(value: str) -> str:
+    """
+    Replaces PII inside free text with placeholders in a single pass of one combined pattern: email
+    addresses, US social security and phone numbers, card numbers that pass the Luhn check, masked
+    or labelled account numbers, and the counterparty names of payment app transfers.
+
+    Args:
+        value (str): The text to scrub, e.g. a transaction description.
+
+    Returns:
+        str: The text with PII replaced by placeholders such as [CARD] and [NAME].
+    """
+    return PII_PATTERN.sub(_replace, value)
+
+
+@lru_cache(maxsize=8)
+def _load_layout_rules(path: str) -> tuple[tuple[frozenset[str], RedactionRules], ...]:
+    """Loads the per-layout redaction rules from a JSON file."""
+    import json
+
+    with open(path, encoding="utf-8") as file:
+        layouts = json.load(file)
+    rules = []
+    for layout in layouts:
+        rules.append(
+            (
+                frozenset(layout["match"]),
+                RedactionRules(
+                    drop_columns=frozenset(layout.get("drop", PII_COLUMNS)),
+                    scrub_columns=frozenset(
+                        column.strip().lower()
+                        for column in layout.get("scrub", SCRUB_COLUMNS)
+                    ),
+                ),
+            )
+        )
+    return tuple(rules)
+
+
+def rules_for_header(header: list[str]) -> RedactionRules:
+    """
+    Selects the redaction rules of a statement layout. Layouts are read from the JSON file at
+    PII_RULES_PATH, a list of objects with 'match' (columns that identify the layout), and optional
+    'drop' and 'scrub' column lists. The first layout whose match columns are all in the header
+    applies; statements matching none use DEFAULT_RULES.
+
+    Args:
+        header (list[str]): The CSV header row.
+
+    Returns:
+        RedactionRules: The rules for the header.
+    """
+    path = os.environ.get("PII_RULES_PATH")
+    if path:
+        columns = set(header)
+        for match, rules in _load_layout_rules(path):
+            if match <= columns:
+                return rules
+    return DEFAULT_RULES
+
+
+class _LineEcho:
+    """A write-only file object whose write returns the written text, so csv.writer yields lines."""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def redact_pii_lines(
+    lines: Iterable[str], rules: RedactionRules | None = None
+) -> Iterator[str]:
+    """Removes PII columns and scrubs PII from free-text columns of CSV input in a single streaming
+    pass.
+
+    The kept and scrubbed column positions are resolved once from the header row, and each data row
+    is re-written positionally, so only one row is held in memory at a time. Scrubbed values are
+    memoized for the pass (up to MAX_SCRUB_CACHE_ENTRIES), since descriptions repeat across rows.
+    Rows with more values than the header have the extra values dropped, and short rows are padded
+    with empty values.
+
+    Args:
+        lines (Iterable[str]): The CSV input, e.g. an open file object or any iterable of lines.
+        rules (RedactionRules | None): The rules to apply, or None to select them from the header
+            with rules_for_header.
+
+    Yields:
+        str: The redacted CSV lines, each terminated by a newline, starting with the header.
+    """
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if header is None:
+        logger.error("Detected empty CSV file")
+        raise ValueError("CSV text cannot be empty")
+    keep, scrub = (rules or rules_for_header(header)).plan(header)
+    width = len(header)
+    writer = csv.writer(_LineEcho(), lineterminator="\n")
+    yield writer.writerow([header[index] for index in keep])
+    sub = PII_PATTERN.sub
+    scrubbed: dict[str, str] = {}
+    for row in reader:
+        if not row:
+            continue
+        if len(row) < width:
+            row.extend([""] * (width - len(row)))
+        kept = [row[index] for index in keep]
+        for position in scrub:
+            value = kept[position]
+            if not value:
+                continue
+            result = scrubbed.get(value)
+            if result is None:
+                if len(scrubbed) >= MAX_SCRUB_CACHE_ENTRIES:
+                    scrubbed.clear()
+                result = scrubbed[value] = sub(_replace, value)
+            kept[position] = result
+        yield writer.writerow(kept)
+
 
 def remove_pii_columns(csv_text: str) -> str:
-    """Removes PII columns from the given CSV text.
+    """Removes PII columns from the given CSV text and scrubs PII from its free-text columns.
 
     Args:
         text (str): The input CSV text string containing PII columns.
@@ -18,24 +242,5 @@ def remove_pii_columns(csv_text: str) -> str:
     if not csv_text:
         logger.error("Detected empty CSV file")
         raise ValueError("CSV text cannot be empty")
-    cols_to_remove = [
-        "Card No.",
-        "Check or Slip #",
-        "From",
-        "To",
-    ]
-    lines = csv_text.splitlines()
-    reader = csv.DictReader(lines)
-    fieldnames = [f for f in reader.fieldnames if f not in cols_to_remove]
-
-    output = io.StringIO()
-    writer = csv.DictWriter(output, fieldnames=fieldnames, lineterminator="\n")
-    writer.writeheader()
-    for row in reader:
-        for col in cols_to_remove:
-            if None in row:
-                del row[None]
-            row.pop(col, None)
-        writer.writerow(row)
-
-    return output.getvalue()
+    with span("remove_pii_columns"):
+        return "".join(redact_pii_lines(io.StringIO(csv_text)))
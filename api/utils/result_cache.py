@@ -0,0 +1,217 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from api.utils.prompts import PROMPTS
+from api.utils.setup_logger import setup_logger
+
+logger = setup_logger(__name__)
+
+DEFAULT_MAX_ENTRIES = 10_000
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_MAX_AGE_SECONDS = 30 * 24 * 60 * 60
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def hash_prompt_set(prompt_set: str) -> str:
+    """
+    Hashes the contents of a PROMPTS entry so results are invalidated when a prompt changes.
+
+    Args:
+        prompt_set (str): The name of the prompt set.
+
+    Returns:
+        str: A hex digest of the prompt set contents.
+    """
+    return hashlib.sha256(
+        json.dumps(PROMPTS[prompt_set], sort_keys=True).encode("utf-8")
+    ).hexdigest()
+
+
+def make_cache_key(redacted_text: str, prompt_set: str, model: str) -> str:
+    """
+    Builds a content-addressed cache key for a model extraction result.
+
+    Args:
+        redacted_text (str): The redacted CSV text returned by remove_pii_columns.
+        prompt_set (str): The name of the prompt set used for the extraction.
+        model (str): The name of the model used for the extraction.
+
+    Returns:
+        str: A hex digest uniquely identifying the extraction inputs.
+    """
+    prompt_hash = hash_prompt_set(prompt_set)
+    text_hash = hashlib.sha256(redacted_text.encode("utf-8")).hexdigest()
+    return hashlib.sha256(
+        "\x1f".join([text_hash, prompt_set, model, prompt_hash]).encode("utf-8")
+    ).hexdigest()
+
+
+class ResultCache:
+    """
+    A persistent SQLite cache of model extraction results with size and age based LRU eviction.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        max_age_seconds: float = DEFAULT_MAX_AGE_SECONDS,
+    ):
+        """
+        Opens (or creates) the cache database at the given path.
+
+        Args:
+            path (str): The path to the SQLite database file.
+            max_entries (int): The maximum number of results kept in the cache.
+            max_bytes (int): The maximum total size of cached results in bytes.
+            max_age_seconds (float): Results older than this are evicted.
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_results_accessed_at ON results (accessed_at)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> list[dict[str, str | float]] | None:
+        """
+        Looks up a cached result and marks it as recently used.
+
+        Args:
+            key (str): The cache key built by make_cache_key.
+
+        Returns:
+            list[dict[str, str | float]] | None: The cached transactions, or None on a miss.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.max_age_seconds:
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE results SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key: str, transactions: list[dict[str, str | float]]) -> None:
+        """
+        Stores a result in the cache and evicts stale or least recently used entries.
+
+        Args:
+            key (str): The cache key built by make_cache_key.
+            transactions (list[dict[str, str | float]]): The extracted transactions to cache.
+        """
+        value = json.dumps(transactions)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, value, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value), now, now),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float) -> None:
+        """Removes expired entries, then the least recently used ones until within limits."""
+        self._conn.execute(
+            "DELETE FROM results WHERE created_at < ?", (now - self.max_age_seconds,)
+        )
+        count, total_size = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results"
+        ).fetchone()
+        if count <= self.max_entries and total_size <= self.max_bytes:
+            return
+        evicted = 0
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM results ORDER BY accessed_at ASC"
+        ).fetchall():
+            if count <= self.max_entries and total_size <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+            count -= 1
+            total_size -= size
+            evicted += 1
+        logger.info("Evicted %d entries from result cache.", evicted)
+
+    def stats(self) -> dict[str, int]:
+        """
+        Returns the hit/miss counters and current size of the cache.
+
+        Returns:
+            dict[str, int]: The hits, misses, entry count and total size in bytes.
+        """
+        with self._lock:
+            count, total_size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results"
+            ).fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": count,
+            "bytes": total_size,
+        }
+
+    def close(self) -> None:
+        """Closes the underlying database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+def get_result_cache() -> ResultCache | None:
+    """
+    Returns the process-wide result cache configured through environment variables. The cache is
+    enabled by setting STATEMENT_CACHE_PATH; STATEMENT_CACHE_MAX_ENTRIES, STATEMENT_CACHE_MAX_BYTES and
+    STATEMENT_CACHE_MAX_AGE_SECONDS optionally override the eviction limits.
+
+    Returns:
+        ResultCache | None: The shared cache, or None if caching is disabled.
+    """
+    global _cache
+    path = os.environ.get("STATEMENT_CACHE_PATH")
+    if not path:
+        return None
+    with _cache_lock:
+        if _cache is None or _cache.path != path:
+            _cache = ResultCache(
+                path=path,
+                max_entries=int(
+                    os.environ.get("STATEMENT_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)
+                ),
+                max_bytes=int(
+                    os.environ.get("STATEMENT_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)
+                ),
+                max_age_seconds=float(
+                    os.environ.get(
+                        "STATEMENT_CACHE_MAX_AGE_SECONDS", DEFAULT_MAX_AGE_SECONDS
+                    )
+                ),
+            )
+        return _cache
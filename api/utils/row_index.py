@@ -0,0 +1,257 @@
+import copy
+import csv
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+from api.utils.prompts import PROMPTS
+from api.utils.result_cache import hash_prompt_set
+from api.utils.setup_logger import setup_logger
+
+logger = setup_logger(__name__)
+
+ROW_ID_COLUMN = "row_id"
+ROW_ID_INSTRUCTION = (
+    f"Each CSV row starts with a '{ROW_ID_COLUMN}' column. For every transaction, set '{ROW_ID_COLUMN}' "
+    "to the value of that column in the row the transaction was extracted from. "
+)
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def fingerprint_rows(
+    prompt_set: str, header: list[str], rows: list[list[str]]
+) -> list[str]:
+    """
+    Builds a stable fingerprint for each redacted data row. Fingerprints cover the prompt set and its
+    contents, the header and the row values, plus the occurrence number of identical rows within the
+    statement, so two identical purchases on the same day are still told apart.
+
+    Args:
+        prompt_set (str): The prompt set used to extract the rows.
+        header (list[str]): The column names from the redacted header row.
+        rows (list[list[str]]): The redacted data rows.
+
+    Returns:
+        list[str]: The fingerprint of each row, in row order.
+    """
+    prefix = "\x1e".join(
+        [prompt_set, hash_prompt_set(prompt_set), "\x1f".join(header)]
+    ).encode("utf-8")
+    seen: dict[str, int] = {}
+    fingerprints = []
+    for row in rows:
+        content = "\x1f".join(value.strip() for value in row)
+        occurrence = seen.get(content, 0)
+        seen[content] = occurrence + 1
+        digest = hashlib.sha256(prefix)
+        digest.update(f"\x1e{content}\x1e{occurrence}".encode("utf-8"))
+        fingerprints.append(digest.hexdigest())
+    return fingerprints
+
+
+@lru_cache(maxsize=None)
+def row_reference_prompt(prompt_set: str) -> dict:
+    """
+    Returns a copy of a prompt set that asks the model to report which row each transaction came
+    from, so extracted transactions can be stored against their row fingerprints.
+
+    Args:
+        prompt_set (str): The prompt set to extend.
+
+    Returns:
+        dict: The prompt set with the row id instruction and schema property added.
+    """
+    prompt = copy.deepcopy(PROMPTS[prompt_set])
+    prompt["user_prompt"] = f"{prompt['user_prompt']} {ROW_ID_INSTRUCTION.rstrip()}"
+    items = prompt["function_schema"]["parameters"]["properties"]["transactions"][
+        "items"
+    ]
+    items["properties"][ROW_ID_COLUMN] = {
+        "type": "integer",
+        "description": f"The '{ROW_ID_COLUMN}' of the CSV row the transaction came from",
+    }
+    items["required"] = [*items["required"], ROW_ID_COLUMN]
+    return prompt
+
+
+class RowIndex:
+    """
+    A persistent SQLite index from row fingerprint to the transactions extracted from that row.
+    """
+
+    def __init__(self, path: str):
+        """
+        Opens (or creates) the row index database at the given path.
+
+        Args:
+            path (str): The path to the SQLite database file.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rows ("
+            "fingerprint TEXT PRIMARY KEY, transactions TEXT NOT NULL, "
+            "created_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get_many(self, fingerprints: list[str]) -> dict[str, list[dict]]:
+        """
+        Looks up the transactions extracted from previously seen rows.
+
+        Args:
+            fingerprints (list[str]): The row fingerprints to look up.
+
+        Returns:
+            dict[str, list[dict]]: The stored transactions for each known fingerprint. Rows that held
+                no transaction, such as summaries, map to an empty list.
+        """
+        found = {}
+        unique = list(dict.fromkeys(fingerprints))
+        with self._lock:
+            for start in range(0, len(unique), 500):
+                batch = unique[start : start + 500]
+                placeholders = ",".join("?" * len(batch))
+                for fingerprint, transactions in self._conn.execute(
+                    f"SELECT fingerprint, transactions FROM rows WHERE fingerprint IN ({placeholders})",
+                    batch,
+                ):
+                    found[fingerprint] = json.loads(transactions)
+        return found
+
+    def set_many(self, entries: dict[str, list[dict]]) -> None:
+        """
+        Stores the transactions extracted from newly seen rows.
+
+        Args:
+            entries (dict[str, list[dict]]): The transactions extracted from each row fingerprint.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO rows (fingerprint, transactions, created_at) "
+                "VALUES (?, ?, ?)",
+                [
+                    (fingerprint, json.dumps(transactions), now)
+                    for fingerprint, transactions in entries.items()
+                ],
+            )
+            self._conn.commit()
+
+
+@dataclass
+class IncrementalPlan:
+    """
+    The split of a redacted statement into rows already in the row index and rows that still need
+    to be sent to the model.
+    """
+
+    index: RowIndex
+    fingerprints: list[str]
+    known: dict[str, list[dict]]
+    pending_rows: list[int] = field(default_factory=list)
+    pending_csv: str | None = None
+
+    def merge(self, transactions: list[dict]) -> list[dict]:
+        """
+        Stores the transactions extracted from the pending rows and returns the transactions of the
+        whole statement in original row order.
+
+        Args:
+            transactions (list[dict]): The validated transactions extracted from pending_csv, each
+                carrying the row_id of the row it came from.
+
+        Returns:
+            list[dict]: The transactions of every row in the statement, without row ids.
+
+        Raises:
+            ValueError: If a transaction does not reference one of the pending rows.
+        """
+        pending = set(self.pending_rows)
+        extracted: dict[int, list[dict]] = {row: [] for row in self.pending_rows}
+        for transaction in transactions:
+            row_id = transaction.pop(ROW_ID_COLUMN, None)
+            if row_id not in pending:
+                raise ValueError(
+                    f"Transaction {transaction} references unknown row {row_id}."
+                )
+            extracted[row_id].append(transaction)
+        self.index.set_many(
+            {self.fingerprints[row]: found for row, found in extracted.items()}
+        )
+        merged = []
+        for row, fingerprint in enumerate(self.fingerprints):
+            if row in extracted:
+                merged.extend(extracted[row])
+            else:
+                merged.extend(self.known[fingerprint])
+        return merged
+
+
+def plan_incremental_extraction(
+    redacted_text: str, prompt_set: str, index: RowIndex
+) -> IncrementalPlan:
+    """
+    Fingerprints each redacted row and builds the CSV of rows not yet in the row index. The pending
+    CSV repeats the header and prefixes every row with its row_id.
+
+    Args:
+        redacted_text (str): The redacted CSV text, including the header row.
+        prompt_set (str): The prompt set used to extract the rows.
+        index (RowIndex): The row index to look rows up in.
+
+    Returns:
+        IncrementalPlan: The known and pending rows of the statement.
+    """
+    reader = csv.reader(io.StringIO(redacted_text))
+    header = next(reader, [])
+    rows = [row for row in reader if row]
+    fingerprints = fingerprint_rows(prompt_set, header, rows)
+    known = index.get_many(fingerprints)
+    plan = IncrementalPlan(index=index, fingerprints=fingerprints, known=known)
+    plan.pending_rows = [
+        row for row, fingerprint in enumerate(fingerprints) if fingerprint not in known
+    ]
+    logger.info(
+        "Found %d of %d rows in the row index.",
+        len(rows) - len(plan.pending_rows),
+        len(rows),
+    )
+    if plan.pending_rows:
+        output = io.StringIO()
+        writer = csv.writer(output, lineterminator="\n")
+        writer.writerow([ROW_ID_COLUMN, *header])
+        writer.writerows([row, *rows[row]] for row in plan.pending_rows)
+        plan.pending_csv = output.getvalue()
+    return plan
+
+
+def get_row_index() -> RowIndex | None:
+    """
+    Returns the process-wide row index. Incremental extraction is enabled by setting ROW_INDEX_PATH
+    to the SQLite file the index is persisted in.
+
+    Returns:
+        RowIndex | None: The shared row index, or None if incremental extraction is disabled.
+    """
+    global _index
+    path = os.environ.get("ROW_INDEX_PATH")
+    if not path:
+        return None
+    with _index_lock:
+        if _index is None or _index.path != path:
+            _index = RowIndex(path=path)
+        return _index
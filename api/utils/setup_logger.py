@@ -1,5 +1,196 @@
+import atexit
+import contextvars
+import json
 import logging
+import os
+import queue
 import sys
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from logging.handlers import QueueHandler, QueueListener
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+CONTEXT_FIELDS = ("request_id", "job_id")
+
+_log_context: contextvars.ContextVar[dict] = contextvars.ContextVar(
+    "log_context", default={}
+)
+_queue_handler: "QueueHandler | None" = None
+_listener: "QueueListener | None" = None
+_file_handlers: dict[tuple[str, str], logging.Handler] = {}
+_queue_lock = threading.Lock()
+
+
+@contextmanager
+def log_context(**ids: str) -> Iterator[None]:
+    """
+    Attaches ids such as request_id or job_id to every record logged inside the block, including
+    from tasks and threads started with asyncio.to_thread, which copy the current context.
+
+    Args:
+        **ids (str): The ids to attach.
+    """
+    token = _log_context.set({**_log_context.get(), **ids})
+    try:
+        yield
+    finally:
+        _log_context.reset(token)
+
+
+class ContextFilter(logging.Filter):
+    """
+    Copies the ids set with log_context onto each record. It runs in the thread that logs, before the
+    record is handed to the queue listener.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        context = _log_context.get()
+        for name in CONTEXT_FIELDS:
+            setattr(record, name, context.get(name))
+        return True
+
+
+class LevelSampler(logging.Filter):
+    """
+    Keeps one in every N records of a sampled level, counted per call site, so a chatty log line is
+    thinned out without silencing rarer lines at the same level. Warnings and above are never
+    sampled.
+    """
+
+    def __init__(self, rates: dict[int, float]):
+        """
+        Args:
+            rates (dict[int, float]): The fraction of records kept for each level, between 0 and 1.
+        """
+        super().__init__()
+        self.intervals = {
+            level: max(round(1 / rate), 1) if rate > 0 else 0
+            for level, rate in rates.items()
+            if level < logging.WARNING
+        }
+        self._counts: dict[tuple, int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        interval = self.intervals.get(record.levelno)
+        if interval is None:
+            return True
+        if interval == 0:
+            return False
+        key = (record.name, record.levelno, record.pathname, record.lineno)
+        with self._lock:
+            count = self._counts.get(key, 0)
+            self._counts[key] = count + 1
+        return count % interval == 0
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats each record as a single JSON line, including any ids set with log_context."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "logger": record.name,
+            "level": record.levelname,
+            "message": record.getMessage(),
+        }
+        for name in CONTEXT_FIELDS:
+            value = getattr(record, name, None)
+            if value is not None:
+                entry[name] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+def parse_sample_rates(value: str | None) -> dict[int, float]:
+    """
+    Parses LOG_SAMPLE_RATES, a comma-separated list of LEVEL=rate pairs such as "DEBUG=0.01,INFO=0.1".
+
+    Args:
+        value (str | None): The configured value.
+
+    Returns:
+        dict[int, float]: The fraction of records kept for each level.
+
+    Raises:
+        ValueError: If a pair is malformed, names an unknown level or has a rate outside 0 to 1.
+    """
+    rates = {}
+    for pair in (value or "").split(","):
+        if not pair.strip():
+            continue
+        name, _, rate = pair.partition("=")
+        level = logging.getLevelName(name.strip().upper())
+        if not isinstance(level, int) or not rate:
+            raise ValueError(f"Invalid log sample rate '{pair}'.")
+        rates[level] = float(rate)
+        if not 0 <= rates[level] <= 1:
+            raise ValueError(f"Log sample rate '{pair}' must be between 0 and 1.")
+    return rates
+
+
+def _get_formatter() -> logging.Formatter:
+    """Returns the formatter selected by LOG_FORMAT (text or json)."""
+    if os.environ.get("LOG_FORMAT", "text").lower() == "json":
+        return JsonFormatter()
+    return logging.Formatter(TEXT_FORMAT)
+
+
+def _get_queue_handler(formatter: logging.Formatter) -> "QueueHandler":
+    """
+    Returns the QueueHandler shared by every logger, starting the listener thread that writes its
+    records to stdout on first use.
+    """
+    from logging.handlers import QueueHandler, QueueListener
+
+    global _queue_handler, _listener
+    with _queue_lock:
+        if _queue_handler is None:
+            records: queue.SimpleQueue = queue.SimpleQueue()
+            sh = logging.StreamHandler(stream=sys.stdout)
+            sh.setFormatter(formatter)
+            _queue_handler = QueueHandler(records)
+            _listener = QueueListener(records, sh, respect_handler_level=True)
+            _listener.start()
+            atexit.register(stop_log_listener)
+        return _queue_handler
+
+
+def _add_queued_file_handler(
+    logger_name: str, file_name: str, formatter: logging.Formatter
+) -> None:
+    """Adds a file handler for one logger to the listener, once per logger and file."""
+    with _queue_lock:
+        if (logger_name, file_name) in _file_handlers:
+            return
+        fh = logging.FileHandler(filename=file_name)
+        fh.setFormatter(formatter)
+        fh.addFilter(logging.Filter(logger_name))
+        _file_handlers[(logger_name, file_name)] = fh
+        _listener.handlers = (*_listener.handlers, fh)
+
+
+def stop_log_listener() -> None:
+    """
+    Flushes and stops the queue listener, if one is running. Records logged afterwards are dropped
+    until loggers are set up again, which starts a new listener.
+    """
+    global _queue_handler, _listener
+    with _queue_lock:
+        if _listener is not None:
+            _listener.stop()
+            for handler in _listener.handlers:
+                handler.close()
+        _queue_handler = None
+        _listener = None
+        _file_handlers.clear()
 
 
 def setup_logger(
@@ -9,6 +200,11 @@ def setup_logger(
     Sets up a logger for the application with a given name and logging level. Optionally logs to
     a file specified by file_name.
 
+    When LOG_QUEUE is true, every logger shares a single QueueHandler and records are written by one
+    background listener thread, so logging never blocks the caller on I/O. LOG_FORMAT=json writes
+    JSON lines carrying the ids set with log_context, and LOG_SAMPLE_RATES thins out debug and info
+    records.
+
     Args:
         logger_name (str): The name of the logger.
         level (int): The logging level (e.g., logging.INFO, logging.DEBUG).
@@ -19,12 +215,23 @@ def setup_logger(
     """
     logger = logging.getLogger(name=logger_name)
     logger.setLevel(level=level)
-    formatter = logging.Formatter(
-        "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    formatter = _get_formatter()
+    logger.handlers.clear()
+    for log_filter in [
+        f for f in logger.filters if isinstance(f, (ContextFilter, LevelSampler))
+    ]:
+        logger.removeFilter(log_filter)
+    logger.addFilter(ContextFilter())
+    logger.addFilter(
+        LevelSampler(parse_sample_rates(os.environ.get("LOG_SAMPLE_RATES")))
     )
+    if os.environ.get("LOG_QUEUE", "false").lower() in ("1", "true", "yes"):
+        logger.addHandler(_get_queue_handler(formatter))
+        if file_name:
+            _add_queued_file_handler(logger_name, file_name, formatter)
+        return logger
     sh = logging.StreamHandler(stream=sys.stdout)
     sh.setFormatter(formatter)
-    logger.handlers.clear()
     logger.addHandler(sh)
     if file_name:
         fh = logging.FileHandler(filename=file_name)
@@ -1,17 +1,290 @@
+import asyncio
+import csv
+import io
 import json
 import os
 import logging
+import time
+from collections.abc import Iterator
+from decimal import Decimal
+from typing import TYPE_CHECKING
 
-from dotenv import load_dotenv
-from openai import OpenAI, OpenAIError
-
-from api.utils.prompts import PROMPTS
+from api.utils.column_mapping import (
+    get_column_mapping_store,
+    header_signature,
+    parse_with_column_mapping,
+    validate_column_mapping,
+)
+from api.utils.environment import load_environment
+from api.utils.merchant_categories import get_merchant_categorizer
+from api.utils.metrics import (
+    observe_statement_rows,
+    record_model_tier,
+    record_usage,
+    span,
+)
+from api.utils.model_ladder import (
+    check_transactions,
+    count_data_rows,
+    get_model_ladder,
+)
+from api.utils.openai_client import (
+    create_chat_completion,
+    create_chat_completion_async,
+    get_async_openai_client,
+    get_openai_client,
+    openai_error_type,
+)
+from api.utils.prompt_compaction import (
+    build_token_report,
+    compact_statement_csv,
+    record_token_report,
+)
+from api.utils.prompt_templates import get_prompt_template
+from api.utils.prompts import (
+    COLUMN_MAPPING_PROMPT,
+    MERCHANT_CATEGORIES,
+    MERCHANT_CATEGORY_PROMPT,
+    PROMPTS,
+)
 from api.utils.redact_pii import remove_pii_columns
+from api.utils.result_cache import get_result_cache, make_cache_key
+from api.utils.row_index import (
+    ROW_ID_COLUMN,
+    get_row_index,
+    plan_incremental_extraction,
+    row_reference_prompt,
+)
 from api.utils.setup_logger import setup_logger
+from api.utils.structured_output import (
+    TransactionValidator,
+)
+from api.utils.transaction_batch import TransactionBatch
+from api.utils.transaction_stream import TransactionStreamParser
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
 
-load_dotenv()
 logger = setup_logger(__name__, level=logging.INFO)
 
+DEFAULT_MODEL = "gpt-5-nano"
+DEFAULT_ROWS_PER_CHUNK = 200
+DEFAULT_MAX_CONCURRENCY = 4
+DEFAULT_CHUNK_RETRIES = 2
+DEFAULT_MAPPING_SAMPLE_ROWS = 5
+DEFAULT_CATEGORY_BATCH_SIZE = 100
+
+
+def _get_api_key() -> str:
+    """
+    Returns the OpenAI API key from the environment, loading any .env file on first use.
+
+    Returns:
+        str: The value of the OPENAI_API_KEY environment variable.
+
+    Raises:
+        ValueError: If OPENAI_API_KEY is not set.
+    """
+    load_environment()
+    if os.environ.get("OPENAI_API_KEY") is None:
+        logger.error("OPENAI_API_KEY environment variable is not set.")
+        raise ValueError("OPENAI_API_KEY environment variable is not set.")
+    return os.environ["OPENAI_API_KEY"]
+
+
+def _build_messages(prompt: dict, statement_text: str) -> list[dict[str, str]]:
+    """
+    Builds the chat messages sent to the model for a given prompt and statement: the precompiled
+    system and instruction messages, followed by the statement as its own user message.
+
+    Args:
+        prompt (dict): The prompt entry, such as PROMPTS[prompt_set], to build the messages from.
+        statement_text (str): The redacted statement text.
+
+    Returns:
+        list[dict[str, str]]: The chat messages for the chat completion call.
+    """
+    return get_prompt_template(prompt).messages(statement_text)
+
+
+def _tool_arguments(response) -> str:
+    """
+    Returns the arguments of the tool call in a chat completion response.
+
+    Args:
+        response: The chat completion response returned by the OpenAI API.
+
+    Returns:
+        str: The JSON arguments of the first tool call.
+
+    Raises:
+        ValueError: If the response does not contain a tool call.
+    """
+    try:
+        return response.choices[0].message.tool_calls[0].function.arguments
+    except (AttributeError, KeyError, IndexError, TypeError) as e:
+        logger.error("Parsing model response failed: %s", e)
+        raise ValueError("Failed to parse the response from OpenAI API.")
+
+
+def _parse_transactions(
+    response, validator: TransactionValidator
+) -> list[dict[str, str | float]]:
+    """
+    Parses and validates the transactions returned in a chat completion response.
+
+    Args:
+        response: The chat completion response returned by the OpenAI API.
+        validator (TransactionValidator): The compiled validator of the prompt's function schema.
+
+    Returns:
+        list[dict[str, str | float]]: The validated transactions.
+
+    Raises:
+        ValueError: If the response does not contain a valid list of transactions.
+    """
+    try:
+        payload = json.loads(_tool_arguments(response), parse_float=Decimal)
+    except json.JSONDecodeError as e:
+        logger.error("Parsing model response failed: %s", e)
+        raise ValueError("Failed to parse the response from OpenAI API.")
+    return validator.validate_payload(payload)
+
+
+def _lookup_cached_transactions(statement_text: str, prompt_set: str):
+    """
+    Looks up previously extracted transactions for a redacted statement in the result cache.
+
+    Args:
+        statement_text (str): The redacted statement text.
+        prompt_set (str): The prompt set used for the extraction.
+
+    Returns:
+        tuple: The cache (or None if disabled), the cache key, and the cached transactions (or None).
+    """
+    cache = get_result_cache()
+    if cache is None:
+        return None, None, None
+    cache_key = make_cache_key(
+        statement_text, prompt_set, ",".join(get_model_ladder(prompt_set))
+    )
+    cached = cache.get(cache_key)
+    if cached is not None:
+        logger.info("Returning %d cached transactions.", len(cached))
+    return cache, cache_key, cached
+
+
+def _plan_incremental(statement_text: str, prompt_set: str):
+    """
+    Restricts a redacted statement to the rows not yet in the row index, when incremental extraction
+    is enabled.
+
+    Args:
+        statement_text (str): The redacted statement text.
+        prompt_set (str): The prompt set used for the extraction.
+
+    Returns:
+        tuple: The IncrementalPlan (or None if disabled), the prompt entry to use, and the statement
+            text to send to the model.
+    """
+    row_index = get_row_index()
+    if row_index is None:
+        return None, PROMPTS[prompt_set], statement_text
+    plan = plan_incremental_extraction(statement_text, prompt_set, row_index)
+    return plan, row_reference_prompt(prompt_set), plan.pending_csv
+
+
+def split_csv_into_chunks(csv_text: str, rows_per_chunk: int) -> list[str]:
+    """
+    Splits CSV text into batches of rows, repeating the header row at the top of each batch.
+
+    Args:
+        csv_text (str): The CSV text to split. The first row is treated as the header.
+        rows_per_chunk (int): The maximum number of data rows in each batch.
+
+    Returns:
+        list[str]: The CSV text of each batch, in original row order.
+    """
+    if rows_per_chunk < 1:
+        raise ValueError("rows_per_chunk must be at least 1")
+    reader = csv.reader(io.StringIO(csv_text))
+    header = next(reader, None)
+    if header is None:
+        return []
+    rows = [row for row in reader if row]
+    chunks = []
+    for start in range(0, max(len(rows), 1), rows_per_chunk):
+        output = io.StringIO()
+        writer = csv.writer(output, lineterminator="\n")
+        writer.writerow(header)
+        writer.writerows(rows[start : start + rows_per_chunk])
+        chunks.append(output.getvalue())
+    return chunks
+
+
+def _complete_with_ladder(
+    client,
+    prompt_set: str,
+    prompt: dict,
+    messages: list[dict[str, str]],
+    token_report,
+    expected_rows: int,
+    row_ids: frozenset[int] | None = None,
+) -> list[dict[str, str | float]]:
+    """
+    Sends the messages to each model of the prompt set's ladder in turn, cheapest first, until one
+    returns output that passes validation and the sanity checks.
+
+    Args:
+        client: The OpenAI client used for the calls.
+        prompt_set (str): The name of the prompt set.
+        prompt (dict): The prompt entry whose function schema the output must follow.
+        messages (list[dict[str, str]]): The chat messages to send.
+        token_report (TokenReport): The token estimates of the request.
+        expected_rows (int): The number of CSV data rows sent to the model.
+        row_ids (frozenset[int] | None): The row ids sent to the model, when rows carry ids.
+
+    Returns:
+        list[dict[str, str | float]]: The validated transactions.
+
+    Raises:
+        ValueError: If the output of every model fails validation.
+        OpenAIError: If a call fails.
+    """
+    template = get_prompt_template(prompt)
+    ladder = get_model_ladder(prompt_set)
+    for tier, model in enumerate(ladder):
+        start = time.perf_counter()
+        try:
+            with span("api_call"):
+                response = create_chat_completion(
+                    client, model=model, messages=messages, **template.options
+                )
+        except openai_error_type():
+            record_model_tier(prompt_set, model, "error", time.perf_counter() - start)
+            raise
+        elapsed = time.perf_counter() - start
+        logger.info("Received response from OpenAI API.")
+        record_token_report(token_report, response)
+        record_usage(prompt_set, response)
+        try:
+            with span("validation"):
+                transactions = _parse_transactions(response, template.validator)
+                check_transactions(transactions, expected_rows, row_ids)
+        except ValueError as e:
+            record_model_tier(prompt_set, model, "invalid", elapsed)
+            if tier + 1 == len(ladder):
+                raise
+            logger.warning(
+                "Output of %s failed validation, escalating to %s: %s",
+                model,
+                ladder[tier + 1],
+                e,
+            )
+            continue
+        record_model_tier(prompt_set, model, "success", elapsed)
+        return transactions
+
 
 def extract_statement_details(
     statement_text: str, prompt_set: str
@@ -32,49 +305,530 @@ def extract_statement_details(
     if prompt_set not in PROMPTS:
         logger.error("Invalid prompt set: %s", prompt_set)
         raise ValueError(f"Prompt set '{prompt_set}' not found in PROMPTS dictionary.")
-    if os.environ.get("OPENAI_API_KEY") is None:
-        logger.error("OPENAI_API_KEY environment variable is not set.")
-        raise ValueError("OPENAI_API_KEY environment variable is not set.")
-    client = OpenAI(api_key=os.environ["OPENAI_API_KEY"])
+    statement_text = remove_pii_columns(csv_text=statement_text)
+    logger.info("Redacted PII from statement text.")
+    observe_statement_rows(statement_text)
+    cache, cache_key, cached = _lookup_cached_transactions(statement_text, prompt_set)
+    if cached is not None:
+        return cached
+    plan, prompt, statement_text = _plan_incremental(statement_text, prompt_set)
+    if plan is not None and plan.pending_csv is None:
+        transactions = plan.merge([])
+        logger.info("Reused %d transactions from row index.", len(transactions))
+        return transactions
+    with span("prompt_build"):
+        compacted_text = compact_statement_csv(statement_text)
+        token_report = build_token_report(
+            prompt_set, prompt, statement_text, compacted_text
+        )
+        messages = _build_messages(prompt, compacted_text)
+    client = get_openai_client(api_key=_get_api_key())
+    try:
+        transactions = _complete_with_ladder(
+            client,
+            prompt_set=prompt_set,
+            prompt=prompt,
+            messages=messages,
+            token_report=token_report,
+            expected_rows=count_data_rows(compacted_text),
+            row_ids=None if plan is None else frozenset(plan.pending_rows),
+        )
+        if plan is not None:
+            transactions = plan.merge(transactions)
+        logger.info("Extracted %d transactions.", len(transactions))
+        if cache is not None:
+            cache.set(cache_key, transactions)
+        return transactions
+    except openai_error_type() as e:
+        logger.error("OpenAI API call failed: %s", e)
+        raise RuntimeError("Failed to call OpenAI API.")
+
+
+def stream_statement_details(
+    statement_text: str, prompt_set: str
+) -> Iterator[dict[str, str | float]]:
+    """
+    Generator version of extract_statement_details that streams the model output and yields each
+    transaction as soon as its object is complete and validated, instead of waiting for the whole
+    response. Transactions reused from the result cache or row index are yielded first. Each
+    transaction is yielded as a copy, so callers can annotate it without altering what is cached.
+
+    Args:
+        statement_text (str): The raw statement text from the input statement file.
+        prompt_set (str): The prompt set to provide the AI model with details on which data to extract.
+
+    Yields:
+        dict[str, str | float]: Each extracted transaction.
+
+    Raises:
+        ValueError: If the prompt set is unknown or the response is not a valid list of transactions.
+        RuntimeError: If the OpenAI API call fails.
+    """
+    if prompt_set not in PROMPTS:
+        logger.error("Invalid prompt set: %s", prompt_set)
+        raise ValueError(f"Prompt set '{prompt_set}' not found in PROMPTS dictionary.")
+    statement_text = remove_pii_columns(csv_text=statement_text)
+    logger.info("Redacted PII from statement text.")
+    observe_statement_rows(statement_text)
+    cache, cache_key, cached = _lookup_cached_transactions(statement_text, prompt_set)
+    if cached is not None:
+        yield from cached
+        return
+    plan, prompt, statement_text = _plan_incremental(statement_text, prompt_set)
+    if plan is not None:
+        pending = set(plan.pending_rows)
+        for row, fingerprint in enumerate(plan.fingerprints):
+            if row not in pending:
+                yield from (dict(known) for known in plan.known[fingerprint])
+        if plan.pending_csv is None:
+            plan.merge([])
+            return
+    with span("prompt_build"):
+        compacted_text = compact_statement_csv(statement_text)
+        token_report = build_token_report(
+            prompt_set, prompt, statement_text, compacted_text
+        )
+        messages = _build_messages(prompt, compacted_text)
+    template = get_prompt_template(prompt)
+    client = get_openai_client(api_key=_get_api_key())
+    parser = TransactionStreamParser()
+    transactions = []
     try:
+        with span("api_call"):
+            stream = create_chat_completion(
+                client,
+                model=get_model_ladder(prompt_set)[0],
+                messages=messages,
+                stream=True,
+                stream_options={"include_usage": True},
+                **template.options,
+            )
+        for chunk in stream:
+            if chunk.usage is not None:
+                record_token_report(token_report, chunk)
+                record_usage(prompt_set, chunk)
+            tool_calls = chunk.choices[0].delta.tool_calls if chunk.choices else None
+            if not tool_calls:
+                continue
+            fragment = getattr(tool_calls[0].function, "arguments", None) or ""
+            for transaction in parser.feed(fragment):
+                transaction = template.validator.validate_transaction(transaction)
+                transactions.append(transaction)
+                if plan is None:
+                    yield dict(transaction)
+                else:
+                    yield {
+                        key: value
+                        for key, value in transaction.items()
+                        if key != ROW_ID_COLUMN
+                    }
+        parser.close()
+    except openai_error_type() as e:
+        logger.error("OpenAI API call failed: %s", e)
+        raise RuntimeError("Failed to call OpenAI API.")
+    if plan is not None:
+        transactions = plan.merge(transactions)
+    logger.info("Streamed %d transactions.", len(transactions))
+    if cache is not None:
+        cache.set(cache_key, transactions)
+
+
+async def _extract_chunk(
+    client: "AsyncOpenAI",
+    semaphore: asyncio.Semaphore,
+    prompt_set: str,
+    prompt: dict,
+    chunk_text: str,
+    chunk_index: int,
+    max_retries: int,
+    row_ids: frozenset[int] | None = None,
+) -> list[dict[str, str | float]]:
+    """
+    Sends a single CSV chunk to the model. Output that fails validation or the sanity checks is
+    escalated to the next model of the ladder, and retried on the last model. Rate limits and
+    transport errors are not retried here, since create_chat_completion_async already retries them
+    with backoff.
+
+    Args:
+        client (AsyncOpenAI): The async OpenAI client used for the call.
+        semaphore (asyncio.Semaphore): Caps the number of chunks in flight at once.
+        prompt_set (str): The name of the prompt set, used for token reporting.
+        prompt (dict): The prompt entry used to build the messages.
+        chunk_text (str): The redacted CSV text of the chunk, including the header row.
+        chunk_index (int): The position of the chunk within the statement, used for logging.
+        max_retries (int): The number of times invalid output of the last model is retried.
+        row_ids (frozenset[int] | None): The row ids sent to the model, when rows carry ids.
+
+    Returns:
+        list[dict[str, str | float]]: The validated transactions extracted from the chunk.
+    """
+    with span("prompt_build"):
+        compacted_text = compact_statement_csv(chunk_text)
+        token_report = build_token_report(
+            prompt_set, prompt, chunk_text, compacted_text
+        )
+        messages = _build_messages(prompt, compacted_text)
+    template = get_prompt_template(prompt)
+    ladder = get_model_ladder(prompt_set)
+    expected_rows = count_data_rows(compacted_text)
+    tier = 0
+    attempt = 0
+    while True:
+        model = ladder[tier]
+        try:
+            async with semaphore:
+                start = time.perf_counter()
+                with span("api_call"):
+                    response = await create_chat_completion_async(
+                        client, model=model, messages=messages, **template.options
+                    )
+            elapsed = time.perf_counter() - start
+            record_token_report(token_report, response)
+            record_usage(prompt_set, response)
+            with span("validation"):
+                transactions = _parse_transactions(response, template.validator)
+                check_transactions(transactions, expected_rows, row_ids)
+            record_model_tier(prompt_set, model, "success", elapsed)
+            return transactions
+        except openai_error_type() as e:
+            record_model_tier(prompt_set, model, "error", time.perf_counter() - start)
+            logger.error("Chunk %d failed: %s", chunk_index, e)
+            raise RuntimeError(f"Failed to call OpenAI API for chunk {chunk_index}.")
+        except ValueError as e:
+            record_model_tier(prompt_set, model, "invalid", elapsed)
+            if tier + 1 < len(ladder):
+                logger.warning(
+                    "Output of %s for chunk %d failed validation, escalating to %s: %s",
+                    model,
+                    chunk_index,
+                    ladder[tier + 1],
+                    e,
+                )
+                tier += 1
+                continue
+            if attempt >= max_retries:
+                logger.error(
+                    "Chunk %d failed validation after %d attempts: %s",
+                    chunk_index,
+                    attempt + 1,
+                    e,
+                )
+                raise
+            logger.warning("Retrying chunk %d after invalid output: %s", chunk_index, e)
+            attempt += 1
+
+
+async def extract_statement_details_chunked(
+    statement_text: str,
+    prompt_set: str,
+    rows_per_chunk: int = DEFAULT_ROWS_PER_CHUNK,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    max_retries: int = DEFAULT_CHUNK_RETRIES,
+    redacted: bool = False,
+) -> list[dict[str, str | float]]:
+    """
+    Extracts transaction details from large statements by splitting the redacted CSV into row batches
+    and sending the batches to the model concurrently. Each batch repeats the header row, and batches
+    with invalid output are retried on their own without re-sending the rest of the statement. When
+    a batch fails, the batches still in flight are cancelled.
+
+    Args:
+        statement_text (str): The raw statement text from the input statement file.
+        prompt_set (str): The prompt set to provide the AI model with details on which data to extract.
+        rows_per_chunk (int): The maximum number of data rows sent to the model in a single call.
+        max_concurrency (int): The maximum number of chunks in flight at once.
+        max_retries (int): The number of times a chunk with invalid output is retried.
+        redacted (bool): Whether PII columns were already removed from statement_text, so
+            redaction can be skipped.
+
+    Returns:
+        list[dict[str, str | float]]: The extracted transactions, in original row order.
+    """
+    if prompt_set not in PROMPTS:
+        logger.error("Invalid prompt set: %s", prompt_set)
+        raise ValueError(f"Prompt set '{prompt_set}' not found in PROMPTS dictionary.")
+    if max_concurrency < 1:
+        raise ValueError("max_concurrency must be at least 1")
+    if not redacted:
         statement_text = remove_pii_columns(csv_text=statement_text)
         logger.info("Redacted PII from statement text.")
-        response = client.chat.completions.create(
-            model="gpt-5-nano",
-            messages=[
-                {"role": "system", "content": PROMPTS[prompt_set]["system_prompt"]},
-                {
-                    "role": "user",
-                    "content": PROMPTS[prompt_set]["user_prompt"].replace(
-                        "REPLACE_ME", statement_text
-                    ),
-                },
-            ],
-            functions=[PROMPTS[prompt_set]["function_schema"]],
-            function_call={"name": "extract_transaction"},
-        )
-        logger.info("Received response from OpenAI API.")
-        function_args = response.choices[0].message.function_call.arguments
-        all_transactions = json.loads(function_args)
-        if not isinstance(all_transactions, dict):
-            raise ValueError(
-                f"Expected response to be a dict, got type {type(all_transactions)}."
+    observe_statement_rows(statement_text)
+    cache, cache_key, cached = _lookup_cached_transactions(statement_text, prompt_set)
+    if cached is not None:
+        return cached
+    plan, prompt, statement_text = _plan_incremental(statement_text, prompt_set)
+    if plan is not None and plan.pending_csv is None:
+        transactions = plan.merge([])
+        logger.info("Reused %d transactions from row index.", len(transactions))
+        return transactions
+    api_key = _get_api_key()
+    chunks = split_csv_into_chunks(statement_text, rows_per_chunk)
+    logger.info("Split statement into %d chunks.", len(chunks))
+    client = get_async_openai_client(api_key=api_key)
+    semaphore = asyncio.Semaphore(max_concurrency)
+    row_ids = None if plan is None else frozenset(plan.pending_rows)
+    tasks = [
+        asyncio.create_task(
+            _extract_chunk(
+                client=client,
+                semaphore=semaphore,
+                prompt_set=prompt_set,
+                prompt=prompt,
+                chunk_text=chunk,
+                chunk_index=index,
+                max_retries=max_retries,
+                row_ids=row_ids,
             )
-        transactions = all_transactions.get("transactions", [])
-        for transaction in transactions:
-            if not isinstance(transaction, dict):
-                raise ValueError(f"Transaction {transaction} is not a dictionary.")
-            expected_keys = {"merchant", "date", "amount", "currency"}
-            missing = expected_keys - transaction.keys()
-            if missing:
+        )
+        for index, chunk in enumerate(chunks)
+    ]
+    try:
+        results = await asyncio.gather(*tasks)
+    except BaseException:
+        # Stop the other chunks from spending tokens once the statement has failed.
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    transactions = [transaction for result in results for transaction in result]
+    if plan is not None:
+        transactions = plan.merge(transactions)
+    logger.info("Extracted %d transactions.", len(transactions))
+    if cache is not None:
+        cache.set(cache_key, transactions)
+    return transactions
+
+
+async def extract_statement_batch(
+    statement_text: str, prompt_set: str, **options
+) -> TransactionBatch:
+    """
+    Columnar version of extract_statement_details_chunked that returns the transactions as a
+    TransactionBatch, with amounts in integer cents and dates as day numbers.
+
+    Args:
+        statement_text (str): The raw statement text from the input statement file.
+        prompt_set (str): The prompt set to provide the AI model with details on which data to extract.
+        **options: Passed to extract_statement_details_chunked.
+
+    Returns:
+        TransactionBatch: The extracted transactions, in original row order.
+    """
+    transactions = await extract_statement_details_chunked(
+        statement_text=statement_text, prompt_set=prompt_set, **options
+    )
+    return TransactionBatch.from_dicts(transactions)
+
+
+def _infer_column_mapping(header: list[str], sample_text: str) -> dict:
+    """
+    Asks the model for the column mapping of a CSV layout, showing it only the header and a few
+    sample rows.
+
+    Args:
+        header (list[str]): The column names from the header row.
+        sample_text (str): The redacted CSV text of the header and a few sample rows.
+
+    Returns:
+        dict: The validated column mapping.
+
+    Raises:
+        ValueError: If the model response is not a valid mapping for the header.
+        RuntimeError: If the OpenAI API call fails.
+    """
+    client = get_openai_client(api_key=_get_api_key())
+    try:
+        response = create_chat_completion(
+            client,
+            model=DEFAULT_MODEL,
+            messages=_build_messages(COLUMN_MAPPING_PROMPT, sample_text),
+            **get_prompt_template(COLUMN_MAPPING_PROMPT).options,
+        )
+        mapping = json.loads(_tool_arguments(response))
+    except json.JSONDecodeError as e:
+        logger.error("Parsing column mapping response failed: %s", e)
+        raise ValueError("Failed to parse the column mapping from OpenAI API.")
+    except openai_error_type() as e:
+        logger.error("OpenAI API call failed: %s", e)
+        raise RuntimeError("Failed to call OpenAI API.")
+    if not isinstance(mapping, dict):
+        raise ValueError(
+            f"Expected column mapping to be a dict, got type {type(mapping)}."
+        )
+    return validate_column_mapping(mapping, header)
+
+
+def parse_statement_locally(
+    statement_text: str,
+    prompt_set: str,
+    sample_rows: int = DEFAULT_MAPPING_SAMPLE_ROWS,
+) -> list[dict[str, str | float]] | None:
+    """
+    Parses a statement locally with the column mapping of its CSV header signature. The first time
+    a signature is seen, the model is shown only the header and a few sample rows and returns a
+    column mapping. The mapping is persisted for the signature only once it parses the sample rows
+    into at least one transaction, so a wrong mapping is never reused for later statements.
+
+    Args:
+        statement_text (str): The raw statement text from the input statement file.
+        prompt_set (str): Either 'card_account_csv_statement_parser' or
+            'checking_account_csv_statement_parser'.
+        sample_rows (int): The number of data rows shown to the model when inferring a mapping.
+
+    Returns:
+        list[dict[str, str | float]] | None: The extracted transactions, in row order, or None if
+            the layout cannot be mapped.
+
+    Raises:
+        RuntimeError: If the OpenAI API call fails.
+    """
+    redacted_text = remove_pii_columns(csv_text=statement_text)
+    header = next(csv.reader(io.StringIO(redacted_text)), [])
+    signature = header_signature(header)
+    store = get_column_mapping_store()
+    mapping = store.get(signature)
+    if mapping is None:
+        sample_text = split_csv_into_chunks(redacted_text, sample_rows)[0]
+        try:
+            mapping = _infer_column_mapping(header, sample_text)
+            if not parse_with_column_mapping(sample_text, mapping, prompt_set):
                 raise ValueError(
-                    f"Transaction {transaction} is missing expected fields: {missing}"
+                    "Column mapping parsed no transactions from the sample rows."
                 )
-        logger.info("Extracted %d transactions.", len(transactions))
-        return transactions
-    except (AttributeError, KeyError, json.JSONDecodeError) as e:
-        logger.error("Parsing model response failed: %s", e)
-        raise ValueError("Failed to parse the response from OpenAI API.")
-    except OpenAIError as e:
+        except ValueError as e:
+            logger.warning("Could not infer column mapping: %s", e)
+            return None
+        store.set(signature, header, mapping)
+        logger.info("Stored column mapping for header signature %s.", signature)
+    transactions = parse_with_column_mapping(redacted_text, mapping, prompt_set)
+    logger.info("Parsed %d transactions locally.", len(transactions))
+    return transactions
+
+
+def parse_statement(
+    statement_text: str,
+    prompt_set: str,
+    sample_rows: int = DEFAULT_MAPPING_SAMPLE_ROWS,
+) -> list[dict[str, str | float]]:
+    """
+    Parses a statement in two phases. The first time a CSV header signature is seen, the model is
+    shown only the header and a few sample rows and returns a column mapping, which is persisted for
+    the signature once it parses the sample rows. Every statement with a known signature is then
+    parsed locally without any model calls. Statements whose layout cannot be mapped fall back to
+    extract_statement_details.
+
+    Args:
+        statement_text (str): The raw statement text from the input statement file.
+        prompt_set (str): Either 'card_account_csv_statement_parser' or
+            'checking_account_csv_statement_parser'.
+        sample_rows (int): The number of data rows shown to the model when inferring a mapping.
+
+    Returns:
+        list[dict[str, str | float]]: The extracted transactions, in row order.
+    """
+    if prompt_set not in PROMPTS:
+        logger.error("Invalid prompt set: %s", prompt_set)
+        raise ValueError(f"Prompt set '{prompt_set}' not found in PROMPTS dictionary.")
+    transactions = parse_statement_locally(statement_text, prompt_set, sample_rows)
+    if transactions is None:
+        logger.warning("Falling back to full extraction.")
+        return extract_statement_details(
+            statement_text=statement_text, prompt_set=prompt_set
+        )
+    return transactions
+
+
+def _infer_merchant_categories(merchants: list[str]) -> dict[str, str]:
+    """
+    Asks the model for the categories of merchants the local rules do not know, in one request.
+
+    Args:
+        merchants (list[str]): The normalized merchant names.
+
+    Returns:
+        dict[str, str]: The category of each merchant the model answered for. Answers for names that
+            were not asked about or with unknown categories are dropped.
+
+    Raises:
+        ValueError: If the model response cannot be parsed.
+        RuntimeError: If the OpenAI API call fails.
+    """
+    client = get_openai_client(api_key=_get_api_key())
+    try:
+        response = create_chat_completion(
+            client,
+            model=DEFAULT_MODEL,
+            messages=_build_messages(MERCHANT_CATEGORY_PROMPT, "\n".join(merchants)),
+            **get_prompt_template(MERCHANT_CATEGORY_PROMPT).options,
+        )
+        record_usage("categorize_merchants", response)
+        answers = json.loads(_tool_arguments(response))["merchants"]
+    except (json.JSONDecodeError, KeyError, TypeError) as e:
+        logger.error("Parsing merchant category response failed: %s", e)
+        raise ValueError("Failed to parse the merchant categories from OpenAI API.")
+    except openai_error_type() as e:
         logger.error("OpenAI API call failed: %s", e)
         raise RuntimeError("Failed to call OpenAI API.")
+    asked = set(merchants)
+    return {
+        answer["merchant"]: answer["category"]
+        for answer in answers
+        if isinstance(answer, dict)
+        and answer.get("merchant") in asked
+        and answer.get("category") in MERCHANT_CATEGORIES
+    }
+
+
+def categorize_transactions(
+    transactions: list[dict],
+    use_model: bool | None = None,
+    batch_size: int = DEFAULT_CATEGORY_BATCH_SIZE,
+) -> list[dict]:
+    """
+    Adds the normalized_merchant and category of each transaction, in place. Merchants are
+    categorized locally by the rules of get_merchant_categorizer, without adding tokens to the
+    extraction calls. When use_model is enabled, the remaining distinct merchants are sent to the
+    model in batches and its answers are persisted, so each unknown merchant is asked about once.
+    Merchants that stay unknown get a None category.
+
+    Args:
+        transactions (list[dict]): The extracted transactions.
+        use_model (bool | None): Whether to ask the model about unknown merchants, or None for
+            MERCHANT_CATEGORY_FALLBACK (off by default).
+        batch_size (int): The maximum number of merchants per model request.
+
+    Returns:
+        list[dict]: The same transactions.
+    """
+    if use_model is None:
+        use_model = os.environ.get("MERCHANT_CATEGORY_FALLBACK", "false").lower() in (
+            "1",
+            "true",
+        )
+    categorizer = get_merchant_categorizer()
+    with span("categorize_merchants"):
+        unknown = categorizer.apply(transactions)
+    if not unknown or not use_model:
+        return transactions
+    learned: dict[str, str] = {}
+    for start in range(0, len(unknown), batch_size):
+        try:
+            learned.update(
+                _infer_merchant_categories(unknown[start : start + batch_size])
+            )
+        except (ValueError, RuntimeError) as e:
+            logger.warning("Could not categorize merchants with the model: %s", e)
+            break
+    if learned:
+        categorizer.learn(learned)
+        for transaction in transactions:
+            if transaction["category"] is None:
+                transaction["category"] = learned.get(
+                    transaction["normalized_merchant"]
+                )
+    logger.info(
+        "Categorized %d of %d unknown merchants with the model.",
+        len(learned),
+        len(unknown),
+    )
+    return transactions
@@ -0,0 +1,278 @@
+import copy
+import re
+import threading
+from collections.abc import Callable
+from datetime import date
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from functools import lru_cache
+
+CENTS = Decimal("0.01")
+ISO_DATE_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+_compiled: dict[int, tuple] = {}
+_compiled_lock = threading.Lock()
+
+
+def strict_schema(schema: dict) -> dict:
+    """
+    Converts a JSON schema to the subset accepted by strict structured outputs: every object lists
+    all of its properties as required and forbids additional properties, and properties that were
+    optional become nullable instead.
+
+    Args:
+        schema (dict): The JSON schema to convert. It is not modified.
+
+    Returns:
+        dict: The strict JSON schema.
+    """
+    schema = copy.deepcopy(schema)
+    if schema.get("type") == "object":
+        properties = schema.get("properties", {})
+        required = set(schema.get("required", []))
+        for name, prop in properties.items():
+            properties[name] = strict_schema(prop)
+            if name not in required:
+                _make_nullable(properties[name])
+        schema["required"] = list(properties)
+        schema["additionalProperties"] = False
+    elif schema.get("type") == "array" and "items" in schema:
+        schema["items"] = strict_schema(schema["items"])
+    return schema
+
+
+def _make_nullable(schema: dict) -> None:
+    """Allows null in addition to the declared type of a property schema."""
+    types = schema.get("type")
+    if isinstance(types, str):
+        schema["type"] = [types, "null"]
+    elif isinstance(types, list) and "null" not in types:
+        schema["type"] = [*types, "null"]
+    if "enum" in schema and None not in schema["enum"]:
+        schema["enum"] = [*schema["enum"], None]
+
+
+def strict_tool(function_schema: dict) -> dict:
+    """
+    Builds a strict tool definition from a function schema in PROMPTS.
+
+    Args:
+        function_schema (dict): The function schema with name, description and parameters.
+
+    Returns:
+        dict: The tool definition to pass to chat.completions.create.
+    """
+    return {
+        "type": "function",
+        "function": {
+            "name": function_schema["name"],
+            "description": function_schema.get("description", ""),
+            "parameters": strict_schema(function_schema["parameters"]),
+            "strict": True,
+        },
+    }
+
+
+def tool_request(function_schema: dict) -> dict:
+    """
+    Builds the chat.completions.create arguments forcing the model to call the given function with
+    strict structured outputs.
+
+    Args:
+        function_schema (dict): The function schema with name, description and parameters.
+
+    Returns:
+        dict: The tools and tool_choice arguments.
+    """
+    return {
+        "tools": [strict_tool(function_schema)],
+        "tool_choice": {
+            "type": "function",
+            "function": {"name": function_schema["name"]},
+        },
+    }
+
+
+def _coerce_string(value):
+    if not isinstance(value, str):
+        raise ValueError(f"expected a string, got {type(value).__name__}")
+    return value
+
+
+@lru_cache(maxsize=4096)
+def _coerce_date(value):
+    if not isinstance(value, str) or not ISO_DATE_PATTERN.match(value):
+        raise ValueError(f"expected a YYYY-MM-DD date, got {value!r}")
+    return date.fromisoformat(value).isoformat()
+
+
+def _coerce_amount(value):
+    kind = type(value)
+    if kind is float:
+        value = Decimal(repr(value))
+    elif kind is int:
+        value = Decimal(value)
+    elif kind is not Decimal:
+        raise ValueError(f"expected a number, got {kind.__name__}")
+    try:
+        return float(value.quantize(CENTS, rounding=ROUND_HALF_UP))
+    except InvalidOperation:
+        raise ValueError(f"expected a finite number, got {value!r}")
+
+
+def _coerce_integer(value):
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError(f"expected an integer, got {type(value).__name__}")
+    return value
+
+
+def _compile_property(schema: dict) -> Callable:
+    """
+    Builds the coercion function of a single property schema.
+
+    Args:
+        schema (dict): The property schema.
+
+    Returns:
+        Callable: A function returning the coerced value, or raising ValueError if it is invalid.
+    """
+    types = schema.get("type")
+    types = {types} if isinstance(types, str) else set(types or [])
+    types.discard("null")
+    if "enum" in schema:
+        allowed = frozenset(value for value in schema["enum"] if value is not None)
+
+        def coerce_enum(value):
+            if value not in allowed:
+                raise ValueError(f"expected one of {sorted(allowed)}, got {value!r}")
+            return value
+
+        return coerce_enum
+    if types == {"string"}:
+        return _coerce_date if schema.get("format") == "date" else _coerce_string
+    if types == {"number"}:
+        return _coerce_amount
+    if types == {"integer"}:
+        return _coerce_integer
+    return lambda value: value
+
+
+class TransactionValidator:
+    """
+    Validates and coerces the transactions returned for a function schema in a single pass. The
+    per-field checks are compiled once from the schema: dates are parsed and normalized to
+    YYYY-MM-DD and amounts are parsed as Decimal and rounded to cents.
+    """
+
+    def __init__(self, function_schema: dict, array_key: str = "transactions"):
+        """
+        Args:
+            function_schema (dict): The function schema from PROMPTS.
+            array_key (str): The top-level key holding the list of transactions.
+        """
+        self.array_key = array_key
+        items = function_schema["parameters"]["properties"][array_key]["items"]
+        properties = items.get("properties", {})
+        self._required = frozenset(items.get("required", []))
+        self._names = frozenset(properties)
+        self._nullable = frozenset(
+            name
+            for name, prop in properties.items()
+            if name not in self._required
+            or "null"
+            in (prop.get("type") if isinstance(prop.get("type"), list) else [])
+        )
+        self._coercers = {
+            name: _compile_property(prop) for name, prop in properties.items()
+        }
+
+    def validate_transaction(self, transaction) -> dict:
+        """
+        Validates and coerces a single transaction. Null optional fields are dropped.
+
+        Args:
+            transaction: The transaction returned by the model.
+
+        Returns:
+            dict: The coerced transaction.
+
+        Raises:
+            ValueError: If the transaction is not a dict, is missing required fields, has unexpected
+                fields or has a field of the wrong type or format.
+        """
+        if not isinstance(transaction, dict):
+            raise ValueError(f"Transaction {transaction} is not a dictionary.")
+        if not self._required <= transaction.keys():
+            missing = self._required - transaction.keys()
+            raise ValueError(
+                f"Transaction {transaction} is missing expected fields: {missing}"
+            )
+        coercers = self._coercers
+        coerced = {}
+        for name, value in transaction.items():
+            coerce = coercers.get(name)
+            if coerce is None:
+                unexpected = transaction.keys() - self._names
+                raise ValueError(
+                    f"Transaction {transaction} has unexpected fields: {unexpected}"
+                )
+            if value is None:
+                if name in self._nullable:
+                    continue
+                raise ValueError(f"Transaction {transaction} has a null {name}.")
+            if coerce is _coerce_string and type(value) is str:
+                coerced[name] = value
+                continue
+            try:
+                coerced[name] = coerce(value)
+            except ValueError as e:
+                raise ValueError(
+                    f"Transaction {transaction} has an invalid {name}: {e}."
+                )
+        return coerced
+
+    def validate_payload(self, payload) -> list[dict]:
+        """
+        Validates every transaction in the decoded function call arguments of a response.
+
+        Args:
+            payload: The decoded arguments returned by the model.
+
+        Returns:
+            list[dict]: The coerced transactions.
+
+        Raises:
+            ValueError: If the payload is not a dict or holds invalid transactions.
+        """
+        if not isinstance(payload, dict):
+            raise ValueError(
+                f"Expected response to be a dict, got type {type(payload)}."
+            )
+        transactions = payload.get(self.array_key, [])
+        if not isinstance(transactions, list):
+            raise ValueError(
+                f"Expected {self.array_key} to be a list, got type {type(transactions)}."
+            )
+        return [self.validate_transaction(transaction) for transaction in transactions]
+
+
+def get_structured_output(function_schema: dict) -> tuple[dict, TransactionValidator]:
+    """
+    Returns the strict tool arguments and compiled validator of a function schema, building them
+    on first use and reusing them afterwards.
+
+    Args:
+        function_schema (dict): The function schema from PROMPTS.
+
+    Returns:
+        tuple[dict, TransactionValidator]: The tools and tool_choice arguments, and the validator.
+    """
+    compiled = _compiled.get(id(function_schema))
+    if compiled is None or compiled[0] is not function_schema:
+        compiled = (
+            function_schema,
+            tool_request(function_schema),
+            TransactionValidator(function_schema),
+        )
+        with _compiled_lock:
+            _compiled[id(function_schema)] = compiled
+    return compiled[1], compiled[2]
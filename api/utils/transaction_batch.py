@@ -0,0 +1,325 @@
+from array import array
+from collections.abc import Iterable, Iterator
+from datetime import date
+from enum import IntEnum
+from functools import lru_cache
+
+from api.utils.transaction_store import to_cents
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+DEFAULT_CURRENCY = "USD"
+
+
+class TransactionType(IntEnum):
+    """The transaction types with fixed codes, shared by every batch."""
+
+    EXPENSE = 0
+    INCOME = 1
+    PAYMENT = 2
+    REFUND = 3
+    TRANSFER = 4
+    FEE = 5
+
+    @property
+    def label(self) -> str:
+        """The label used in transaction dicts, e.g. 'Expense'."""
+        return self.name.capitalize()
+
+
+TRANSACTION_TYPE_LABELS = tuple(member.label for member in TransactionType)
+
+
+@lru_cache(maxsize=8192)
+def to_day_number(value: str) -> int:
+    """
+    Converts a YYYY-MM-DD date to the number of days since 1970-01-01.
+
+    Args:
+        value (str): The ISO date.
+
+    Returns:
+        int: The day number.
+    """
+    return date.fromisoformat(value).toordinal() - EPOCH_ORDINAL
+
+
+@lru_cache(maxsize=8192)
+def from_day_number(day: int) -> str:
+    """
+    Converts a number of days since 1970-01-01 back to a YYYY-MM-DD date.
+
+    Args:
+        day (int): The day number.
+
+    Returns:
+        str: The ISO date.
+    """
+    return date.fromordinal(day + EPOCH_ORDINAL).isoformat()
+
+
+class _Dictionary:
+    """An append-only dictionary encoding of strings to small integer codes."""
+
+    __slots__ = ("values", "codes")
+
+    def __init__(self, values: Iterable = ()):
+        self.values: list = []
+        self.codes: dict = {}
+        for value in values:
+            self.encode(value)
+
+    def encode(self, value) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+class TransactionBatch:
+    """
+    A columnar batch of transactions stored in typed arrays: dates as int32 days since 1970-01-01,
+    amounts as int64 cents, and merchants, currencies and transaction types as integer codes into
+    per-batch dictionaries. Transaction type codes of the known types match TransactionType. A batch
+    of 10,000 transactions takes about a tenth of the memory of the equivalent list of dicts, and the
+    columns can be exported to NumPy or Arrow without copying.
+    """
+
+    __slots__ = (
+        "days",
+        "cents",
+        "merchant_codes",
+        "currency_codes",
+        "type_codes",
+        "_merchants",
+        "_currencies",
+        "_types",
+    )
+
+    def __init__(self):
+        self.days = array("i")
+        self.cents = array("q")
+        self.merchant_codes = array("I")
+        self.currency_codes = array("H")
+        self.type_codes = array("B")
+        self._merchants = _Dictionary()
+        self._currencies = _Dictionary([DEFAULT_CURRENCY])
+        self._types = _Dictionary(TRANSACTION_TYPE_LABELS)
+
+    @classmethod
+    def from_dicts(cls, transactions: Iterable[dict]) -> "TransactionBatch":
+        """
+        Builds a batch from transactions in the dict shape returned by the parser.
+
+        Args:
+            transactions (Iterable[dict]): Transactions with merchant, date, amount and optionally
+                currency and transaction_type. Other fields are not kept.
+
+        Returns:
+            TransactionBatch: The batch.
+
+        Raises:
+            ValueError: If a transaction has an invalid date or amount.
+        """
+        batch = cls()
+        batch.extend(transactions)
+        return batch
+
+    def append(self, transaction: dict) -> None:
+        """
+        Adds a transaction to the batch.
+
+        Args:
+            transaction (dict): The transaction in the dict shape returned by the parser.
+
+        Raises:
+            ValueError: If the transaction has an invalid date or amount.
+        """
+        amount = transaction["amount"]
+        self.days.append(to_day_number(transaction["date"]))
+        self.cents.append(
+            round(amount * 100) if type(amount) is float else to_cents(amount)
+        )
+        self.merchant_codes.append(self._merchants.encode(transaction["merchant"]))
+        self.currency_codes.append(
+            self._currencies.encode(transaction.get("currency") or DEFAULT_CURRENCY)
+        )
+        self.type_codes.append(self._types.encode(transaction.get("transaction_type")))
+
+    def extend(self, transactions: Iterable[dict]) -> None:
+        """
+        Adds transactions to the batch.
+
+        Args:
+            transactions (Iterable[dict]): The transactions in the dict shape returned by the parser.
+        """
+        for transaction in transactions:
+            self.append(transaction)
+
+    def __len__(self) -> int:
+        return len(self.cents)
+
+    @property
+    def merchants(self) -> list[str]:
+        """The merchant dictionary, indexed by merchant code."""
+        return self._merchants.values
+
+    @property
+    def currencies(self) -> list[str]:
+        """The currency dictionary, indexed by currency code."""
+        return self._currencies.values
+
+    @property
+    def transaction_types(self) -> list[str | None]:
+        """The transaction type dictionary, indexed by type code. None stands for a missing type."""
+        return self._types.values
+
+    def __getitem__(self, index: int) -> dict:
+        transaction = {
+            "merchant": self._merchants.values[self.merchant_codes[index]],
+            "date": from_day_number(self.days[index]),
+            "amount": self.cents[index] / 100,
+            "currency": self._currencies.values[self.currency_codes[index]],
+        }
+        transaction_type = self._types.values[self.type_codes[index]]
+        if transaction_type is not None:
+            transaction["transaction_type"] = transaction_type
+        return transaction
+
+    def __iter__(self) -> Iterator[dict]:
+        return (self[index] for index in range(len(self)))
+
+    def to_dicts(self) -> list[dict]:
+        """
+        Converts the batch back to the dict shape returned by the parser, with float amounts and
+        ISO dates.
+
+        Returns:
+            list[dict]: The transactions.
+        """
+        merchants = self._merchants.values
+        currencies = self._currencies.values
+        types = self._types.values
+        transactions = []
+        for day, cents, merchant, currency, type_code in zip(
+            self.days,
+            self.cents,
+            self.merchant_codes,
+            self.currency_codes,
+            self.type_codes,
+        ):
+            transaction = {
+                "merchant": merchants[merchant],
+                "date": from_day_number(day),
+                "amount": cents / 100,
+                "currency": currencies[currency],
+            }
+            if types[type_code] is not None:
+                transaction["transaction_type"] = types[type_code]
+            transactions.append(transaction)
+        return transactions
+
+    def total_cents(self) -> int:
+        """
+        Returns the sum of all amounts.
+
+        Returns:
+            int: The total in cents.
+        """
+        return sum(self.cents)
+
+    def total_cents_by(self, column: str) -> dict[str, int]:
+        """
+        Sums amounts grouped by a dictionary-encoded column, without materializing any dicts.
+
+        Args:
+            column (str): One of 'merchant', 'currency' or 'transaction_type'.
+
+        Returns:
+            dict[str, int]: The total in cents of each value present in the batch.
+
+        Raises:
+            ValueError: If the column is not dictionary-encoded.
+        """
+        encoded = {
+            "merchant": (self.merchant_codes, self._merchants.values),
+            "currency": (self.currency_codes, self._currencies.values),
+            "transaction_type": (self.type_codes, self._types.values),
+        }
+        if column not in encoded:
+            raise ValueError(f"Cannot group transactions by '{column}'.")
+        codes, values = encoded[column]
+        totals = [0] * len(values)
+        present = [False] * len(values)
+        for code, cents in zip(codes, self.cents):
+            totals[code] += cents
+            present[code] = True
+        return {
+            values[code]: total for code, total in enumerate(totals) if present[code]
+        }
+
+    def to_numpy(self) -> dict:
+        """
+        Exports the columns as NumPy arrays that share memory with the batch. Dates are int32 day
+        numbers (view them as datetime64[D] after astype('int64')) and the merchant, currency and
+        transaction_type columns hold codes into the dictionaries of the batch. The batch cannot grow
+        while the arrays are alive.
+
+        Returns:
+            dict: The arrays keyed by 'date', 'amount_cents', 'merchant', 'currency' and
+                'transaction_type'.
+
+        Raises:
+            ImportError: If numpy is not installed.
+        """
+        try:
+            import numpy as np
+        except ImportError as e:
+            raise ImportError("TransactionBatch.to_numpy requires numpy.") from e
+        return {
+            "date": np.frombuffer(self.days, dtype=np.int32),
+            "amount_cents": np.frombuffer(self.cents, dtype=np.int64),
+            "merchant": np.frombuffer(self.merchant_codes, dtype=np.uint32),
+            "currency": np.frombuffer(self.currency_codes, dtype=np.uint16),
+            "transaction_type": np.frombuffer(self.type_codes, dtype=np.uint8),
+        }
+
+    def to_arrow(self):
+        """
+        Exports the batch as a pyarrow RecordBatch whose date, amount and code buffers share memory
+        with the batch. Dates are date32, amounts int64 cents and the string columns are
+        dictionary arrays. The batch cannot grow while the record batch is alive.
+
+        Returns:
+            pyarrow.RecordBatch: The columns 'merchant', 'date', 'amount_cents', 'currency' and
+                'transaction_type'.
+
+        Raises:
+            ImportError: If pyarrow is not installed.
+        """
+        try:
+            import pyarrow as pa
+        except ImportError as e:
+            raise ImportError("TransactionBatch.to_arrow requires pyarrow.") from e
+        length = len(self)
+
+        def column(values: array, arrow_type):
+            return pa.Array.from_buffers(
+                arrow_type, length, [None, pa.py_buffer(values)]
+            )
+
+        def encoded(codes: array, arrow_type, values: list):
+            return pa.DictionaryArray.from_arrays(
+                column(codes, arrow_type), pa.array(values, type=pa.string())
+            )
+
+        return pa.RecordBatch.from_arrays(
+            [
+                encoded(self.merchant_codes, pa.uint32(), self._merchants.values),
+                column(self.days, pa.date32()),
+                column(self.cents, pa.int64()),
+                encoded(self.currency_codes, pa.uint16(), self._currencies.values),
+                encoded(self.type_codes, pa.uint8(), self._types.values),
+            ],
+            names=["merchant", "date", "amount_cents", "currency", "transaction_type"],
+        )
@@ -0,0 +1,749 @@
+import hashlib
+import math
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from itertools import groupby
+from operator import itemgetter
+
+from api.utils.setup_logger import setup_logger
+
+logger = setup_logger(__name__)
+
+GROUP_BY_COLUMNS = {
+    "month": "month",
+    "merchant": "merchant",
+    "transaction_type": "transaction_type",
+    "account": "account",
+}
+
+RECURRING_CANDIDATE = "transaction_type = 'Expense' AND amount_cents > 0"
+# Keep the monthly rollups and per-merchant interval statistics current as rows are inserted. The
+# triggers only fire for rows INSERT OR IGNORE actually inserts, so re-ingested duplicates are never
+# counted twice. Interval statistics use Welford's online mean and variance; a charge dated before
+# the latest one already seen marks the merchant stale, to be recomputed on its next use.
+AGGREGATE_TRIGGERS = """
+CREATE TRIGGER IF NOT EXISTS transactions_rollup AFTER INSERT ON transactions
+BEGIN
+    INSERT INTO monthly_rollups (month, account, merchant, transaction_type, total_cents, count)
+    VALUES (NEW.month, NEW.account, NEW.merchant, NEW.transaction_type, NEW.amount_cents, 1)
+    ON CONFLICT (month, account, merchant, transaction_type) DO UPDATE SET
+        total_cents = total_cents + excluded.total_cents,
+        count = count + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS transactions_intervals AFTER INSERT ON transactions
+WHEN NEW.transaction_type = 'Expense' AND NEW.amount_cents > 0
+BEGIN
+    INSERT INTO merchant_intervals VALUES (
+        NEW.account, NEW.merchant, NEW.date, NEW.date, 1, 0, 0, 0, NEW.amount_cents, 0, 0
+    )
+    ON CONFLICT (account, merchant) DO UPDATE SET
+        first_date = MIN(first_date, excluded.first_date),
+        last_date = MAX(last_date, excluded.last_date),
+        occurrences = occurrences + 1,
+        interval_count = interval_count + (excluded.last_date > last_date),
+        interval_mean = CASE WHEN excluded.last_date > last_date THEN interval_mean
+            + (julianday(excluded.last_date) - julianday(last_date) - interval_mean)
+            / (interval_count + 1) ELSE interval_mean END,
+        interval_m2 = CASE WHEN excluded.last_date > last_date THEN interval_m2
+            + (julianday(excluded.last_date) - julianday(last_date) - interval_mean)
+            * (julianday(excluded.last_date) - julianday(last_date) - interval_mean
+                - (julianday(excluded.last_date) - julianday(last_date) - interval_mean)
+                / (interval_count + 1)) ELSE interval_m2 END,
+        amount_mean = amount_mean + (excluded.amount_mean - amount_mean) / (occurrences + 1),
+        amount_m2 = amount_m2 + (excluded.amount_mean - amount_mean)
+            * (excluded.amount_mean - amount_mean
+                - (excluded.amount_mean - amount_mean) / (occurrences + 1)),
+        stale = stale OR excluded.last_date < last_date;
+END;
+"""
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def to_cents(amount) -> int:
+    """
+    Converts an amount to integer cents without binary floating point rounding errors.
+
+    Args:
+        amount: The amount as a float, int, Decimal or numeric string.
+
+    Returns:
+        int: The amount in cents, rounded half away from zero.
+    """
+    return int(
+        (Decimal(str(amount)) * 100).quantize(Decimal("1"), rounding="ROUND_HALF_UP")
+    )
+
+
+def _transaction_hashes(
+    transactions: list[dict], account: str
+) -> list[tuple[str, dict, int]]:
+    """
+    Builds the idempotency hash of each transaction from its account, fields and occurrence number
+    within the batch, so identical purchases in one statement are kept while re-ingesting the same
+    statement inserts nothing.
+
+    Args:
+        transactions (list[dict]): The extracted transactions.
+        account (str): The account the transactions belong to.
+
+    Returns:
+        list[tuple[str, dict, int]]: The hash, transaction and amount in cents of each transaction.
+    """
+    seen: dict[str, int] = {}
+    hashed = []
+    for transaction in transactions:
+        cents = to_cents(transaction["amount"])
+        content = "\x1f".join(
+            [
+                account,
+                str(transaction["date"]),
+                transaction["merchant"],
+                str(cents),
+                transaction.get("currency") or "USD",
+                transaction.get("transaction_type") or "Expense",
+            ]
+        )
+        occurrence = seen.get(content, 0)
+        seen[content] = occurrence + 1
+        digest = hashlib.sha256(f"{content}\x1e{occurrence}".encode("utf-8"))
+        hashed.append((digest.hexdigest(), transaction, cents))
+    return hashed
+
+
+def _interval_statistics(
+    rows: list[tuple[str, int]],
+) -> tuple[int, float, float, float, float]:
+    """
+    Computes the interval and amount statistics the merchant_intervals trigger maintains, from a
+    merchant's charges in date order: the interval count, mean and sum of squared deviations in
+    days (charges on the same day add no interval), and the amount mean and sum of squared
+    deviations in cents.
+    """
+    count = 0
+    interval_mean = interval_m2 = amount_mean = amount_m2 = 0.0
+    previous = None
+    for position, (day, cents) in enumerate(rows, start=1):
+        delta = cents - amount_mean
+        amount_mean += delta / position
+        amount_m2 += delta * (cents - amount_mean)
+        ordinal = date.fromisoformat(day).toordinal()
+        if previous is not None and ordinal > previous:
+            count += 1
+            gap = ordinal - previous
+            delta = gap - interval_mean
+            interval_mean += delta / count
+            interval_m2 += delta * (gap - interval_mean)
+        previous = ordinal
+    return count, interval_mean, interval_m2, amount_mean, amount_m2
+
+
+def _month_bounds(
+    start_date: str | None, end_date: str | None
+) -> tuple[str | None, str | None] | None:
+    """
+    Returns the first and last YYYY-MM months of a date range that starts and ends on month
+    boundaries, or None when the range cuts through a month and cannot be answered from rollups.
+    """
+    try:
+        if start_date is not None and date.fromisoformat(start_date).day != 1:
+            return None
+        if (
+            end_date is not None
+            and (date.fromisoformat(end_date) + timedelta(days=1)).day != 1
+        ):
+            return None
+    except ValueError:
+        return None
+    return (start_date and start_date[:7]), (end_date and end_date[:7])
+
+
+class TransactionStore:
+    """
+    An embedded SQLite store of extracted transactions, indexed for filtered listings and grouped
+    sums. Amounts are stored as integer cents. Monthly rollups per account, merchant and transaction
+    type, and per-merchant charge interval statistics, are maintained by triggers as transactions
+    are inserted, so summaries and recurring-charge detection do not rescan every transaction.
+    """
+
+    def __init__(self, path: str):
+        """
+        Opens (or creates) the transaction database at the given path.
+
+        Args:
+            path (str): The path to the SQLite database file, or ':memory:' for a per-process store.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS transactions (
+                id INTEGER PRIMARY KEY,
+                txn_hash TEXT NOT NULL UNIQUE,
+                account TEXT NOT NULL,
+                date TEXT NOT NULL,
+                month TEXT NOT NULL,
+                merchant TEXT NOT NULL,
+                amount_cents INTEGER NOT NULL,
+                currency TEXT NOT NULL,
+                transaction_type TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_transactions_date
+                ON transactions (date);
+            CREATE INDEX IF NOT EXISTS idx_transactions_account_date
+                ON transactions (account, date);
+            CREATE INDEX IF NOT EXISTS idx_transactions_merchant
+                ON transactions (merchant, amount_cents);
+            CREATE INDEX IF NOT EXISTS idx_transactions_month
+                ON transactions (month, amount_cents);
+            CREATE INDEX IF NOT EXISTS idx_transactions_type
+                ON transactions (transaction_type, amount_cents);
+            CREATE TABLE IF NOT EXISTS transfers (
+                outflow_id INTEGER PRIMARY KEY,
+                inflow_id INTEGER NOT NULL UNIQUE,
+                days_apart INTEGER NOT NULL,
+                similarity REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS monthly_rollups (
+                month TEXT NOT NULL,
+                account TEXT NOT NULL,
+                merchant TEXT NOT NULL,
+                transaction_type TEXT NOT NULL,
+                total_cents INTEGER NOT NULL,
+                count INTEGER NOT NULL,
+                transfer_cents INTEGER NOT NULL DEFAULT 0,
+                transfer_count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (month, account, merchant, transaction_type)
+            );
+            CREATE TABLE IF NOT EXISTS merchant_intervals (
+                account TEXT NOT NULL,
+                merchant TEXT NOT NULL,
+                first_date TEXT NOT NULL,
+                last_date TEXT NOT NULL,
+                occurrences INTEGER NOT NULL,
+                interval_count INTEGER NOT NULL,
+                interval_mean REAL NOT NULL,
+                interval_m2 REAL NOT NULL,
+                amount_mean REAL NOT NULL,
+                amount_m2 REAL NOT NULL,
+                stale INTEGER NOT NULL,
+                PRIMARY KEY (account, merchant)
+            );
+            """
+        )
+        if self._conn.execute(
+            "SELECT NOT EXISTS (SELECT 1 FROM monthly_rollups) "
+            "AND EXISTS (SELECT 1 FROM transactions)"
+        ).fetchone()[0]:
+            self._backfill_aggregates()
+        self._conn.executescript(AGGREGATE_TRIGGERS)
+        self._conn.commit()
+
+    def _backfill_aggregates(self) -> None:
+        """
+        Builds the monthly rollups and merchant interval statistics of a store created before they
+        existed. Interval statistics are marked stale and computed on first use.
+        """
+        self._conn.execute(
+            "INSERT INTO monthly_rollups (month, account, merchant, transaction_type, "
+            "total_cents, count) SELECT month, account, merchant, transaction_type, "
+            "SUM(amount_cents), COUNT(*) FROM transactions "
+            "GROUP BY month, account, merchant, transaction_type"
+        )
+        self._conn.execute(
+            "INSERT OR REPLACE INTO merchant_intervals SELECT account, merchant, MIN(date), "
+            "MAX(date), COUNT(*), 0, 0, 0, 0, 0, 1 FROM transactions "
+            f"WHERE {RECURRING_CANDIDATE} GROUP BY account, merchant"
+        )
+        self._refresh_transfer_rollups()
+        logger.info("Built monthly rollups for existing transactions.")
+
+    def _refresh_transfer_rollups(
+        self, start_month: str | None = None, end_month: str | None = None
+    ) -> None:
+        """
+        Recomputes the transfer sums of the monthly rollups from the stored transfers, for every
+        month or only those between start_month and end_month.
+        """
+        months = ""
+        params = []
+        if start_month is not None and end_month is not None:
+            months = "month BETWEEN ? AND ? AND "
+            params = [start_month, end_month]
+        self._conn.execute(
+            "UPDATE monthly_rollups SET transfer_cents = 0, transfer_count = 0 "
+            f"WHERE {months}transfer_count != 0",
+            params,
+        )
+        self._conn.execute(
+            "INSERT INTO monthly_rollups (month, account, merchant, transaction_type, "
+            "total_cents, count, transfer_cents, transfer_count) "
+            "SELECT month, account, merchant, transaction_type, 0, 0, SUM(amount_cents), "
+            f"COUNT(*) FROM transactions WHERE {months}(id IN (SELECT outflow_id FROM transfers) "
+            "OR id IN (SELECT inflow_id FROM transfers)) "
+            "GROUP BY month, account, merchant, transaction_type "
+            "ON CONFLICT (month, account, merchant, transaction_type) DO UPDATE SET "
+            "transfer_cents = excluded.transfer_cents, "
+            "transfer_count = excluded.transfer_count",
+            params,
+        )
+
+    def insert_transactions(self, transactions: list[dict], account: str) -> int:
+        """
+        Bulk inserts transactions in a single transaction. Inserting the same statement again is a
+        no-op, so retries and re-imports do not create duplicates, and the monthly rollups and
+        merchant interval statistics are only updated for the rows actually inserted.
+
+        Args:
+            transactions (list[dict]): The extracted transactions.
+            account (str): The account the transactions belong to.
+
+        Returns:
+            int: The number of newly inserted transactions.
+        """
+        now = time.time()
+        rows = [
+            (
+                txn_hash,
+                account,
+                str(transaction["date"]),
+                str(transaction["date"])[:7],
+                transaction["merchant"],
+                cents,
+                transaction.get("currency") or "USD",
+                transaction.get("transaction_type") or "Expense",
+                now,
+            )
+            for txn_hash, transaction, cents in _transaction_hashes(
+                transactions, account
+            )
+        ]
+        with self._lock:
+            # rowcount only counts rows the statement inserted, not the rollup trigger writes.
+            inserted = self._conn.executemany(
+                "INSERT OR IGNORE INTO transactions (txn_hash, account, date, month, merchant, "
+                "amount_cents, currency, transaction_type, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            ).rowcount
+            self._conn.commit()
+        logger.info(
+            "Inserted %d of %d transactions for account %s.",
+            inserted,
+            len(rows),
+            account,
+        )
+        return inserted
+
+    def transfer_candidates(
+        self, start_date: str | None = None, end_date: str | None = None
+    ) -> tuple[list[int], list[dict]]:
+        """
+        Loads the stored transactions for transfer reconciliation: every transaction, or those
+        dated between start_date and end_date. In the latter case, transactions already paired with
+        a transaction outside the range are left out, so those transfers are kept as they are.
+
+        Args:
+            start_date (str | None): The first date to load, inclusive.
+            end_date (str | None): The last date to load, inclusive.
+
+        Returns:
+            tuple[list[int], list[dict]]: The row ids, and the transactions with account, date,
+                merchant, amount (as a Decimal), currency and transaction_type.
+        """
+        query = (
+            "SELECT id, account, date, merchant, amount_cents, currency, transaction_type "
+            "FROM transactions"
+        )
+        params = []
+        if start_date is not None and end_date is not None:
+            query += (
+                " WHERE date BETWEEN ? AND ? AND id NOT IN ("
+                "SELECT t.outflow_id FROM transfers t JOIN transactions i ON i.id = t.inflow_id "
+                "WHERE i.date NOT BETWEEN ? AND ?) AND id NOT IN ("
+                "SELECT t.inflow_id FROM transfers t JOIN transactions o ON o.id = t.outflow_id "
+                "WHERE o.date NOT BETWEEN ? AND ?)"
+            )
+            params = [start_date, end_date] * 3
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        transactions = [
+            {
+                "account": account,
+                "date": date,
+                "merchant": merchant,
+                "amount": Decimal(cents) / 100,
+                "currency": currency,
+                "transaction_type": transaction_type,
+            }
+            for _, account, date, merchant, cents, currency, transaction_type in rows
+        ]
+        return [row[0] for row in rows], transactions
+
+    def replace_transfers(
+        self,
+        transfers: list[tuple[int, int, int, float]],
+        start_date: str | None = None,
+        end_date: str | None = None,
+    ) -> None:
+        """
+        Replaces the stored transfers in a single transaction, updating the transfer sums of the
+        monthly rollups to match. When a date range is given, only transfers with both sides in the
+        range are replaced, matching the candidates loaded by transfer_candidates for that range.
+
+        Args:
+            transfers (list[tuple[int, int, int, float]]): The outflow row id, inflow row id, days
+                apart and merchant similarity of each transfer.
+            start_date (str | None): The first date of the range, inclusive.
+            end_date (str | None): The last date of the range, inclusive.
+        """
+        scoped = start_date is not None and end_date is not None
+        with self._lock:
+            if scoped:
+                self._conn.execute(
+                    "DELETE FROM transfers WHERE outflow_id IN ("
+                    "SELECT id FROM transactions WHERE date BETWEEN ? AND ?) AND inflow_id IN ("
+                    "SELECT id FROM transactions WHERE date BETWEEN ? AND ?)",
+                    [start_date, end_date, start_date, end_date],
+                )
+            else:
+                self._conn.execute("DELETE FROM transfers")
+            self._conn.executemany(
+                "INSERT INTO transfers (outflow_id, inflow_id, days_apart, similarity) "
+                "VALUES (?, ?, ?, ?)",
+                transfers,
+            )
+            if scoped:
+                self._refresh_transfer_rollups(start_date[:7], end_date[:7])
+            else:
+                self._refresh_transfer_rollups()
+            self._conn.commit()
+
+    def query_transfers(self, limit: int = 100, offset: int = 0) -> list[dict]:
+        """
+        Lists the matched transfers, newest first.
+
+        Args:
+            limit (int): The maximum number of transfers to return.
+            offset (int): The number of transfers to skip.
+
+        Returns:
+            list[dict]: The amount, date gap and merchant similarity of each transfer, with the
+                account, date and merchant of both sides.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT o.amount_cents, o.currency, t.days_apart, t.similarity, "
+                "o.account, o.date, o.merchant, i.account, i.date, i.merchant "
+                "FROM transfers t JOIN transactions o ON o.id = t.outflow_id "
+                "JOIN transactions i ON i.id = t.inflow_id "
+                "ORDER BY o.date DESC, o.id DESC LIMIT ? OFFSET ?",
+                [limit, offset],
+            ).fetchall()
+        return [
+            {
+                "amount": cents / 100,
+                "currency": currency,
+                "days_apart": days_apart,
+                "similarity": similarity,
+                "outflow": {
+                    "account": o_account,
+                    "date": o_date,
+                    "merchant": o_merchant,
+                },
+                "inflow": {
+                    "account": i_account,
+                    "date": i_date,
+                    "merchant": i_merchant,
+                },
+            }
+            for (
+                cents,
+                currency,
+                days_apart,
+                similarity,
+                o_account,
+                o_date,
+                o_merchant,
+                i_account,
+                i_date,
+                i_merchant,
+            ) in rows
+        ]
+
+    @staticmethod
+    def _where(
+        account: str | None,
+        start_date: str | None,
+        end_date: str | None,
+        merchant: str | None,
+        transaction_type: str | None,
+        exclude_transfers: bool = False,
+    ) -> tuple[str, list]:
+        """Builds the WHERE clause and parameters for the common transaction filters."""
+        clauses, params = [], []
+        if exclude_transfers:
+            clauses.append(
+                "id NOT IN (SELECT outflow_id FROM transfers) "
+                "AND id NOT IN (SELECT inflow_id FROM transfers)"
+            )
+        for clause, value in (
+            ("account = ?", account),
+            ("date >= ?", start_date),
+            ("date <= ?", end_date),
+            ("merchant = ?", merchant),
+            ("transaction_type = ?", transaction_type),
+        ):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def query_transactions(
+        self,
+        account: str | None = None,
+        start_date: str | None = None,
+        end_date: str | None = None,
+        merchant: str | None = None,
+        transaction_type: str | None = None,
+        limit: int = 100,
+        offset: int = 0,
+        exclude_transfers: bool = False,
+    ) -> list[dict]:
+        """
+        Lists stored transactions matching the filters, newest first.
+
+        Args:
+            account (str | None): Only return transactions for this account.
+            start_date (str | None): Only return transactions on or after this YYYY-MM-DD date.
+            end_date (str | None): Only return transactions on or before this YYYY-MM-DD date.
+            merchant (str | None): Only return transactions for this merchant.
+            transaction_type (str | None): Only return transactions of this type.
+            limit (int): The maximum number of transactions to return.
+            offset (int): The number of matching transactions to skip.
+            exclude_transfers (bool): Leave out both sides of reconciled transfers.
+
+        Returns:
+            list[dict]: The matching transactions.
+        """
+        where, params = self._where(
+            account, start_date, end_date, merchant, transaction_type, exclude_transfers
+        )
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT account, merchant, date, amount_cents, currency, transaction_type "
+                f"FROM transactions{where} ORDER BY date DESC, id DESC LIMIT ? OFFSET ?",
+                [*params, limit, offset],
+            ).fetchall()
+        return [
+            {
+                "account": account_,
+                "merchant": merchant_,
+                "date": date,
+                "amount": cents / 100,
+                "currency": currency,
+                "transaction_type": transaction_type_,
+            }
+            for account_, merchant_, date, cents, currency, transaction_type_ in rows
+        ]
+
+    def summarize(
+        self,
+        group_by: str,
+        account: str | None = None,
+        start_date: str | None = None,
+        end_date: str | None = None,
+        merchant: str | None = None,
+        transaction_type: str | None = None,
+        exclude_transfers: bool = False,
+    ) -> list[dict]:
+        """
+        Sums stored transactions matching the filters per month, merchant, transaction type or account.
+        When the date range starts and ends on month boundaries, or is open, the sums come from the
+        monthly rollups, so the cost grows with the number of months rather than of transactions.
+
+        Args:
+            group_by (str): One of 'month', 'merchant', 'transaction_type' or 'account'.
+            account (str | None): Only include transactions for this account.
+            start_date (str | None): Only include transactions on or after this YYYY-MM-DD date.
+            end_date (str | None): Only include transactions on or before this YYYY-MM-DD date.
+            merchant (str | None): Only include transactions for this merchant.
+            transaction_type (str | None): Only include transactions of this type.
+            exclude_transfers (bool): Leave out both sides of reconciled transfers,
+                so card payments and internal transfers are not counted as spending twice.
+
+        Returns:
+            list[dict]: The group key, total amount and transaction count of each group.
+        """
+        if group_by not in GROUP_BY_COLUMNS:
+            raise ValueError(
+                f"Cannot group by '{group_by}', expected one of {sorted(GROUP_BY_COLUMNS)}."
+            )
+        column = GROUP_BY_COLUMNS[group_by]
+        months = _month_bounds(start_date, end_date)
+        if months is not None:
+            where, params = self._rollup_where(
+                account, months, merchant, transaction_type
+            )
+            cents, count = (
+                ("total_cents - transfer_cents", "count - transfer_count")
+                if exclude_transfers
+                else ("total_cents", "count")
+            )
+            query = (
+                f"SELECT {column}, SUM({cents}), SUM({count}) FROM monthly_rollups{where} "
+                f"GROUP BY {column} HAVING SUM({count}) > 0 ORDER BY {column}"
+            )
+        else:
+            where, params = self._where(
+                account,
+                start_date,
+                end_date,
+                merchant,
+                transaction_type,
+                exclude_transfers,
+            )
+            query = (
+                f"SELECT {column}, SUM(amount_cents), COUNT(*) FROM transactions{where} "
+                f"GROUP BY {column} ORDER BY {column}"
+            )
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [
+            {group_by: key, "total": cents / 100, "count": count}
+            for key, cents, count in rows
+        ]
+
+    @staticmethod
+    def _rollup_where(
+        account: str | None,
+        months: tuple[str | None, str | None],
+        merchant: str | None,
+        transaction_type: str | None,
+    ) -> tuple[str, list]:
+        """Builds the WHERE clause and parameters of a monthly rollup query."""
+        clauses, params = [], []
+        for clause, value in (
+            ("account = ?", account),
+            ("month >= ?", months[0]),
+            ("month <= ?", months[1]),
+            ("merchant = ?", merchant),
+            ("transaction_type = ?", transaction_type),
+        ):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def _refresh_stale_intervals(self) -> None:
+        """
+        Recomputes the interval statistics of merchants that received out-of-order charges, in one
+        pass over their charges sorted by merchant and date.
+        """
+        if not self._conn.execute(
+            "SELECT EXISTS (SELECT 1 FROM merchant_intervals WHERE stale)"
+        ).fetchone()[0]:
+            return
+        rows = self._conn.execute(
+            "SELECT t.account, t.merchant, t.date, t.amount_cents FROM transactions t "
+            "JOIN merchant_intervals m ON m.account = t.account AND m.merchant = t.merchant "
+            f"WHERE m.stale AND {RECURRING_CANDIDATE} "
+            "ORDER BY t.account, t.merchant, t.date"
+        ).fetchall()
+        updates = [
+            (*_interval_statistics([row[2:] for row in group]), account, merchant)
+            for (account, merchant), group in groupby(rows, key=itemgetter(0, 1))
+        ]
+        self._conn.executemany(
+            "UPDATE merchant_intervals SET interval_count = ?, interval_mean = ?, "
+            "interval_m2 = ?, amount_mean = ?, amount_m2 = ?, stale = 0 "
+            "WHERE account = ? AND merchant = ?",
+            updates,
+        )
+        self._conn.commit()
+        logger.info("Recomputed interval statistics of %d merchants.", len(updates))
+
+    def merchant_intervals(
+        self, account: str | None = None, min_occurrences: int = 2
+    ) -> list[dict]:
+        """
+        Lists the charge interval statistics of each merchant, for recurring-charge detection. Only
+        expenses with a positive amount count as charges.
+
+        Args:
+            account (str | None): Only return merchants charged to this account.
+            min_occurrences (int): Only return merchants charged at least this many times.
+
+        Returns:
+            list[dict]: The account, merchant, first_date, last_date and occurrences of each
+                merchant, the number of intervals between charges on distinct days with their mean
+                and standard deviation in days, and the mean and standard deviation of the amount.
+        """
+        where, params = " WHERE occurrences >= ?", [min_occurrences]
+        if account is not None:
+            where += " AND account = ?"
+            params.append(account)
+        with self._lock:
+            self._refresh_stale_intervals()
+            rows = self._conn.execute(
+                "SELECT account, merchant, first_date, last_date, occurrences, interval_count, "
+                "interval_mean, interval_m2, amount_mean, amount_m2 "
+                f"FROM merchant_intervals{where} ORDER BY account, merchant",
+                params,
+            ).fetchall()
+        return [
+            {
+                "account": account_,
+                "merchant": merchant,
+                "first_date": first_date,
+                "last_date": last_date,
+                "occurrences": occurrences,
+                "interval_count": interval_count,
+                "interval_mean": interval_mean,
+                "interval_std": math.sqrt(interval_m2 / interval_count)
+                if interval_count
+                else 0.0,
+                "amount_mean": amount_mean / 100,
+                "amount_std": math.sqrt(max(amount_m2, 0.0) / occurrences) / 100,
+            }
+            for (
+                account_,
+                merchant,
+                first_date,
+                last_date,
+                occurrences,
+                interval_count,
+                interval_mean,
+                interval_m2,
+                amount_mean,
+                amount_m2,
+            ) in rows
+        ]
+
+
+def get_transaction_store() -> TransactionStore:
+    """
+    Returns the process-wide transaction store. Transactions are persisted to the SQLite file at
+    TRANSACTION_STORE_PATH when it is set, and kept in memory for the life of the process otherwise.
+
+    Returns:
+        TransactionStore: The shared transaction store.
+    """
+    global _store
+    path = os.environ.get("TRANSACTION_STORE_PATH") or ":memory:"
+    with _store_lock:
+        if _store is None or _store.path != path:
+            _store = TransactionStore(path=path)
+        return _store
@@ -0,0 +1,126 @@
+import json
+from collections.abc import Iterator
+from decimal import Decimal
+
+from api.utils.setup_logger import setup_logger
+
+logger = setup_logger(__name__)
+
+WHITESPACE = frozenset(" \t\r\n")
+
+
+class TransactionStreamParser:
+    """
+    An incremental parser for function call arguments of the form {"transactions": [{...}, ...]}
+    that arrive in arbitrary fragments. Each transaction object is decoded as soon as its closing
+    brace arrives, without waiting for the rest of the payload.
+    """
+
+    def __init__(self, array_key: str = "transactions"):
+        """
+        Args:
+            array_key (str): The top-level key whose array elements are emitted.
+        """
+        self.array_key = array_key
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._string: list[str] | None = None
+        self._last_string: str | None = None
+        self._key: str | None = None
+        self._in_array = False
+        self._started = False
+        self._complete = False
+        self._pieces: list[str] = []
+        self._capture_start: int | None = None
+
+    def feed(self, fragment: str) -> Iterator[dict]:
+        """
+        Consumes the next fragment of the payload.
+
+        Args:
+            fragment (str): The next piece of the function call arguments.
+
+        Yields:
+            dict: Each transaction object completed by this fragment.
+
+        Raises:
+            ValueError: If the payload is not an object or the array holds something other than objects.
+        """
+        capture_start = 0 if self._capture_start is not None else None
+        for index, char in enumerate(fragment):
+            if self._in_string:
+                if self._string is not None:
+                    self._string.append(char)
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._string is not None:
+                        self._last_string = json.loads('"' + "".join(self._string))
+                        self._string = None
+                continue
+            if char in WHITESPACE:
+                continue
+            if self._complete:
+                raise ValueError("Unexpected data after the end of the response.")
+            if not self._started:
+                if char != "{":
+                    raise ValueError(
+                        "Expected response to be a dict, got a payload starting with "
+                        f"'{char}'."
+                    )
+                self._started = True
+            if self._in_array and self._depth == 2 and char not in "{,]":
+                raise ValueError(
+                    f"Expected {self.array_key} to contain only objects, found '{char}'."
+                )
+            if char == '"':
+                self._in_string = True
+                self._string = [] if self._depth == 1 else None
+            elif char == ":" and self._depth == 1:
+                self._key = self._last_string
+            elif char in "{[":
+                if char == "[" and self._depth == 1 and self._key == self.array_key:
+                    self._in_array = True
+                elif char == "{" and self._in_array and self._depth == 2:
+                    capture_start = index
+                    self._pieces = []
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._in_array and self._depth == 2 and char == "}":
+                    self._pieces.append(fragment[capture_start : index + 1])
+                    capture_start = None
+                    yield self._decode("".join(self._pieces))
+                elif self._in_array and self._depth == 1:
+                    self._in_array = False
+                elif self._depth == 0:
+                    self._complete = True
+            elif char == "," and self._depth == 1:
+                self._key = None
+        if capture_start is not None:
+            self._pieces.append(fragment[capture_start:])
+        self._capture_start = capture_start
+
+    @staticmethod
+    def _decode(text: str) -> dict:
+        """Decodes a single transaction object, keeping amounts as Decimal."""
+        try:
+            return json.loads(text, parse_float=Decimal)
+        except json.JSONDecodeError as e:
+            logger.error("Parsing streamed transaction failed: %s", e)
+            raise ValueError("Failed to parse the response from OpenAI API.")
+
+    def close(self) -> None:
+        """
+        Checks that the whole payload was received.
+
+        Raises:
+            ValueError: If the payload ended before its closing brace.
+        """
+        if not self._complete:
+            logger.error("Streamed response ended before the payload was complete.")
+            raise ValueError("Failed to parse the response from OpenAI API.")